@@ -10,9 +10,9 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import json
-import time
 import os
 from datetime import datetime
+from network_capture import NetworkCapture
 
 def capture_via_api(base_url, username, password, output_dir="api_direct_capture"):
     """Capture data by monitoring API calls after login"""
@@ -21,23 +21,27 @@ def capture_via_api(base_url, username, password, output_dir="api_direct_capture
     print("DIRECT API CAPTURE")
     print("="*80)
     
-    # Setup Chrome with network logging
+    # Setup Chrome
     chrome_options = Options()
     chrome_options.add_argument('--headless')
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
     
     driver = None
+    network = None
     api_data = {}
     
     try:
         driver = webdriver.Chrome(options=chrome_options)
         driver.implicitly_wait(10)
         
+        # Only our API endpoints, fetched as each response finishes
+        network = NetworkCapture(driver, accept=lambda response: (
+            '/api/' in response['url'] and response['mimeType'] == 'application/json')).start()
+        
         print(f"\n🌐 Navigating to: {base_url}")
         driver.get(base_url)
-        time.sleep(3)
+        network.wait_until_settled()
         
         # Login
         print(f"🔐 Logging in as: {username}")
@@ -55,55 +59,31 @@ def capture_via_api(base_url, username, password, output_dir="api_direct_capture
             submit_button.click()
             
             print("⏳ Waiting for dashboard to load...")
-            time.sleep(8)  # Give time for API calls to complete
+            network.wait_until_settled()  # Until the API calls have completed
             
         except Exception as e:
             print(f"Login step error: {e}")
         
         # Capture all network traffic
         print("\n📡 Capturing API responses...")
-        logs = driver.get_log('performance')
-        
         api_responses = []
-        for entry in logs:
-            try:
-                log = json.loads(entry['message'])['message']
-                
-                # Look for API responses
-                if log['method'] == 'Network.responseReceived':
-                    response_data = log['params']['response']
-                    url = response_data['url']
-                    
-                    # Only capture our API endpoints
-                    if '/api/' in url and response_data.get('mimeType') == 'application/json':
-                        request_id = log['params']['requestId']
-                        
-                        try:
-                            # Get the response body
-                            response_body = driver.execute_cdp_cmd('Network.getResponseBody', {
-                                'requestId': request_id
-                            })
-                            
-                            body = json.loads(response_body['body'])
-                            
-                            api_responses.append({
-                                'url': url,
-                                'timestamp': log['params']['timestamp'],
-                                'response': body
-                            })
-                            
-                            # Extract endpoint name for display
-                            import re
-                            endpoint = re.sub(r'https?://[^/]+', '', url)
-                            endpoint = re.sub(r'\?.*', '', endpoint)
-                            print(f"  ✓ {endpoint}")
-                            
-                        except Exception as e:
-                            # Some responses might not be available
-                            pass
-                            
-            except Exception as e:
+        for entry in network.take():
+            # Some responses might not be available
+            if not isinstance(entry.get('response'), (dict, list)):
                 continue
+            url = entry['url']
+            
+            api_responses.append({
+                'url': url,
+                'timestamp': entry['event_timestamp'],
+                'response': entry['response']
+            })
+            
+            # Extract endpoint name for display
+            import re
+            endpoint = re.sub(r'https?://[^/]+', '', url)
+            endpoint = re.sub(r'\?.*', '', endpoint)
+            print(f"  ✓ {endpoint}")
         
         print(f"\n✅ Captured {len(api_responses)} API responses")
         
@@ -187,6 +167,8 @@ def capture_via_api(base_url, username, password, output_dir="api_direct_capture
         return None
         
     finally:
+        if network:
+            network.stop()
         if driver:
             driver.quit()
 
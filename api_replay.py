@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+API REPLAY
+Re-fetch the API calls of one browser capture for every site and environment.
+
+The capture scripts drive Chrome through every page and every facility just
+to read the JSON the pages load; a full migration snapshot took half an hour.
+The browser is only needed once, to learn which calls the app makes. After
+that, ApiReplay fetches those calls straight from the API:
+
+1. build_catalog() turns a capture's URLs into templates. Path segments and
+   query values that are the logged-in user's ID (from /api/auth/me) or one
+   of the user's site IDs (from /api/users/{user_id}/slds) become
+   placeholders:
+       /api/lookup/site-overview/4f1c...-...  ->  /api/lookup/site-overview/{sld_id}
+   Other IDs are kept as captured. Only GETs are replayed: calls the capture
+   recorded with another method, and /api/auth/* (login, refresh, logout)
+   apart from /api/auth/me, are left out of the catalog.
+2. snapshot() logs in to each environment with a saved BrowserSession (see
+   session_store), looks up that environment's user and sites, and fetches
+   every template: once, or once per site when it has {sld_id}.
+
+All requests share one connection pool (keep-alive, retries with backoff on
+429/502/503/504) and run in a thread pool, with at most per_host requests
+open to any one host. The result has the same entry shape as
+NetworkCapture.take(), plus 'site' on per-site calls, so the existing
+comparators read it as they read a browser capture:
+
+    catalog = build_catalog(load_capture("simple_api_capture_.../all_responses.json"))
+    snapshot = ApiReplay().snapshot(catalog, {
+        "rnd": ("https://acme.egalvanic-rnd.com", rnd_session),
+        "ai": ("https://acme.egalvanic.ai", ai_session),
+    })
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qsl, quote
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from session_store import SessionStore, authorize, ME_PATH
+
+SITES_PATH = "/api/users/{user_id}/slds"
+
+# Session calls a replay must never repeat; ME_PATH is the exception
+AUTH_PREFIX = "/api/auth/"
+
+# Requests open at once to one host
+MAX_PER_HOST = 8
+
+# Seconds per request, and retries of failed GETs
+REQUEST_TIMEOUT = 30
+RETRIES = 3
+RETRY_BACKOFF = 0.3
+
+USER_ID = "{user_id}"
+SLD_ID = "{sld_id}"
+
+
+def tuned_adapter(per_host=MAX_PER_HOST):
+    """HTTPAdapter keeping per_host connections alive per host, retrying transient errors"""
+    retry = Retry(total=RETRIES, backoff_factor=RETRY_BACKOFF,
+                  status_forcelist=(429, 502, 503, 504), allowed_methods=frozenset(["GET"]))
+    return HTTPAdapter(pool_connections=16, pool_maxsize=per_host, max_retries=retry)
+
+
+def load_capture(path):
+    """Captured entries of a capture file: a list of entries, or a dict holding one"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('raw_api_responses') or data.get('api_responses') or []
+    return data
+
+
+def _user_and_sites(entries):
+    # The user ID and site IDs found in a capture's auth/me and slds responses
+    user_id = None
+    site_ids = []
+    for entry in entries:
+        path = urlsplit(entry['url']).path
+        response = entry.get('response')
+        if path.endswith(ME_PATH) and isinstance(response, dict):
+            user_id = response.get('id')
+        elif path.startswith('/api/users/') and path.endswith('/slds') and isinstance(response, list):
+            site_ids = [site['id'] for site in response if isinstance(site, dict) and 'id' in site]
+    return user_id, site_ids
+
+
+def build_catalog(entries):
+    """
+    Sorted endpoint templates of a capture's /api/ GETs, with {user_id} and
+    {sld_id} placeholders. Entries without a 'method' (captures made before
+    it was recorded) count as GETs.
+    """
+    user_id, site_ids = _user_and_sites(entries)
+    placeholders = {str(site_id): SLD_ID for site_id in site_ids}
+    if user_id is not None:
+        placeholders[str(user_id)] = USER_ID
+
+    catalog = set()
+    for entry in entries:
+        parts = urlsplit(entry['url'])
+        if '/api/' not in parts.path or entry.get('method', 'GET').upper() != 'GET':
+            continue
+        if AUTH_PREFIX in parts.path and not parts.path.endswith(ME_PATH):
+            continue
+        template = '/'.join(placeholders.get(segment, segment) for segment in parts.path.split('/'))
+        query = [f"{quote(key, safe='')}={placeholders.get(value) or quote(value, safe='')}"
+                 for key, value in parse_qsl(parts.query, keep_blank_values=True)]
+        if query:
+            template += '?' + '&'.join(query)
+        catalog.add(template)
+    return sorted(catalog)
+
+
+def render(template, user_id=None, sld_id=None):
+    """A catalog template's path with its placeholders filled in"""
+    if user_id is not None:
+        template = template.replace(USER_ID, quote(str(user_id), safe=''))
+    if sld_id is not None:
+        template = template.replace(SLD_ID, quote(str(sld_id), safe=''))
+    return template
+
+
+class ApiReplay:
+    """Fetches a catalog of API calls for many environments over one connection pool"""
+
+    def __init__(self, per_host=MAX_PER_HOST, timeout=REQUEST_TIMEOUT):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.adapter = tuned_adapter(per_host)
+        self._lock = threading.Lock()
+        self._host_limits = {}
+
+    def session(self, browser_session=None):
+        """requests.Session on the shared pool, authorized as browser_session"""
+        http = requests.Session()
+        http.mount("http://", self.adapter)
+        http.mount("https://", self.adapter)
+        http.headers['Accept'] = 'application/json'
+        if browser_session is not None:
+            authorize(http, browser_session)
+        return http
+
+    def fetch(self, http, url):
+        """One GET as a capture entry: {'url', 'status', 'mimeType', 'timestamp', 'response'} or 'error'"""
+        entry = {'url': url, 'timestamp': int(time.time() * 1000)}
+        with self._host_limit(url):
+            try:
+                response = http.get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                entry['error'] = str(e)
+                return entry
+        entry['status'] = response.status_code
+        entry['mimeType'] = response.headers.get('content-type', '').split(';')[0]
+        try:
+            entry['response'] = response.json()
+        except ValueError:
+            entry['response'] = response.text
+        return entry
+
+    def snapshot(self, catalog, environments):
+        """
+        environments: {name: (api_base, BrowserSession or None)}.
+        Returns {name: [entry, ...]} with the catalog's calls in catalog
+        order, per-site calls in site order with the site's name.
+        """
+        environments = {name: (api_base.rstrip('/'), browser_session)
+                        for name, (api_base, browser_session) in environments.items()}
+        hosts = {urlsplit(api_base).netloc for api_base, _ in environments.values()}
+        with ThreadPoolExecutor(max_workers=self.per_host * max(1, len(hosts))) as pool:
+            # Each environment's own user and sites first
+            sessions = {name: self.session(browser_session)
+                        for name, (_, browser_session) in environments.items()}
+            lookups = {name: pool.submit(self._user_and_sites, sessions[name], api_base)
+                       for name, (api_base, _) in environments.items()}
+
+            calls = {}
+            for name, (api_base, _) in environments.items():
+                user_id, sites = lookups[name].result()
+                print(f"🌐 {name}: {len(sites)} sites, {len(catalog)} endpoints")
+                calls[name] = []
+                for template in catalog:
+                    if USER_ID in template and user_id is None:
+                        continue
+                    if SLD_ID not in template:
+                        calls[name].append((None, render(template, user_id)))
+                        continue
+                    for site in sites:
+                        calls[name].append((site, render(template, user_id, site['id'])))
+
+            futures = {name: [(site, pool.submit(self.fetch, sessions[name], environments[name][0] + path))
+                              for site, path in paths]
+                       for name, paths in calls.items()}
+
+            snapshot = {}
+            for name, pending in futures.items():
+                snapshot[name] = []
+                for site, future in pending:
+                    entry = future.result()
+                    if site is not None:
+                        entry['site'] = site.get('name', site['id'])
+                    snapshot[name].append(entry)
+                failed = sum(1 for entry in snapshot[name] if entry.get('status') != 200)
+                print(f"   ✅ {name}: {len(snapshot[name]) - failed} responses" +
+                      (f", ⚠️  {failed} failed" if failed else ""))
+        return snapshot
+
+    def _user_and_sites(self, http, api_base):
+        me = self.fetch(http, api_base + ME_PATH)
+        if me.get('status') != 200 or not isinstance(me.get('response'), dict):
+            print(f"⚠️  {api_base}{ME_PATH} failed ({me.get('status', me.get('error'))}), "
+                  f"skipping user and site endpoints")
+            return None, []
+        user_id = me['response'].get('id')
+        sites = self.fetch(http, api_base + render(SITES_PATH, user_id))
+        if sites.get('status') != 200 or not isinstance(sites.get('response'), list):
+            return user_id, []
+        return user_id, [site for site in sites['response'] if isinstance(site, dict) and 'id' in site]
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+
+def save_snapshot(snapshot, output_dir):
+    """Write each environment's entries to <output_dir>/<name>_api_responses.json"""
+    os.makedirs(output_dir, exist_ok=True)
+    for name, entries in snapshot.items():
+        with open(os.path.join(output_dir, f"{name}_api_responses.json"), 'w') as f:
+            json.dump(entries, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python api_replay.py <capture.json> <email>")
+        print("  capture.json: all_responses.json / complete_capture.json of a browser capture")
+        print("  email: the account whose saved sessions are used")
+        print("  Log in once with any capture script so the sessions are saved.")
+        sys.exit(1)
+
+    ENVIRONMENTS = {
+        "rnd": "https://acme.egalvanic-rnd.com",
+        "ai": "https://acme.egalvanic.ai",
+    }
+
+    catalog = build_catalog(load_capture(sys.argv[1]))
+    account = sys.argv[2]
+    print(f"📋 {len(catalog)} endpoints in the catalog")
+
+    store = SessionStore()
+    environments = {}
+    for name, base_url in ENVIRONMENTS.items():
+        session = store.load(base_url, account)
+        session = session and store.check(session, account)
+        if session is None:
+            print(f"⚠️  No valid saved session of {account} for {base_url}, skipping {name}")
+            continue
+        store.save(session, account)  # keep refreshed tokens for the next run
+        environments[name] = (base_url, session)
+
+    start = time.monotonic()
+    snapshot = ApiReplay().snapshot(catalog, environments)
+    output_dir = f"api_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    save_snapshot(snapshot, output_dir)
+    print(f"\n✅ Snapshot of {len(environments)} environments in {time.monotonic() - start:.1f}s: {output_dir}")
@@ -5,7 +5,6 @@ Captures all API responses from a website for migration verification
 """
 import json
 import os
-import time
 import argparse
 from datetime import datetime
 from selenium import webdriver
@@ -14,6 +13,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import chromedriver_autoinstaller
+from network_capture import NetworkCapture
 
 def capture_website_data(base_url, email, password, output_name):
     """Capture all data from a website"""
@@ -27,19 +27,24 @@ def capture_website_data(base_url, email, password, output_name):
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.add_argument("--headless=new")
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
     
     # Install ChromeDriver automatically
     chromedriver_autoinstaller.install()
     driver = webdriver.Chrome(options=chrome_options)
     
+    # Only API calls that succeeded, fetched as each response finishes
+    network = NetworkCapture(driver, accept=lambda response: (
+        '/api/' in response['url'] and response['status'] == 200))
+    
     all_api_responses = []
     
     try:
+        network.start()
+        
         # Login
         print(f"1. Logging in to {base_url}...")
         driver.get(f"{base_url}/login")
-        time.sleep(2)
+        network.wait_until_settled()
         
         driver.find_element(By.NAME, "email").send_keys(email)
         driver.find_element(By.NAME, "password").send_keys(password)
@@ -47,7 +52,7 @@ def capture_website_data(base_url, email, password, output_name):
         
         WebDriverWait(driver, 15).until(EC.url_contains("/dashboard"))
         print("   ✓ Login successful\n")
-        time.sleep(3)
+        network.wait_until_settled()
         
         # Pages to visit
         pages = [
@@ -63,7 +68,7 @@ def capture_website_data(base_url, email, password, output_name):
             try:
                 print(f"   Visiting {page}...")
                 driver.get(f"{base_url}{page}")
-                time.sleep(6)  # Wait longer for APIs to load
+                network.wait_until_settled()  # Wait for APIs to load
                 
                 # If on dashboard, try to interact with site dropdown to load site data
                 if page == "/dashboard":
@@ -71,61 +76,36 @@ def capture_website_data(base_url, email, password, output_name):
                         # Look for site dropdown and click it to load site list
                         site_dropdown = driver.find_element(By.CSS_SELECTOR, "select, .dropdown-toggle, [class*='site'], [class*='dropdown']")
                         site_dropdown.click()
-                        time.sleep(3)
+                        network.wait_until_settled()
                         
                         # Try to select first few sites to trigger their API calls
                         options = driver.find_elements(By.CSS_SELECTOR, "option, .dropdown-item, li")
                         for opt in options[:5]:  # Try first 5 sites
                             try:
                                 opt.click()
-                                time.sleep(2)
+                                network.wait_until_settled()
                             except:
                                 pass
                     except:
                         print("      Could not interact with site dropdown")
                 
-                # Capture network logs
-                logs = driver.get_log('performance')
-                for log in logs:
-                    try:
-                        message = json.loads(log['message'])
-                        if (message['message']['method'] == 'Network.responseReceived' and 
-                            'response' in message['message']['params']):
-                            
-                            response = message['message']['params']['response']
-                            url = response['url']
-                            
-                            # Only capture API calls that succeeded
-                            if ('/api/' in url and response['status'] == 200):
-                                try:
-                                    driver.execute_cdp_cmd('Network.enable', {})
-                                    request_id = message['message']['params']['requestId']
-                                    result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                                    body = result.get('body', '')
-                                    
-                                    if result.get('base64Encoded', False):
-                                        import base64
-                                        body = base64.b64decode(body).decode('utf-8')
-                                    
-                                    try:
-                                        body = json.loads(body)
-                                    except:
-                                        pass
-                                    
-                                    # Check if this API response already captured (avoid duplicates)
-                                    url_clean = url.split('?')[0]  # Remove query params for comparison
-                                    if not any(r['url'].split('?')[0] == url_clean and r['response'] == body for r in all_api_responses):
-                                        api_entry = {
-                                            'url': url,
-                                            'timestamp': datetime.now().isoformat(),
-                                            'response': body
-                                        }
-                                        all_api_responses.append(api_entry)
-                                        print(f"      ✓ Captured: {url.split('/api/')[-1][:50]}...")
-                                except:
-                                    pass
-                    except:
+                # Collect the API responses of this page
+                for entry in network.take():
+                    if 'error' in entry:
                         continue
+                    url = entry['url']
+                    body = entry['response']
+                    
+                    # Check if this API response already captured (avoid duplicates)
+                    url_clean = url.split('?')[0]  # Remove query params for comparison
+                    if not any(r['url'].split('?')[0] == url_clean and r['response'] == body for r in all_api_responses):
+                        api_entry = {
+                            'url': url,
+                            'timestamp': datetime.now().isoformat(),
+                            'response': body
+                        }
+                        all_api_responses.append(api_entry)
+                        print(f"      ✓ Captured: {url.split('/api/')[-1][:50]}...")
                         
             except Exception as e:
                 print(f"   ⚠ Error visiting {page}: {e}")
@@ -149,6 +129,7 @@ def capture_website_data(base_url, email, password, output_name):
         return output_file
         
     finally:
+        network.stop()
         driver.quit()
 
 if __name__ == "__main__":
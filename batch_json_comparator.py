@@ -10,6 +10,7 @@ import sys
 import glob
 from datetime import datetime
 from comprehensive_json_comparator import ComprehensiveJSONComparator
+from diff_cache import DiffCache
 
 def find_json_files(directory, pattern="*.json"):
     """Find all JSON files in a directory"""
@@ -21,8 +22,11 @@ def find_capture_files(base_path):
     pattern = os.path.join(base_path, "**/complete_capture.json")
     return sorted(glob.glob(pattern, recursive=True))
 
-def compare_consecutive_captures(base_directory, output_dir="batch_comparisons"):
-    """Compare consecutive capture directories"""
+def compare_consecutive_captures(base_directory, output_dir="batch_comparisons", diff_cache=None):
+    """
+    Compare consecutive capture directories.
+    With a DiffCache, pairs whose contents were compared before are not diffed again.
+    """
     capture_dirs = sorted(glob.glob(os.path.join(base_directory, "complete_captures_*")))
     
     if len(capture_dirs) < 2:
@@ -56,7 +60,7 @@ def compare_consecutive_captures(base_directory, output_dir="batch_comparisons")
         print(f"  New: {new_name}")
         
         try:
-            comparator = ComprehensiveJSONComparator(old_file, new_file, output_name)
+            comparator = ComprehensiveJSONComparator(old_file, new_file, output_name, diff_cache=diff_cache)
             
             if comparator.compare():
                 comparator.generate_html_report()
@@ -85,8 +89,11 @@ def compare_consecutive_captures(base_directory, output_dir="batch_comparisons")
     
     return results
 
-def compare_directory_pair(old_dir, new_dir, output_name="directory_comparison"):
-    """Compare JSON files within two directories"""
+def compare_directory_pair(old_dir, new_dir, output_name="directory_comparison", diff_cache=None):
+    """
+    Compare JSON files within two directories.
+    With a DiffCache, pairs whose contents were compared before are not diffed again.
+    """
     # Find all JSON files
     old_files = find_json_files(old_dir)
     new_files = find_json_files(new_dir)
@@ -115,7 +122,7 @@ def compare_directory_pair(old_dir, new_dir, output_name="directory_comparison")
             
             try:
                 comp_name = os.path.join(output_dir, f"comp_{idx}_{filename.replace('.json', '')}")
-                comparator = ComprehensiveJSONComparator(old_file, new_file, comp_name)
+                comparator = ComprehensiveJSONComparator(old_file, new_file, comp_name, diff_cache=diff_cache)
                 
                 if comparator.compare():
                     comparator.generate_html_report()
@@ -302,38 +309,53 @@ def generate_batch_summary(results, output_file="batch_summary.html"):
     
     print(f"\n✅ Summary generated: {output_file}")
 
+def print_cache_summary(diff_cache):
+    """Report how many comparisons the diff cache answered"""
+    if diff_cache is None:
+        return
+    print(f"\n♻️  Diff cache: {diff_cache.hits} reused, {diff_cache.misses} computed "
+          f"({len(diff_cache)} entries, {diff_cache.total_bytes / (1024 * 1024):.1f} MB in {diff_cache.cache_dir})")
+
 def main():
-    if len(sys.argv) < 2:
+    args = [arg for arg in sys.argv[1:] if arg != "--no-cache"]
+    use_cache = len(args) == len(sys.argv) - 1
+    
+    if len(args) < 1:
         print("Batch JSON Comparator")
         print("\nUsage:")
-        print("  python3 batch_json_comparator.py consecutive [base_directory]")
-        print("  python3 batch_json_comparator.py directories <old_dir> <new_dir>")
+        print("  python3 batch_json_comparator.py consecutive [base_directory] [--no-cache]")
+        print("  python3 batch_json_comparator.py directories <old_dir> <new_dir> [--no-cache]")
         print("\nExamples:")
         print("  python3 batch_json_comparator.py consecutive .")
         print("  python3 batch_json_comparator.py directories old_captures new_captures")
+        print("\nResults are cached in .diff_cache/ by file contents, so pairs compared")
+        print("in an earlier run are not diffed again (--no-cache turns this off).")
         sys.exit(1)
     
-    mode = sys.argv[1]
+    mode = args[0]
+    diff_cache = DiffCache() if use_cache else None
     
     if mode == "consecutive":
-        base_dir = sys.argv[2] if len(sys.argv) > 2 else "."
+        base_dir = args[1] if len(args) > 1 else "."
         print("🔄 Batch comparing consecutive captures...")
-        results = compare_consecutive_captures(base_dir)
+        results = compare_consecutive_captures(base_dir, diff_cache=diff_cache)
+        print_cache_summary(diff_cache)
         
         if results:
             generate_batch_summary(results, "batch_consecutive_summary.html")
             print(f"\n✨ Completed {len(results)} comparisons!")
     
     elif mode == "directories":
-        if len(sys.argv) < 4:
+        if len(args) < 3:
             print("Error: directories mode requires <old_dir> and <new_dir>")
             sys.exit(1)
         
-        old_dir = sys.argv[2]
-        new_dir = sys.argv[3]
+        old_dir = args[1]
+        new_dir = args[2]
         
         print("📁 Batch comparing directories...")
-        results = compare_directory_pair(old_dir, new_dir)
+        results = compare_directory_pair(old_dir, new_dir, diff_cache=diff_cache)
+        print_cache_summary(diff_cache)
         
         if results:
             generate_batch_summary(results, "batch_directory_summary.html")
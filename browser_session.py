@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+BROWSER SESSION
+Copy an authenticated browser session from one driver into another.
+
+The app keeps its login in cookies and in localStorage (the access and
+refresh tokens), both scoped to the site's origin. export_session() reads
+them from a logged-in driver; restore_session() writes them into a fresh
+driver on the same origin and opens the page the session was on, so the
+new browser starts out logged in without going through the login form.
+"""
+
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+# Reads every localStorage item of the current origin
+_READ_LOCAL_STORAGE = """
+const items = {};
+for (let i = 0; i < window.localStorage.length; i++) {
+    const key = window.localStorage.key(i);
+    items[key] = window.localStorage.getItem(key);
+}
+return items;
+"""
+
+_WRITE_LOCAL_STORAGE = """
+const items = arguments[0];
+for (const key of Object.keys(items)) {
+    window.localStorage.setItem(key, items[key]);
+}
+"""
+
+# Cookie fields WebDriver's addCookie accepts
+_COOKIE_FIELDS = ("name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite")
+
+
+class BrowserSession(namedtuple("BrowserSession", "url cookies local_storage")):
+    """The page a logged-in browser was on, with its cookies and localStorage"""
+
+    __slots__ = ()
+
+    @property
+    def origin(self):
+        """scheme://host[:port] of the session's page"""
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_login_page(url):
+    """True when the app sent the browser to its login form"""
+    return "/login" in urlsplit(url).path
+
+
+def export_session(driver):
+    """BrowserSession of the driver's current page"""
+    return BrowserSession(driver.current_url,
+                          driver.get_cookies(),
+                          driver.execute_script(_READ_LOCAL_STORAGE) or {})
+
+
+def restore_session(driver, session, url=None, wait=None):
+    """
+    Load a BrowserSession into driver and open url (default: the session's
+    page). wait() is called once the page is requested, so a client-side
+    redirect to the login form has happened before the check. Returns False
+    when the app still asks for a login.
+    """
+    # Cookies and storage can only be set for the origin that is loaded
+    driver.get(session.origin + "/")
+    for cookie in session.cookies:
+        driver.add_cookie({key: cookie[key] for key in _COOKIE_FIELDS if key in cookie})
+    if session.local_storage:
+        driver.execute_script(_WRITE_LOCAL_STORAGE, session.local_storage)
+
+    driver.get(url or session.url)
+    if wait is not None:
+        wait()
+    return not is_login_page(driver.current_url)
@@ -5,13 +5,13 @@ Captures ALL assets from both RND and AI websites and identifies missing assets
 """
 
 import json
-import time
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from network_capture import NetworkCapture, wait_for_dom_stable
 
 class AssetComparator:
     def __init__(self, headless=False):
@@ -23,6 +23,8 @@ class AssetComparator:
         chrome_options.add_argument("--window-size=1920,1080")
 
         self.driver = webdriver.Chrome(options=chrome_options)
+        # Tracks in-flight requests so each step waits only until the page settles
+        self.network = NetworkCapture(self.driver, accept=None).start()
         self.driver.maximize_window()
         self.wait = WebDriverWait(self.driver, 15)
 
@@ -33,7 +35,7 @@ class AssetComparator:
         print(f"{'='*60}")
 
         self.driver.get(f"{url}/login")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         try:
             email_field = self.wait.until(
@@ -52,7 +54,7 @@ class AssetComparator:
             sign_in_button.click()
             print(f"✓ Clicked Sign In")
 
-            time.sleep(8)
+            self.network.wait_until_settled()
 
             current_url = self.driver.current_url
             if "dashboard" in current_url or "site" in current_url:
@@ -75,7 +77,7 @@ class AssetComparator:
                 EC.element_to_be_clickable((By.XPATH, "//a[contains(@href, '/assets') or contains(text(), 'Assets')]"))
             )
             assets_link.click()
-            time.sleep(3)
+            self.network.wait_until_settled()
             print(f"✓ Navigated to Assets page")
             return True
         except Exception as e:
@@ -84,7 +86,7 @@ class AssetComparator:
             current_url = self.driver.current_url
             base_url = current_url.split('/dashboard')[0] if '/dashboard' in current_url else current_url
             self.driver.get(f"{base_url}/assets")
-            time.sleep(3)
+            self.network.wait_until_settled()
             print(f"✓ Navigated to Assets page via URL")
             return True
 
@@ -94,7 +96,7 @@ class AssetComparator:
 
         try:
             # Wait for table to load
-            time.sleep(2)
+            self.network.wait_until_settled()
 
             # Strategy 1: Look for table rows with data-id or role="row"
             rows = self.driver.find_elements(By.CSS_SELECTOR,
@@ -177,14 +179,14 @@ class AssetComparator:
                 try:
                     dropdown = self.driver.find_element(By.CSS_SELECTOR, selector)
                     dropdown.click()
-                    time.sleep(1)
+                    wait_for_dom_stable(self.driver)
 
                     # Try to select 100
                     options = self.driver.find_elements(By.CSS_SELECTOR, "option, li[role='option']")
                     for option in options:
                         if '100' in option.text:
                             option.click()
-                            time.sleep(2)
+                            self.network.wait_until_settled()
                             print(f"✓ Set to {count} rows per page")
                             return True
                     break
@@ -233,7 +235,7 @@ class AssetComparator:
                     next_button = self.driver.find_element(By.CSS_SELECTOR, selector)
                     if next_button.is_enabled() and 'disabled' not in next_button.get_attribute('class'):
                         next_button.click()
-                        time.sleep(3)
+                        self.network.wait_until_settled()
                         return True
                 except:
                     continue
@@ -572,6 +574,7 @@ class AssetComparator:
     def close(self):
         """Close browser"""
         try:
+            self.network.stop()
             self.driver.quit()
         except:
             pass
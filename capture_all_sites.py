@@ -10,17 +10,24 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import Select
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from network_capture import NetworkCapture
+from site_pool import SitePool
+from browser_session import export_session
+from session_store import SessionStore
 import json
-import time
 import os
 from datetime import datetime
 
-def login_to_site(driver, base_url, username, password):
-    """Log in to the website"""
+def login_to_site(driver, network, base_url, username, password):
+    """Log in to the website, reusing the saved session when it is still valid"""
     print(f"\n🔐 Logging in to: {base_url}")
+    sessions = SessionStore()
+    if sessions.restore(driver, base_url, username, wait=network.wait_until_settled):
+        return True
     driver.get(base_url)
-    time.sleep(3)
+    network.wait_until_settled()
     
     try:
         email_field = WebDriverWait(driver, 10).until(
@@ -36,7 +43,8 @@ def login_to_site(driver, base_url, username, password):
         submit_button.click()
         
         print("⏳ Waiting for dashboard...")
-        time.sleep(5)
+        network.wait_until_settled()
+        sessions.save(export_session(driver), username)
         return True
         
     except TimeoutException:
@@ -92,12 +100,9 @@ def get_all_sites_from_dropdown(dropdown):
     return sites
 
 def capture_site_data(driver):
-    """Capture current site's data from the page"""
+    """Capture current site's data from the page (call once the page has settled)"""
     data = {}
     
-    # Wait for page to load
-    time.sleep(2)
-    
     # Try to find metric cards/values on the page
     # Common patterns for dashboard metrics
     patterns = [
@@ -151,8 +156,38 @@ def capture_site_data(driver):
     
     return data
 
-def capture_all_sites(base_url, username, password, output_dir="all_sites_capture"):
-    """Capture data for all sites in dropdown"""
+def capture_one_site(driver, network, site_name, output_dir):
+    """Select a site in the dropdown and capture its data and a screenshot"""
+    print(f"   Capturing: {site_name}")
+    
+    # Re-find the dropdown (page might have refreshed)
+    dropdown = find_site_dropdown(driver)
+    if not dropdown:
+        print(f"   ⚠️  Could not find dropdown, skipping {site_name}")
+        return None
+    
+    # Select this site
+    Select(dropdown).select_by_visible_text(site_name)
+    
+    # Wait for data to load
+    network.wait_until_settled()
+    
+    # Capture the data
+    site_data = capture_site_data(driver)
+    
+    if site_data:
+        print(f"   ✅ {site_name}: captured {len(site_data)} metrics: {list(site_data.keys())}")
+    else:
+        print(f"   ⚠️  {site_name}: no data captured")
+    
+    # Take screenshot
+    screenshot_path = os.path.join(output_dir, f"{site_name.replace(' ', '_')}.png")
+    driver.save_screenshot(screenshot_path)
+    
+    return site_data or None
+
+def capture_all_sites(base_url, username, password, output_dir="all_sites_capture", workers=1):
+    """Capture data for all sites in dropdown; workers > 1 adds parallel browsers"""
     
     print("\n" + "="*80)
     print("COMPREHENSIVE SITE-BY-SITE CAPTURE")
@@ -167,14 +202,16 @@ def capture_all_sites(base_url, username, password, output_dir="all_sites_captur
     chrome_options.add_argument('--window-size=1920,1080')
     
     driver = None
+    network = None
     all_sites_data = {}
     
     try:
         driver = webdriver.Chrome(options=chrome_options)
         driver.implicitly_wait(5)
+        network = NetworkCapture(driver, accept=None).start()
         
         # Login
-        if not login_to_site(driver, base_url, username, password):
+        if not login_to_site(driver, network, base_url, username, password):
             print("❌ Login failed, exiting")
             return None
         
@@ -198,44 +235,11 @@ def capture_all_sites(base_url, username, password, output_dir="all_sites_captur
         
         # Capture data for each site
         print(f"\n🔄 Capturing data for each site...\n")
+        os.makedirs(output_dir, exist_ok=True)
         
-        for i, site in enumerate(sites, 1):
-            site_name = site['name']
-            print(f"[{i}/{len(sites)}] Capturing: {site_name}")
-            
-            try:
-                # Re-find the dropdown (page might have refreshed)
-                dropdown = find_site_dropdown(driver)
-                if not dropdown:
-                    print(f"   ⚠️  Could not find dropdown, skipping")
-                    continue
-                
-                # Select this site
-                from selenium.webdriver.support.ui import Select
-                select = Select(dropdown)
-                select.select_by_visible_text(site_name)
-                
-                # Wait for data to load
-                time.sleep(3)
-                
-                # Capture the data
-                site_data = capture_site_data(driver)
-                
-                if site_data:
-                    all_sites_data[site_name] = site_data
-                    print(f"   ✅ Captured {len(site_data)} metrics: {list(site_data.keys())}")
-                else:
-                    print(f"   ⚠️  No data captured")
-                
-                # Take screenshot
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                os.makedirs(output_dir, exist_ok=True)
-                screenshot_path = os.path.join(output_dir, f"{site_name.replace(' ', '_')}.png")
-                driver.save_screenshot(screenshot_path)
-                
-            except Exception as e:
-                print(f"   ❌ Error capturing {site_name}: {e}")
-                continue
+        all_sites_data = SitePool(workers).capture(
+            driver, network, [site['name'] for site in sites],
+            lambda driver, network, site_name: capture_one_site(driver, network, site_name, output_dir))
         
         # Save all data
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -274,6 +278,8 @@ def capture_all_sites(base_url, username, password, output_dir="all_sites_captur
         return None
         
     finally:
+        if network:
+            network.stop()
         if driver:
             driver.quit()
 
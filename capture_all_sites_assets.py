@@ -10,12 +10,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.options import Options
-import time
+from network_capture import NetworkCapture, wait_for_dom_stable
 import re
 import json
 import os
 
-def login(driver, username, password):
+def login(driver, network, username, password):
     print("🔐 Auto-logging in...")
     try:
         try:
@@ -36,14 +36,14 @@ def login(driver, username, password):
             password_field.send_keys(Keys.RETURN)
         except:
             email.send_keys(Keys.RETURN)
-            time.sleep(2)
+            network.wait_until_settled()
             password_field = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "password")))
             password_field.send_keys(password)
             password_field.send_keys(Keys.RETURN)
             
         print("⏳ Waiting for dashboard...")
         WebDriverWait(driver, 20).until(EC.url_contains("dashboard"))
-        time.sleep(5)
+        network.wait_until_settled()
     except Exception as e:
         print(f"⚠️ Login flow note: {e}")
 
@@ -65,7 +65,7 @@ def get_all_sites(driver):
         for trigger in header_triggers:
             try:
                 trigger.click()
-                time.sleep(1)
+                wait_for_dom_stable(driver)
                 # Check if a list appeared
                 options = driver.find_elements(By.CSS_SELECTOR, "[role='option'], .dropdown-item, .select-option")
                 if len(options) > 1:
@@ -92,7 +92,7 @@ def get_all_sites(driver):
         
     return list(set(sites))
 
-def select_site_via_dropdown(driver, site_name):
+def select_site_via_dropdown(driver, network, site_name):
     """Select a site from the autocomplete dropdown.
     Uses explicit waits for the dropdown button and the list option.
     """
@@ -107,8 +107,8 @@ def select_site_via_dropdown(driver, site_name):
             EC.element_to_be_clickable((By.XPATH, f"//li[normalize-space(.)='{site_name}']"))
         )
         option.click()
-        # Give the page a moment to load the new site data
-        time.sleep(4)
+        # Wait until the page has loaded the new site data
+        network.wait_until_settled()
         print(f"✅ Site '{site_name}' selected via dropdown")
         return True
     except Exception as e:
@@ -118,7 +118,7 @@ def select_site_via_dropdown(driver, site_name):
 # Replace calls to select_site with select_site_via_dropdown throughout the script
 
 
-def navigate_to_assets(driver):
+def navigate_to_assets(driver, network):
     # Same as before
     xpath_options = ["//span[contains(text(), 'Assets')]", "//div[contains(text(), 'Assets')]"]
     for xpath in xpath_options:
@@ -127,13 +127,13 @@ def navigate_to_assets(driver):
             for el in elements:
                 if el.is_displayed():
                     el.click()
-                    time.sleep(5)
+                    network.wait_until_settled()
                     return True
         except:
             continue
     return False
 
-def capture_site_data(driver, site_name):
+def capture_site_data(driver, network, site_name):
     print(f"📸 Capturing data for {site_name}...")
     
     # 1. Select Site
@@ -142,7 +142,7 @@ def capture_site_data(driver, site_name):
         print(f"⚠️ Warning: '{site_name}' text not found on page. Might be on wrong site.")
         
     # 2. Go to Assets
-    navigate_to_assets(driver)
+    navigate_to_assets(driver, network)
     
     # 3. Capture
     text = driver.find_element(By.TAG_NAME, "body").text
@@ -182,6 +182,8 @@ def main():
     chrome_options.add_argument('--disable-dev-shm-usage')
     
     driver = webdriver.Chrome(options=chrome_options)
+    # Tracks in-flight requests so each step waits only until the page settles
+    network = NetworkCapture(driver, accept=None).start()
     
     results = {}
     
@@ -191,7 +193,7 @@ def main():
         print("PHASE 1: RND Website")
         print("="*60)
         driver.get("https://acme.egalvanic-rnd.com")
-        login(driver, username, password)
+        login(driver, network, username, password)
         
         # Get list of sites (hardcoded for reliability if auto-detect fails)
         sites = ["Super Caremark", "Site657", "All Facilities"] 
@@ -200,11 +202,11 @@ def main():
         rnd_data = {}
         for site in sites:
             # Use automated dropdown selection
-            if not select_site_via_dropdown(driver, site):
+            if not select_site_via_dropdown(driver, network, site):
                 print(f"⚠️ Falling back to manual selection for {site}")
                 input("   Press Enter after you manually select the site...")
             
-            count, text = capture_site_data(driver, site)
+            count, text = capture_site_data(driver, network, site)
             names = extract_names(text)
             rnd_data[site] = {'count': count, 'names': names}
             print(f"✅ {site}: {count} assets")
@@ -214,16 +216,16 @@ def main():
         print("PHASE 2: AI Website")
         print("="*60)
         driver.get("https://acme.egalvanic.ai")
-        login(driver, username, password)
+        login(driver, network, username, password)
         
         ai_data = {}
         for site in sites:
             # Use automated dropdown selection
-            if not select_site_via_dropdown(driver, site):
+            if not select_site_via_dropdown(driver, network, site):
                 print(f"⚠️ Falling back to manual selection for {site}")
                 input("   Press Enter after you manually select the site...")
             
-            count, text = capture_site_data(driver, site)
+            count, text = capture_site_data(driver, network, site)
             names = extract_names(text)
             ai_data[site] = {'count': count, 'names': names}
             print(f"✅ {site}: {count} assets")
@@ -252,6 +254,7 @@ def main():
                 print(f"   ➖ Missing: {', '.join(list(missing)[:5])}" + ("..." if len(missing)>5 else ""))
 
     finally:
+        network.stop()
         driver.quit()
 
 if __name__ == "__main__":
@@ -1,14 +1,12 @@
 import json
 import os
-import time
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from network_capture import NetworkCapture
+from session_store import chrome_driver
 
 def capture_all_tabs_data():
     """Capture data from all tabs/pages of the ACME website"""
@@ -31,12 +29,11 @@ def capture_all_tabs_data():
     # Remove headless mode so we can see what's happening
     # chrome_options.add_argument("--headless")
     
-    # Enable performance logging
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    # Setup ChromeDriver automatically (the path is looked up once, then cached)
+    driver = chrome_driver(chrome_options)
     
-    # Setup ChromeDriver automatically
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Collect API response bodies as they finish loading
+    network = NetworkCapture(driver)
     
     captured_data = {
         "metadata": {
@@ -51,11 +48,12 @@ def capture_all_tabs_data():
     
     try:
         print("=== STARTING COMPREHENSIVE TAB DATA CAPTURE ===")
+        network.start()
         
         # Step 1: Login
         print("Step 1: Logging in...")
         driver.get(f"{BASE_URL}/login")
-        time.sleep(2)
+        network.wait_until_settled()
         
         # Enter credentials
         driver.find_element(By.NAME, "email").send_keys(EMAIL)
@@ -67,7 +65,7 @@ def capture_all_tabs_data():
             EC.url_contains("/dashboard")
         )
         print("✓ Login successful")
-        time.sleep(3)
+        network.wait_until_settled()
         
         # Step 2: Navigate to each tab/page and capture data
         tabs_to_visit = [
@@ -93,7 +91,7 @@ def capture_all_tabs_data():
             
             # Navigate to the tab
             driver.get(f"{BASE_URL}{tab_url}")
-            time.sleep(4)  # Wait for page to load and API calls to complete
+            network.wait_until_settled()  # Page loaded and API calls completed
             
             # Take screenshot
             screenshot_name = f"screenshot_{i+1}_{tab_name}.png"
@@ -145,7 +143,7 @@ def capture_all_tabs_data():
                         
                         # Click the element
                         element.click()
-                        time.sleep(1)
+                        network.wait_until_settled()
                         clicked_elements += 1
                         
                         # Take screenshot after clicking
@@ -161,72 +159,37 @@ def capture_all_tabs_data():
                 
                 if clicked_elements > 0:
                     print(f"  ✓ Clicked {clicked_elements} interactive elements")
-                    # Wait a bit more for any API calls triggered by clicks
-                    time.sleep(2)
                     
             except Exception as e:
                 print(f"  ✗ Error clicking interactive elements: {str(e)}")
         
         # Step 3: Capture network logs (API responses)
         print(f"\nStep {len(tabs_to_visit)+2}: Capturing network logs...")
-        logs = driver.get_log('performance')
-        
-        for log in logs:
-            try:
-                message = json.loads(log['message'])
-                
-                if (message['message']['method'] == 'Network.responseReceived' and 
-                    'response' in message['message']['params']):
-                    
-                    response = message['message']['params']['response']
-                    url = response['url']
-                    
-                    # Filter for API endpoints
-                    if ('/api/' in url.lower() or 'json' in response.get('mimeType', '').lower()) and response['status'] == 200:
-                        try:
-                            # Enable Network domain to get response bodies
-                            driver.execute_cdp_cmd('Network.enable', {})
-                            
-                            # Get response body
-                            result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': message['message']['params']['requestId']})
-                            response_body = result.get('body', '')
-                            
-                            # Parse JSON if possible
-                            try:
-                                if result.get('base64Encoded', False):
-                                    import base64
-                                    response_body = base64.b64decode(response_body).decode('utf-8')
-                                
-                                parsed_body = json.loads(response_body)
-                                response_body = parsed_body
-                            except:
-                                pass  # Keep as string if not JSON
-                            
-                            api_entry = {
-                                'url': url,
-                                'status': response['status'],
-                                'mimeType': response.get('mimeType', ''),
-                                'timestamp': log['timestamp'],
-                                'response': response_body
-                            }
-                            
-                            captured_data["api_responses"].append(api_entry)
-                            api_response_count += 1
-                            
-                            # Save individual response to file
-                            filename = f"api_response_{api_response_count}.json"
-                            filepath = os.path.join(output_dir, filename)
-                            
-                            with open(filepath, 'w') as f:
-                                json.dump(api_entry, f, indent=2, default=str)
-                            
-                            print(f"  ✓ API response saved: {filename}")
-                            
-                        except Exception as e:
-                            print(f"  ✗ Could not get response body for {url}: {str(e)}")
-                            
-            except Exception as e:
-                continue  # Skip malformed log entries
+        for entry in network.take():
+            url = entry['url']
+            if 'error' in entry:
+                print(f"  ✗ Could not get response body for {url}: {entry['error']}")
+                continue
+            
+            api_entry = {
+                'url': url,
+                'status': entry['status'],
+                'mimeType': entry['mimeType'],
+                'timestamp': entry['timestamp'],
+                'response': entry['response']
+            }
+            
+            captured_data["api_responses"].append(api_entry)
+            api_response_count += 1
+            
+            # Save individual response to file
+            filename = f"api_response_{api_response_count}.json"
+            filepath = os.path.join(output_dir, filename)
+            
+            with open(filepath, 'w') as f:
+                json.dump(api_entry, f, indent=2, default=str)
+            
+            print(f"  ✓ API response saved: {filename}")
         
         print(f"\nStep {len(tabs_to_visit)+3}: Finalizing capture...")
         
@@ -264,6 +227,7 @@ def capture_all_tabs_data():
         raise
         
     finally:
+        network.stop()
         driver.quit()
 
 if __name__ == "__main__":
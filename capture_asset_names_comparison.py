@@ -4,7 +4,6 @@ Asset Names Comparison - Captures actual asset names and identifies missing ones
 """
 
 import json
-import time
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -12,6 +11,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from network_capture import NetworkCapture, wait_for_dom_stable
 
 class AssetNameComparator:
     def __init__(self, headless=False):
@@ -23,6 +23,8 @@ class AssetNameComparator:
         chrome_options.add_argument("--window-size=1920,1080")
 
         self.driver = webdriver.Chrome(options=chrome_options)
+        # Tracks in-flight requests so each step waits only until the page settles
+        self.network = NetworkCapture(self.driver, accept=None).start()
         self.driver.maximize_window()
         self.wait = WebDriverWait(self.driver, 20)
 
@@ -33,7 +35,7 @@ class AssetNameComparator:
         print(f"{'='*70}")
 
         self.driver.get(f"{url}/login")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         try:
             email_field = self.wait.until(
@@ -52,7 +54,7 @@ class AssetNameComparator:
             sign_in_button.click()
             print(f"✓ Clicked Sign In")
 
-            time.sleep(8)
+            self.network.wait_until_settled()
 
             current_url = self.driver.current_url
             if "dashboard" in current_url or "site" in current_url:
@@ -72,7 +74,7 @@ class AssetNameComparator:
 
         try:
             # Wait a moment for dashboard to fully load
-            time.sleep(3)
+            self.network.wait_until_settled()
 
             # Try multiple selectors for Assets link
             selectors = [
@@ -88,7 +90,7 @@ class AssetNameComparator:
                         EC.element_to_be_clickable((By.XPATH, selector))
                     )
                     assets_link.click()
-                    time.sleep(4)
+                    self.network.wait_until_settled()
                     print(f"✓ Clicked Assets tab")
                     return True
                 except:
@@ -99,7 +101,7 @@ class AssetNameComparator:
             current_url = self.driver.current_url
             base_url = current_url.split('/dashboard')[0] if '/dashboard' in current_url else current_url.split('/site')[0]
             self.driver.get(f"{base_url}/assets")
-            time.sleep(4)
+            self.network.wait_until_settled()
             print(f"✓ Navigated to Assets page via URL")
             return True
 
@@ -110,7 +112,7 @@ class AssetNameComparator:
     def get_total_assets_count(self):
         """Get total asset count from pagination"""
         try:
-            time.sleep(2)
+            self.network.wait_until_settled()
             # Look for pagination text like "1-25 of 179"
             pagination_elements = self.driver.find_elements(By.XPATH,
                 "//*[contains(text(), 'of') and contains(text(), '–')]")
@@ -140,12 +142,12 @@ class AssetNameComparator:
                 try:
                     dropdown = self.driver.find_element(By.XPATH, selector)
                     dropdown.click()
-                    time.sleep(1)
+                    wait_for_dom_stable(self.driver)
 
                     # Select 100 option
                     option = self.driver.find_element(By.XPATH, f"//li[@data-value='{rows}' or contains(text(), '{rows}')]")
                     option.click()
-                    time.sleep(2)
+                    self.network.wait_until_settled()
                     print(f"✓ Set to {rows} rows per page\n")
                     return True
                 except:
@@ -161,7 +163,7 @@ class AssetNameComparator:
         asset_names = []
 
         try:
-            time.sleep(2)
+            self.network.wait_until_settled()
 
             # Strategy 1: Look for table cells in first column
             # First column typically contains asset names
@@ -212,7 +214,7 @@ class AssetNameComparator:
 
             if next_button.is_enabled() and 'disabled' not in next_button.get_attribute('class').lower():
                 next_button.click()
-                time.sleep(3)
+                self.network.wait_until_settled()
                 return True
 
         except:
@@ -463,6 +465,7 @@ class AssetNameComparator:
     def close(self):
         """Close browser"""
         try:
+            self.network.stop()
             self.driver.quit()
         except:
             pass
@@ -12,9 +12,9 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException
 import json
-import time
 import os
 from datetime import datetime
+from network_capture import NetworkCapture
 
 def capture_dashboard_data(base_url, username, password, output_dir="dashboard_capture"):
     """Capture dashboard data showing all sites"""
@@ -34,19 +34,21 @@ def capture_dashboard_data(base_url, username, password, output_dir="dashboard_c
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     
-    # Enable performance logging to capture network requests
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-    
     driver = None
+    network = None
     api_responses = []
     
     try:
         driver = webdriver.Chrome(options=chrome_options)
         driver.implicitly_wait(10)
         
+        # Only our API endpoints, fetched as each response finishes
+        network = NetworkCapture(driver, accept=lambda response: (
+            '/api/' in response['url'] and response['mimeType'] == 'application/json')).start()
+        
         print(f"\n📱 Navigating to: {base_url}")
         driver.get(base_url)
-        time.sleep(3)
+        network.wait_until_settled()
         
         # Login
         print(f"🔐 Logging in as: {username}")
@@ -63,7 +65,7 @@ def capture_dashboard_data(base_url, username, password, output_dir="dashboard_c
             submit_button.click()
             
             print("⏳ Waiting for dashboard to load...")
-            time.sleep(5)
+            network.wait_until_settled()
             
         except TimeoutException:
             print("⚠️  No login form found - might already be logged in or different flow")
@@ -79,39 +81,16 @@ def capture_dashboard_data(base_url, username, password, output_dir="dashboard_c
         
         # Capture network logs
         print("\n📡 Capturing API responses...")
-        logs = driver.get_log('performance')
-        
-        for entry in logs:
-            try:
-                log = json.loads(entry['message'])['message']
-                
-                # Look for network responses
-                if log['method'] == 'Network.responseReceived':
-                    response_url = log['params']['response']['url']
-                    
-                    # Filter for API responses
-                    if '/api/' in response_url and log['params']['response']['mimeType'] == 'application/json':
-                        request_id = log['params']['requestId']
-                        
-                        # Try to get response body
-                        try:
-                            response_body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                            body = json.loads(response_body['body'])
-                            
-                            api_responses.append({
-                                'url': response_url,
-                                'timestamp': log['params']['timestamp'],
-                                'response': body
-                            })
-                            
-                            print(f"  ✓ Captured: {response_url}")
-                            
-                        except Exception as e:
-                            # Response body might not be available for all requests
-                            pass
-                            
-            except Exception as e:
+        for entry in network.take():
+            # Response body might not be available for all requests
+            if 'error' in entry:
                 continue
+            api_responses.append({
+                'url': entry['url'],
+                'timestamp': entry['event_timestamp'],
+                'response': entry['response']
+            })
+            print(f"  ✓ Captured: {entry['url']}")
         
         # Save API responses
         output_file = os.path.join(output_path, "dashboard_data.json")
@@ -142,6 +121,8 @@ def capture_dashboard_data(base_url, username, password, output_dir="dashboard_c
         return None
         
     finally:
+        if network:
+            network.stop()
         if driver:
             driver.quit()
 
@@ -12,9 +12,11 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
 import json
+import re
 import time
 import os
 from datetime import datetime
+from network_capture import NetworkCapture
 
 def simple_capture(url, username, password, output_name):
     """Simple capture with better error handling"""
@@ -27,14 +29,18 @@ def simple_capture(url, username, password, output_name):
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
     
     driver = webdriver.Chrome(options=chrome_options)
     
+    # API calls with JSON (or plain-text JSON) bodies, fetched as each finishes
+    network = NetworkCapture(driver, accept=lambda response: '/api/' in response['url'] and (
+        'json' in response.get('mimeType', '') or 'text/plain' in response.get('mimeType', '')))
+    
     try:
+        network.start()
         driver.get(url)
         print(f"✅ Loaded: {url}")
-        time.sleep(3)
+        network.wait_until_settled()
         
         # Try to log in
         try:
@@ -60,12 +66,12 @@ def simple_capture(url, username, password, output_name):
             password_field.send_keys(Keys.RETURN)
             
             print("🔐 Login submitted, waiting for dashboard...")
-            time.sleep(15)  # Generous wait for login redirect
+            network.wait_until_settled()  # Wait for login redirect
             
             # FORCE RELOAD to ensure we capture the initial dashboard load API calls
             print("🔄 Refreshing page to capture dashboard load...")
             driver.refresh()
-            time.sleep(10)
+            network.wait_until_settled()
             
         except Exception as e:
             print(f"⚠️  Login flow: {e}")
@@ -73,46 +79,22 @@ def simple_capture(url, username, password, output_name):
         
         # Capture network logs
         print("📡 Capturing API responses...")
-        logs = driver.get_log('performance')
-        
         api_responses = []
         sites_data = {}
         
-        # We need to filter logs carefully
-        for entry in logs:
-            try:
-                log = json.loads(entry['message'])['message']
-                
-                if log['method'] == 'Network.responseReceived':
-                    response = log['params']['response']
-                    response_url = response['url']
-                    
-                    # Capture ALL API calls that might contain data
-                    if '/api/' in response_url:
-                        request_id = log['params']['requestId']
-                        
-                        try:
-                            # Only try to get body for JSON responses
-                            if 'json' in response.get('mimeType', '') or 'text/plain' in response.get('mimeType', ''):
-                                body = driver.execute_cdp_cmd('Network.getResponseBody', {
-                                    'requestId': request_id
-                                })
-                                
-                                data = json.loads(body['body'])
-                                api_responses.append({
-                                    'url': response_url,
-                                    'response': data
-                                })
-                                
-                                # Extract endpoint name
-                                import re
-                                endpoint = re.sub(r'https?://[^/]+', '', response_url)
-                                endpoint = re.sub(r'\?.*', '', endpoint)
-                                print(f"  ✓ {endpoint}")
-                        except:
-                            pass
-            except:
+        for entry in network.take():
+            # Bodies that could not be fetched or are not JSON are left out
+            if 'error' in entry or isinstance(entry['response'], str):
                 continue
+            api_responses.append({
+                'url': entry['url'],
+                'response': entry['response']
+            })
+            
+            # Extract endpoint name
+            endpoint = re.sub(r'https?://[^/]+', '', entry['url'])
+            endpoint = re.sub(r'\?.*', '', endpoint)
+            print(f"  ✓ {endpoint}")
         
         # Try to extract sites data
         for resp in api_responses:
@@ -151,6 +133,7 @@ def simple_capture(url, username, password, output_name):
         return output_name
         
     finally:
+        network.stop()
         driver.quit()
 
 def main():
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+CAPTURE STREAM
+Incremental reader for capture files (complete_capture.json and friends).
+
+json.load() on a multi-hundred-MB capture holds the whole document (several
+times its file size) in memory before the first comparison starts. This
+reader tokenizes the file a chunk at a time instead:
+- CaptureFile.iter_responses() yields the api_responses entries one by one
+- CaptureFile.iter_indexed() also yields where each entry sits in the file,
+  as a CaptureEntryRef that can load that single entry again later
+- CaptureFile.metadata() reads only the top-level "metadata" object
+- CaptureFile.sections() decodes every top-level section but api_responses
+
+Peak memory is bounded by the largest single entry, not by the whole capture.
+Values are decoded with the C JSON decoder (json.JSONDecoder.raw_decode);
+only the top-level object and the api_responses array are walked here.
+
+CaptureIndex goes one step further for captures that are analysed more than
+once: it writes a sidecar index (complete_capture.json.index.json) mapping
+every entry's endpoint, status and response content hash to its byte range,
+and decodes entries on demand from an mmap of the capture. Reopening an
+indexed capture reads the small index file instead of parsing the capture.
+"""
+
+import codecs
+import json
+import mmap
+import os
+from collections import namedtuple, OrderedDict
+from collections.abc import Sequence
+from endpoint_matcher import endpoint_template, response_content_hash
+
+# Capture file names, in the order the comparators look for them
+CAPTURE_FILE_NAMES = ("complete_capture.json", "complete_tab_capture.json", "api_capture.json")
+
+# Bytes read from disk at a time
+CHUNK_SIZE = 1024 * 1024
+
+# Sidecar index written next to a capture file
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 2
+
+# Decoded entries a CaptureIndex keeps for repeated lookups (by encoded size)
+INDEX_CACHE_BYTES = 64 * 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+# Stands for an array section CaptureFile.sections() left in the file
+LAZY_ARRAY = object()
+
+
+class CaptureEntryRef(namedtuple("CaptureEntryRef", "capture_file offset length url")):
+    """Byte range of one api_responses entry inside a capture file (plus its url)"""
+
+    __slots__ = ()
+
+    def load(self):
+        """Decode just this entry from the capture file"""
+        return load_capture_entry(self.capture_file, self.offset, self.length)
+
+
+def load_capture_entry(capture_file, offset, length):
+    """Decode the JSON value stored at [offset, offset + length) of a capture file"""
+    with open(capture_file, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+
+class JsonTokenizer:
+    """
+    Pulls JSON values out of a binary file a piece at a time, tracking the
+    byte offset of every value it decodes.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._pos = 0
+        # Byte offset of self._buffer[self._mark] in the file; offsets are
+        # counted forward from the last mark so each character is encoded once
+        self._mark = 0
+        self._mark_offset = 0
+        self._eof = False
+        # A UTF-8 BOM is not part of the JSON text, but its bytes still come
+        # before every offset
+        head = f.read(len(codecs.BOM_UTF8))
+        if head == codecs.BOM_UTF8:
+            self._mark_offset = len(head)
+            head = b""
+        self._buffer = self._utf8.decode(head)
+
+    def _byte_offset(self, pos):
+        """Byte offset of self._buffer[pos] (pos must not be before the mark)"""
+        if pos != self._mark:
+            text = self._buffer[self._mark:pos]
+            self._mark_offset += len(text) if text.isascii() else len(text.encode('utf-8'))
+            self._mark = pos
+        return self._mark_offset
+
+    def _fill(self, min_chars=1):
+        """Drop consumed text and read until at least min_chars more characters are buffered (or EOF)"""
+        if self._pos:
+            self._byte_offset(self._pos)
+            self._buffer = self._buffer[self._pos:]
+            self._pos = self._mark = 0
+        wanted = len(self._buffer) + min_chars
+        while len(self._buffer) < wanted and not self._eof:
+            chunk = self._file.read(max(self._chunk_size, min_chars))
+            if not chunk:
+                self._eof = True
+                self._buffer += self._utf8.decode(b"", final=True)
+            else:
+                self._buffer += self._utf8.decode(chunk)
+
+    def peek(self):
+        """Next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            buffer, pos = self._buffer, self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if self._eof:
+                return ""
+            self._fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at byte {self.offset()}, found {found or 'end of file'!r}")
+        self._pos += 1
+
+    def offset(self):
+        """Byte offset of the current position"""
+        return self._byte_offset(self._pos)
+
+    def value(self):
+        """Decode the next value. Returns (value, byte_offset, byte_length)."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+                # A number ending exactly at the buffer end may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    break
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Grow geometrically so a large value is re-scanned O(log n) times
+            self._fill(max(len(self._buffer), self._chunk_size))
+        start = self._byte_offset(self._pos)
+        self._pos = end
+        return value, start, self._byte_offset(end) - start
+
+    def iter_object(self):
+        """
+        Walk an object, yielding its keys. The caller must consume each key's
+        value (value(), iter_array() or skip_value()) before resuming.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()[0]
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' at byte {self.offset()}")
+
+    def iter_array(self):
+        """Walk an array, yielding (value, byte_offset, byte_length) per element"""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' at byte {self.offset()}")
+
+    def skip_value(self):
+        """Consume the next value; arrays are skipped element by element"""
+        if self.peek() == "[":
+            for _ in self.iter_array():
+                pass
+        else:
+            self.value()
+
+
+class CaptureFile:
+    """A capture JSON file read incrementally"""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def find(cls, directory, names=CAPTURE_FILE_NAMES):
+        """The first capture file present in directory, or None"""
+        for name in names:
+            capture_file = os.path.join(directory, name)
+            if os.path.exists(capture_file):
+                return cls(capture_file)
+        return None
+
+    @property
+    def size(self):
+        """File size in bytes"""
+        return os.path.getsize(self.path)
+
+    def _iter_sections(self):
+        """Yield (key, tokenizer) for every top-level key; the value is left to the caller"""
+        with open(self.path, 'rb') as f:
+            tokenizer = JsonTokenizer(f, self.chunk_size)
+            for key in tokenizer.iter_object():
+                yield key, tokenizer
+
+    def metadata(self):
+        """The top-level "metadata" object, read without decoding api_responses"""
+        for key, tokenizer in self._iter_sections():
+            if key == "metadata":
+                return tokenizer.value()[0]
+            tokenizer.skip_value()
+        return {}
+
+    def sections(self, lazy=("api_responses",)):
+        """
+        The top-level object, decoded one section at a time. Sections named
+        in lazy that hold an array are skipped and map to LAZY_ARRAY; read
+        those with iter_responses() or a CaptureIndex.
+        """
+        sections = {}
+        for key, tokenizer in self._iter_sections():
+            if key in lazy and tokenizer.peek() == "[":
+                tokenizer.skip_value()
+                sections[key] = LAZY_ARRAY
+            else:
+                sections[key] = tokenizer.value()[0]
+        return sections
+
+    def iter_indexed(self, key="api_responses"):
+        """Yield (entry, CaptureEntryRef) for every element of the top-level key array"""
+        for section, tokenizer in self._iter_sections():
+            if section != key:
+                tokenizer.skip_value()
+                continue
+            if tokenizer.peek() != "[":
+                tokenizer.skip_value()
+                continue
+            for entry, offset, length in tokenizer.iter_array():
+                url = entry.get('url') if isinstance(entry, dict) else None
+                yield entry, CaptureEntryRef(self.path, offset, length, url)
+            # Nothing else in the file is needed
+            return
+
+    def iter_responses(self, key="api_responses"):
+        """Yield the api_responses entries one at a time"""
+        for entry, _ in self.iter_indexed(key):
+            yield entry
+
+    def load(self):
+        """Decode the whole file (for callers that need every section at once)"""
+        with open(self.path, 'r', encoding='utf-8-sig') as f:
+            return json.load(f)
+
+
+class CaptureIndexEntry(namedtuple("CaptureIndexEntry", "endpoint status content_hash offset length url")):
+    """One api_responses entry in a capture index"""
+
+    __slots__ = ()
+
+
+class CaptureIndex(Sequence):
+    """
+    The api_responses of a capture, decoded one entry at a time from an
+    mmap of the file. Indexing and iteration return response dicts, so code
+    written for response lists reads from it unchanged.
+    """
+
+    def __init__(self, capture_file, entries, cache_bytes=INDEX_CACHE_BYTES):
+        self.capture_file = capture_file
+        self.entries = entries
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._by_endpoint = None
+        self._file = None
+        self._map = None
+
+    @staticmethod
+    def index_path(capture_file):
+        return capture_file + INDEX_SUFFIX
+
+    @staticmethod
+    def _signature(capture_file):
+        stat = os.stat(capture_file)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    @classmethod
+    def build(cls, capture_file, endpoint_key=endpoint_template, chunk_size=CHUNK_SIZE):
+        """Index a capture with one streaming pass"""
+        entries = []
+        endpoints = {None: None}
+        for entry, ref in CaptureFile(capture_file, chunk_size).iter_indexed():
+            url = ref.url if isinstance(ref.url, str) else None
+            if url not in endpoints:
+                endpoints[url] = endpoint_key(url)
+            status = entry.get('status') if isinstance(entry, dict) else None
+            entries.append(CaptureIndexEntry(
+                endpoints[url],
+                status,
+                response_content_hash(entry),
+                ref.offset,
+                ref.length,
+                url
+            ))
+        return cls(capture_file, entries)
+
+    @classmethod
+    def read(cls, capture_file):
+        """The sidecar index of capture_file, or None if it is missing or stale"""
+        try:
+            with open(cls.index_path(capture_file), 'r') as f:
+                data = json.load(f)
+            signature = cls._signature(capture_file)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION or data.get("capture") != signature:
+            return None
+        return cls(capture_file, [CaptureIndexEntry(*fields) for fields in data.get("entries", [])])
+
+    def write(self):
+        """Write the sidecar index. Returns False if it couldn't be written."""
+        index_file = self.index_path(self.capture_file)
+        data = {
+            "version": INDEX_VERSION,
+            "capture": self._signature(self.capture_file),
+            "fields": list(CaptureIndexEntry._fields),
+            "entries": [list(entry) for entry in self.entries],
+        }
+        try:
+            with open(index_file + ".tmp", 'w') as f:
+                f.write(json.dumps(data, separators=(',', ':')))
+            os.replace(index_file + ".tmp", index_file)
+        except OSError:
+            return False
+        return True
+
+    @classmethod
+    def open(cls, capture_file, endpoint_key=endpoint_template):
+        """
+        Read the sidecar index, building and writing it first if it is missing
+        or older than the capture. endpoint_key only applies when (re)building.
+        """
+        index = cls.read(capture_file)
+        if index is None:
+            index = cls.build(capture_file, endpoint_key)
+            index.write()
+        return index
+
+    @classmethod
+    def find(cls, directory, names=CAPTURE_FILE_NAMES):
+        """Open the index of the first capture file present in directory, or None"""
+        capture = CaptureFile.find(directory, names)
+        return cls.open(capture.path) if capture is not None else None
+
+    def _mapped(self):
+        if self._map is None:
+            self._file = open(self.capture_file, 'rb')
+            # mmap can't map an empty file, and an empty file has no entries to read
+            if os.fstat(self._file.fileno()).st_size == 0:
+                self._file.close()
+                self._file = None
+                raise ValueError(f"{self.capture_file} is empty, its index is out of date")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def load(self, entry):
+        """Decode one indexed entry (recently decoded entries are reused)"""
+        cached = self._cache.get(entry.offset)
+        if cached is not None:
+            self._cache.move_to_end(entry.offset)
+            return cached[0]
+        value = json.loads(self._mapped()[entry.offset:entry.offset + entry.length])
+        if entry.length <= self.cache_bytes:
+            self._cache[entry.offset] = (value, entry.length)
+            self._cached_bytes += entry.length
+            while self._cached_bytes > self.cache_bytes:
+                _, (_, length) = self._cache.popitem(last=False)
+                self._cached_bytes -= length
+        return value
+
+    def ref(self, entry):
+        """CaptureEntryRef for an entry (picklable; loads it without this index)"""
+        return CaptureEntryRef(self.capture_file, entry.offset, entry.length, entry.url)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.load(entry) for entry in self.entries[index]]
+        return self.load(self.entries[index])
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield self.load(entry)
+
+    def by_endpoint(self):
+        """{endpoint: [entries]} in file order"""
+        if self._by_endpoint is None:
+            self._by_endpoint = {}
+            for entry in self.entries:
+                self._by_endpoint.setdefault(entry.endpoint, []).append(entry)
+        return self._by_endpoint
+
+    def lookup(self, endpoint, status=None, content_hash=None):
+        """Entries for an endpoint, optionally narrowed by status and content hash"""
+        return [entry for entry in self.by_endpoint().get(endpoint, [])
+                if (status is None or entry.status == status)
+                and (content_hash is None or entry.content_hash == content_hash)]
+
+    def close(self):
+        self._cache.clear()
+        self._cached_bytes = 0
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,11 +1,9 @@
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from session_store import chrome_driver
 
 def check_login():
     """Check if we can log in with the provided credentials"""
@@ -22,9 +20,8 @@ def check_login():
     chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.add_argument("--headless")  # Run in headless mode
     
-    # Setup ChromeDriver automatically
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Setup ChromeDriver automatically (the path is looked up once, then cached)
+    driver = chrome_driver(chrome_options)
     
     try:
         print("=== LOGIN CREDENTIALS CHECK ===")
@@ -3,7 +3,6 @@ Complete Asset Comparison Script
 Captures all assets from both RND and AI websites and generates a detailed comparison report
 """
 
-import time
 import json
 from datetime import datetime
 from selenium import webdriver
@@ -12,6 +11,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.options import Options
+from network_capture import NetworkCapture, wait_for_dom_stable
 import sys
 
 class AssetComparator:
@@ -28,6 +28,8 @@ class AssetComparator:
         # Remove headless mode to allow login
         # options.add_argument('--headless')
         self.driver = webdriver.Chrome(options=options)
+        # Tracks in-flight requests so each step waits only until the page settles
+        self.network = NetworkCapture(self.driver, accept=None).start()
         self.driver.maximize_window()
 
     def login(self, url, email, password):
@@ -37,7 +39,7 @@ class AssetComparator:
         print(f"{'='*60}")
 
         self.driver.get(f"{url}/login")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         try:
             # Wait for email field
@@ -60,7 +62,7 @@ class AssetComparator:
             print(f"✓ Clicked Sign In")
 
             # Wait for dashboard to load
-            time.sleep(8)
+            self.network.wait_until_settled()
 
             # Check if we're on dashboard
             current_url = self.driver.current_url
@@ -85,14 +87,14 @@ class AssetComparator:
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='site-selector'], .site-selector, button:has-text('Site')"))
             )
             site_selector.click()
-            time.sleep(2)
+            wait_for_dom_stable(self.driver)
 
             # Find and click the specific site
             site_option = WebDriverWait(self.driver, 10).until(
                 EC.element_to_be_clickable((By.XPATH, f"//div[contains(text(), '{site_name}')] | //li[contains(text(), '{site_name}')] | //span[contains(text(), '{site_name}')]"))
             )
             site_option.click()
-            time.sleep(3)
+            self.network.wait_until_settled()
             print(f"✓ Selected site: {site_name}")
             return True
 
@@ -110,7 +112,7 @@ class AssetComparator:
                 EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Assets')] | //nav//span[contains(text(), 'Assets')]"))
             )
             assets_link.click()
-            time.sleep(3)
+            self.network.wait_until_settled()
             print(f"✓ Navigated to Assets page")
             return True
 
@@ -122,7 +124,7 @@ class AssetComparator:
             assets_url = f"{base_url}/assets"
             print(f"  Trying direct URL: {assets_url}")
             self.driver.get(assets_url)
-            time.sleep(3)
+            self.network.wait_until_settled()
             return True
 
     def get_total_asset_count(self):
@@ -145,12 +147,12 @@ class AssetComparator:
             # Click on rows per page dropdown
             rows_dropdown = self.driver.find_element(By.XPATH, "//select[contains(@aria-label, 'Rows per page')] | //*[contains(text(), 'Rows per page')]/following-sibling::*")
             rows_dropdown.click()
-            time.sleep(1)
+            wait_for_dom_stable(self.driver)
 
             # Select maximum rows
             max_option = self.driver.find_element(By.XPATH, f"//option[@value='{rows}'] | //li[contains(text(), '{rows}')]")
             max_option.click()
-            time.sleep(2)
+            self.network.wait_until_settled()
             print(f"✓ Set to {rows} rows per page")
             return True
 
@@ -164,7 +166,7 @@ class AssetComparator:
 
         try:
             # Wait for table to load
-            time.sleep(2)
+            self.network.wait_until_settled()
 
             # Find all asset rows
             rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr, [role='row']")
@@ -203,7 +205,7 @@ class AssetComparator:
 
             if next_button.is_enabled():
                 next_button.click()
-                time.sleep(2)
+                self.network.wait_until_settled()
                 return True
             else:
                 return False
@@ -603,7 +605,7 @@ class AssetComparator:
 
             # Capture RND assets
             self.driver.get(self.rnd_url)
-            time.sleep(3)
+            self.network.wait_until_settled()
 
             if not self.login(self.rnd_url, email, password):
                 print("✗ Failed to login to RND site")
@@ -617,7 +619,7 @@ class AssetComparator:
 
             # Capture AI assets
             self.driver.get(self.ai_url)
-            time.sleep(3)
+            self.network.wait_until_settled()
 
             if not self.login(self.ai_url, email, password):
                 print("✗ Failed to login to AI site")
@@ -666,6 +668,7 @@ class AssetComparator:
         finally:
             if self.driver:
                 print("\nClosing browser...")
+                self.network.stop()
                 self.driver.quit()
 
 
@@ -3,8 +3,11 @@ Complete All Sites Comparison Script
 Captures EVERY site and EVERY metric from both RND and AI websites
 """
 
+import copy
 import time
 import json
+import math
+from array import array
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -12,13 +15,23 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
+from network_capture import NetworkCapture, wait_for_dom_stable
 import sys
+from numeric_text import parse_card_values, card_number
+from site_pool import SitePool
+from browser_session import export_session
+from session_store import SessionStore
 
 class CompleteAllSitesComparator:
     def __init__(self):
         self.rnd_url = "https://acme.egalvanic-rnd.com"
         self.ai_url = "https://acme.egalvanic.ai"
         self.driver = None
+        self.network = None
+        # Browsers capturing sites in parallel (1: this browser only; opt in to more)
+        self.workers = 1
+        # Logins saved by earlier runs, reused while the API accepts them
+        self.sessions = SessionStore()
 
     def setup_driver(self):
         """Setup Chrome driver"""
@@ -27,16 +40,21 @@ class CompleteAllSitesComparator:
         options.add_argument('--disable-dev-shm-usage')
         options.add_argument('--window-size=1920,1080')
         self.driver = webdriver.Chrome(options=options)
+        # Tracks in-flight requests so each step waits only until the page settles
+        self.network = NetworkCapture(self.driver, accept=None).start()
         self.driver.maximize_window()
 
     def login(self, url, email, password):
-        """Login to website"""
+        """Login to website, reusing the saved session when it is still valid"""
         print(f"\n{'='*60}")
         print(f"Logging into: {url}")
         print(f"{'='*60}")
 
+        if self.sessions.restore(self.driver, url, email, wait=self.network.wait_until_settled):
+            return True
+
         self.driver.get(f"{url}/login")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         try:
             email_field = WebDriverWait(self.driver, 10).until(
@@ -55,8 +73,9 @@ class CompleteAllSitesComparator:
             sign_in_button.click()
             print(f"✓ Sign in clicked")
 
-            time.sleep(8)
+            self.network.wait_until_settled()
             print(f"✓ Login successful!")
+            self.sessions.save(export_session(self.driver), email)
             return True
 
         except Exception as e:
@@ -70,14 +89,14 @@ class CompleteAllSitesComparator:
         try:
             # Navigate to dashboard
             self.driver.get(f"{self.driver.current_url.split('/dashboard')[0]}/dashboard")
-            time.sleep(3)
+            self.network.wait_until_settled()
 
             # Click on site dropdown
             site_dropdown = WebDriverWait(self.driver, 10).until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, ".MuiAutocomplete-root input, [placeholder*='Select'], [placeholder*='facility']"))
             )
             site_dropdown.click()
-            time.sleep(2)
+            wait_for_dom_stable(self.driver)
 
             # Get all site options
             site_options = self.driver.find_elements(By.CSS_SELECTOR, ".MuiAutocomplete-option, [role='option'], li[data-option-index]")
@@ -90,7 +109,7 @@ class CompleteAllSitesComparator:
 
             # Close dropdown
             site_dropdown.send_keys(Keys.ESCAPE)
-            time.sleep(1)
+            wait_for_dom_stable(self.driver)
 
             print(f"✓ Found {len(sites)} sites: {sites}")
             return sites
@@ -125,24 +144,24 @@ class CompleteAllSitesComparator:
             dropdown = self.driver.find_element(By.CSS_SELECTOR, ".MuiAutocomplete-root input")
             dropdown.clear()
             dropdown.click()
-            time.sleep(1)
+            wait_for_dom_stable(self.driver)
 
             # Type site name
             dropdown.send_keys(site_name)
-            time.sleep(2)
+            self.network.wait_until_settled()
 
             # Click on the matching option
             options = self.driver.find_elements(By.CSS_SELECTOR, ".MuiAutocomplete-option, [role='option']")
             for option in options:
                 if site_name.lower() in option.text.lower():
                     option.click()
-                    time.sleep(3)
+                    self.network.wait_until_settled()
                     print(f"  ✓ Selected: {site_name}")
                     return True
 
             # Fallback - just press enter
             dropdown.send_keys(Keys.ENTER)
-            time.sleep(3)
+            self.network.wait_until_settled()
             print(f"  ✓ Selected: {site_name} (enter)")
             return True
 
@@ -151,7 +170,7 @@ class CompleteAllSitesComparator:
             return False
 
     def capture_dashboard_metrics(self, site_name):
-        """Capture all metrics from dashboard for a site"""
+        """Capture all metric card texts from dashboard for a site (parsed later by normalize_metrics)"""
         print(f"  📊 Capturing metrics for: {site_name}")
 
         metrics = {
@@ -171,7 +190,7 @@ class CompleteAllSitesComparator:
         }
 
         try:
-            time.sleep(2)
+            self.network.wait_until_settled()
 
             # Find all stat cards on dashboard
             stat_cards = self.driver.find_elements(By.CSS_SELECTOR, ".MuiBox-root")
@@ -183,48 +202,48 @@ class CompleteAllSitesComparator:
                     # Parse different metrics
                     if "Total Assets" in text:
                         value = text.split('\n')[-1]
-                        metrics["total_assets"] = self.parse_number(value)
+                        metrics["total_assets"] = value
 
                     elif "Unresolved Issues" in text:
                         value = text.split('\n')[-1]
-                        metrics["unresolved_issues"] = self.parse_number(value)
+                        metrics["unresolved_issues"] = value
 
                     elif "Pending Tasks" in text:
                         value = text.split('\n')[-1]
-                        metrics["pending_tasks"] = self.parse_number(value)
+                        metrics["pending_tasks"] = value
 
                     elif "Active Site Visits" in text or "Active Sessions" in text:
                         value = text.split('\n')[-1]
-                        metrics["active_sessions"] = self.parse_number(value)
-                        metrics["active_site_visits"] = self.parse_number(value)
+                        metrics["active_sessions"] = value
+                        metrics["active_site_visits"] = value
 
                     elif "Opportunities Value" in text:
                         value = text.split('\n')[-1]
-                        metrics["opportunities_value"] = self.parse_number(value)
+                        metrics["opportunities_value"] = value
 
                     elif "Equipment at Risk" in text:
                         value = text.split('\n')[-1]
-                        metrics["equipment_at_risk"] = self.parse_number(value)
+                        metrics["equipment_at_risk"] = value
 
                     elif "Open Issues" in text:
                         value = text.split('\n')[-1]
-                        metrics["open_issues"] = self.parse_number(value)
+                        metrics["open_issues"] = value
 
                     elif "Resolved Issues" in text:
                         value = text.split('\n')[-1]
-                        metrics["resolved_issues"] = self.parse_number(value)
+                        metrics["resolved_issues"] = value
 
                     elif "Completed Tasks" in text:
                         value = text.split('\n')[-1]
-                        metrics["completed_tasks"] = self.parse_number(value)
+                        metrics["completed_tasks"] = value
 
                     elif "Total Sessions" in text:
                         value = text.split('\n')[-1]
-                        metrics["total_sessions"] = self.parse_number(value)
+                        metrics["total_sessions"] = value
 
                     elif "Completed Sessions" in text:
                         value = text.split('\n')[-1]
-                        metrics["completed_sessions"] = self.parse_number(value)
+                        metrics["completed_sessions"] = value
 
                 except:
                     continue
@@ -240,28 +259,26 @@ class CompleteAllSitesComparator:
             return metrics
 
     def parse_number(self, value_str):
-        """Parse number from string (handles $, k, etc.)"""
-        try:
-            value_str = value_str.strip()
-
-            # Remove $ sign
-            value_str = value_str.replace('$', '').replace(',', '')
-
-            # Handle k (thousands)
-            if 'k' in value_str.lower():
-                value_str = value_str.lower().replace('k', '')
-                return int(float(value_str) * 1000)
-
-            # Handle m (millions)
-            if 'm' in value_str.lower():
-                value_str = value_str.lower().replace('m', '')
-                return int(float(value_str) * 1000000)
-
-            # Just a number
-            return int(float(value_str))
+        """Parse number from string (handles $, k/M/B, %, and placeholders)"""
+        return card_number(parse_card_values([value_str])[0])
+
+    def normalize_metrics(self, all_data):
+        """Parse the card texts of all sites x metrics in one pass, in place"""
+        cells = [(metrics, field) for metrics in all_data.values()
+                 for field, value in metrics.items() if field != "site_name" and isinstance(value, str)]
+        values = parse_card_values(metrics[field] for metrics, field in cells)
+        for (metrics, field), value in zip(cells, values):
+            metrics[field] = card_number(value)
+        return all_data
 
-        except:
+    def capture_site(self, driver, network, site):
+        """Select a site and capture its metrics in the given browser (a SitePool worker)"""
+        worker = copy.copy(self)
+        worker.driver, worker.network = driver, network
+        if not worker.select_site(site):
+            print(f"  ⚠ Skipped: {site}")
             return None
+        return worker.capture_dashboard_metrics(site)
 
     def capture_all_sites_data(self, url, email, password, label):
         """Capture data for all sites on a website"""
@@ -280,19 +297,10 @@ class CompleteAllSitesComparator:
             print("⚠ No sites found!")
             return {}
 
-        all_data = {}
-
         # Capture data for each site
-        for idx, site in enumerate(sites, 1):
-            print(f"\n[{idx}/{len(sites)}] Processing: {site}")
-
-            # Select the site
-            if self.select_site(site):
-                # Capture metrics
-                metrics = self.capture_dashboard_metrics(site)
-                all_data[site] = metrics
-            else:
-                print(f"  ⚠ Skipped: {site}")
+        all_data = SitePool(self.workers).capture(self.driver, self.network, sites, self.capture_site)
+
+        self.normalize_metrics(all_data)
 
         print(f"\n✓ Completed {label}: {len(all_data)} sites captured")
         return all_data
@@ -303,48 +311,35 @@ class CompleteAllSitesComparator:
         print(f"📊 COMPARING ALL SITES")
         print(f"{'='*70}")
 
-        # Get all unique sites
+        # Get all unique sites and metric fields
         all_sites = set(list(rnd_data.keys()) + list(ai_data.keys()))
+        sites = sorted(all_sites)
+        fields = sorted({field for data in (rnd_data, ai_data) for metrics in data.values()
+                         for field in metrics if field != 'site_name'})
 
-        comparisons = []
-
-        for site in sorted(all_sites):
-            rnd_site = rnd_data.get(site, {})
-            ai_site = ai_data.get(site, {})
-
-            # Get all metric fields
-            all_fields = set()
-            if rnd_site:
-                all_fields.update([k for k in rnd_site.keys() if k != 'site_name'])
-            if ai_site:
-                all_fields.update([k for k in ai_site.keys() if k != 'site_name'])
-
-            # Compare each field
-            for field in sorted(all_fields):
-                rnd_value = rnd_site.get(field)
-                ai_value = ai_site.get(field)
-
-                # Skip if both are None
-                if rnd_value is None and ai_value is None:
-                    continue
-
-                # Calculate difference
-                if rnd_value != ai_value:
-                    change = None
-                    if rnd_value is not None and ai_value is not None:
-                        change = ai_value - rnd_value
+        # sites x fields matrices (row-major), NaN where a value is missing
+        rnd_matrix = self.metric_matrix(rnd_data, sites, fields)
+        ai_matrix = self.metric_matrix(ai_data, sites, fields)
+        changes = array('d', (ai - rnd for rnd, ai in zip(rnd_matrix, ai_matrix)))
+        kinds = [self.metric_kind(field) for field in fields]
 
-                    # Determine severity
-                    severity = self.determine_severity(field, rnd_value, ai_value, change)
+        comparisons = []
 
-                    comparisons.append({
-                        "site": site,
-                        "field": field,
-                        "old_value": rnd_value if rnd_value is not None else "N/A",
-                        "new_value": ai_value if ai_value is not None else "N/A",
-                        "change": change if change is not None else "N/A",
-                        "severity": severity
-                    })
+        for cell, (rnd, ai, change) in enumerate(zip(rnd_matrix, ai_matrix, changes)):
+            # Skip if equal or both missing
+            if rnd == ai or (math.isnan(rnd) and math.isnan(ai)):
+                continue
+
+            site, column = divmod(cell, len(fields))
+            rnd_value, ai_value, change = card_number(rnd), card_number(ai), card_number(change)
+            comparisons.append({
+                "site": sites[site],
+                "field": fields[column],
+                "old_value": rnd_value if rnd_value is not None else "N/A",
+                "new_value": ai_value if ai_value is not None else "N/A",
+                "change": change if change is not None else "N/A",
+                "severity": self.kind_severity(kinds[column], rnd_value, ai_value, change)
+            })
 
         # Count by severity
         critical = sum(1 for c in comparisons if c['severity'] == 'CRITICAL')
@@ -367,8 +362,33 @@ class CompleteAllSitesComparator:
             "comparisons": comparisons
         }
 
+    def metric_matrix(self, data, sites, fields):
+        """Flat sites x fields array of metric values, NaN where missing"""
+        matrix = array('d')
+        for site in sites:
+            metrics = data.get(site, {})
+            for field in fields:
+                value = metrics.get(field)
+                matrix.append(value if isinstance(value, (int, float)) else math.nan)
+        return matrix
+
+    def metric_kind(self, field):
+        """Which severity rule applies to a metric field"""
+        field = field.lower()
+        if "asset" in field:
+            return "asset"
+        if "value" in field or "risk" in field:
+            return "financial"
+        if "issue" in field:
+            return "issue"
+        return "other"
+
     def determine_severity(self, field, old_val, new_val, change):
         """Determine severity of difference"""
+        return self.kind_severity(self.metric_kind(field), old_val, new_val, change)
+
+    def kind_severity(self, kind, old_val, new_val, change):
+        """Severity of a difference in a metric of the given kind"""
 
         # Missing data is critical
         if old_val is not None and new_val is None:
@@ -378,7 +398,7 @@ class CompleteAllSitesComparator:
             return "MAJOR"  # New data added
 
         # Asset count changes
-        if "asset" in field.lower():
+        if kind == "asset":
             if abs(change) >= 100:
                 return "MAJOR"
             elif change < 0:
@@ -387,14 +407,14 @@ class CompleteAllSitesComparator:
                 return "MINOR"
 
         # Financial metrics
-        if "value" in field.lower() or "risk" in field.lower():
+        if kind == "financial":
             if abs(change) >= 100000:
                 return "MAJOR"
             else:
                 return "MINOR"
 
         # Issue tracking
-        if "issue" in field.lower():
+        if kind == "issue":
             if abs(change) >= 10:
                 return "MAJOR"
             else:
@@ -575,6 +595,7 @@ class CompleteAllSitesComparator:
             if self.driver:
                 print("\n🚪 Closing browser...")
                 time.sleep(2)
+                self.network.stop()
                 self.driver.quit()
 
 
@@ -1,15 +1,13 @@
 import json
 import os
-import time
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from network_capture import NetworkCapture
+from session_store import chrome_driver
 
 def capture_complete_data():
     """Capture complete data from the ACME website using Selenium"""
@@ -32,12 +30,11 @@ def capture_complete_data():
     # Run in headless mode for faster execution
     chrome_options.add_argument("--headless")
     
-    # Enable performance logging
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    # Setup ChromeDriver automatically (the path is looked up once, then cached)
+    driver = chrome_driver(chrome_options)
     
-    # Setup ChromeDriver automatically
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Collect API response bodies as they finish loading
+    network = NetworkCapture(driver)
     
     captured_data = {
         "metadata": {
@@ -51,12 +48,13 @@ def capture_complete_data():
     }
     
     try:
+        network.start()
         print("Starting complete data capture...")
         
         # Step 1: Navigate to login page
         print("Step 1: Navigating to login page...")
         driver.get(f"{BASE_URL}/login")
-        time.sleep(2)
+        network.wait_until_settled()
         
         # Step 2: Attempt login
         print("Step 2: Attempting login...")
@@ -85,8 +83,8 @@ def capture_complete_data():
             else:
                 print("Submit button not found")
             
-            # Wait a bit for login to process
-            time.sleep(3)
+            # Wait for login to process
+            network.wait_until_settled()
             
         except Exception as e:
             print(f"Login attempt failed: {str(e)}")
@@ -107,7 +105,7 @@ def capture_complete_data():
             try:
                 print(f"Step {5+i}: Visiting {page}...")
                 driver.get(f"{BASE_URL}{page}")
-                time.sleep(3)  # Wait for page to load
+                network.wait_until_settled()  # Wait for page to load
                 
                 # Take screenshot
                 screenshot_name = f"screenshot_{i+1}_{page.replace('/', '')}.png"
@@ -154,71 +152,34 @@ def capture_complete_data():
         
         # Step 5: Capture network logs (API responses)
         print("Step 8: Capturing network logs...")
-        try:
-            logs = driver.get_log('performance')
-            api_response_count = 0
+        api_response_count = 0
+        for entry in network.take():
+            url = entry['url']
+            if 'error' in entry:
+                print(f"Could not get response body for {url}: {entry['error']}")
+                continue
             
-            for log in logs:
-                try:
-                    message = json.loads(log['message'])
-                    
-                    if (message['message']['method'] == 'Network.responseReceived' and 
-                        'response' in message['message']['params']):
-                        
-                        response = message['message']['params']['response']
-                        url = response['url']
-                        
-                        # Filter for API endpoints
-                        if ('/api/' in url.lower() or 'json' in response.get('mimeType', '').lower()) and response['status'] == 200:
-                            try:
-                                # Enable Network domain to get response bodies
-                                driver.execute_cdp_cmd('Network.enable', {})
-                                
-                                # Get response body
-                                result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': message['message']['params']['requestId']})
-                                response_body = result.get('body', '')
-                                
-                                # Parse JSON if possible
-                                try:
-                                    if result.get('base64Encoded', False):
-                                        import base64
-                                        response_body = base64.b64decode(response_body).decode('utf-8')
-                                    
-                                    parsed_body = json.loads(response_body)
-                                    response_body = parsed_body
-                                except:
-                                    pass  # Keep as string if not JSON
-                                
-                                api_entry = {
-                                    'url': url,
-                                    'status': response['status'],
-                                    'mimeType': response.get('mimeType', ''),
-                                    'timestamp': log['timestamp'],
-                                    'response': response_body
-                                }
-                                
-                                captured_data["api_responses"].append(api_entry)
-                                api_response_count += 1
-                                
-                                # Save individual response to file
-                                filename = f"api_response_{api_response_count}.json"
-                                filepath = os.path.join(output_dir, filename)
-                                
-                                with open(filepath, 'w') as f:
-                                    json.dump(api_entry, f, indent=2, default=str)
-                                
-                                print(f"API response saved: {filename}")
-                                
-                            except Exception as e:
-                                print(f"Could not get response body for {url}: {str(e)}")
-                                
-                except Exception as e:
-                    continue  # Skip malformed log entries
+            api_entry = {
+                'url': url,
+                'status': entry['status'],
+                'mimeType': entry['mimeType'],
+                'timestamp': entry['timestamp'],
+                'response': entry['response']
+            }
             
-            print(f"Captured {api_response_count} API responses")
+            captured_data["api_responses"].append(api_entry)
+            api_response_count += 1
             
-        except Exception as e:
-            print(f"Error capturing network logs: {str(e)}")
+            # Save individual response to file
+            filename = f"api_response_{api_response_count}.json"
+            filepath = os.path.join(output_dir, filename)
+            
+            with open(filepath, 'w') as f:
+                json.dump(api_entry, f, indent=2, default=str)
+            
+            print(f"API response saved: {filename}")
+        
+        print(f"Captured {api_response_count} API responses")
         
         # Step 6: Extract visible text content
         print("Step 9: Extracting visible text content...")
@@ -274,6 +235,7 @@ def capture_complete_data():
         raise
         
     finally:
+        network.stop()
         driver.quit()
 
 if __name__ == "__main__":
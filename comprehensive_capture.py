@@ -1,15 +1,13 @@
 import json
 import os
-import time
 import argparse
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from network_capture import NetworkCapture
+from session_store import chrome_driver
 
 class ComprehensiveCapture:
     def __init__(self, base_url, email, password, headless=True):
@@ -17,6 +15,7 @@ class ComprehensiveCapture:
         self.email = email
         self.password = password
         self.driver = None
+        self.network = None
         self.headless = headless
         
         # Create timestamped output directory
@@ -28,7 +27,7 @@ class ComprehensiveCapture:
         print(f"Created output directory: {self.output_dir}")
     
     def setup_driver(self):
-        """Setup Chrome driver with network logging enabled"""
+        """Setup Chrome driver with a live network capture attached"""
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -37,19 +36,18 @@ class ComprehensiveCapture:
         if self.headless:
             chrome_options.add_argument("--headless")
         
-        # Enable performance logging
-        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-        
-        # Setup ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Setup ChromeDriver automatically (the path is looked up once, then cached)
+        self.driver = chrome_driver(chrome_options)
         print("Chrome driver initialized successfully")
+        
+        # Collect API response bodies as they finish loading
+        self.network = NetworkCapture(self.driver).start()
     
     def login(self):
         """Login to the ACME website"""
         print(f"Logging in to {self.base_url}...")
         self.driver.get(f"{self.base_url}/login")
-        time.sleep(2)
+        self.network.wait_until_settled()
         
         try:
             # Enter credentials
@@ -65,7 +63,7 @@ class ComprehensiveCapture:
                 EC.url_contains("/dashboard")
             )
             print("Login successful")
-            time.sleep(3)
+            self.network.wait_until_settled()
             return True
         except Exception as e:
             print(f"Login failed: {e}")
@@ -75,7 +73,7 @@ class ComprehensiveCapture:
         """Get all sites from the dropdown"""
         print("Getting all sites from dropdown...")
         self.driver.get(f"{self.base_url}/sites")
-        time.sleep(3)
+        self.network.wait_until_settled()
         
         sites = []
         try:
@@ -89,7 +87,7 @@ class ComprehensiveCapture:
                 # Strategy 2: Custom Dropdown (Click to open, then find items)
                 dropdown = self.driver.find_element(By.CSS_SELECTOR, ".site-dropdown, .dropdown-toggle")
                 dropdown.click()
-                time.sleep(1)
+                self.network.wait_until_settled()
                 items = self.driver.find_elements(By.CSS_SELECTOR, ".dropdown-menu li, .dropdown-item")
                 sites = [item.text.strip() for item in items if item.text.strip()]
                 # Close dropdown
@@ -103,50 +101,21 @@ class ComprehensiveCapture:
             return ["London UK", "All Facilities", "Melbourne AU", "ShowSite3", "test", "test site", "Toronto Canada", "Site657"]
 
     def capture_network_logs(self, site_name, output_path):
-        """Capture network logs and save API responses"""
-        logs = self.driver.get_log('performance')
+        """Save the API responses captured since the last call"""
         api_responses = []
         
-        for log in logs:
-            try:
-                message = json.loads(log['message'])
-                if (message['message']['method'] == 'Network.responseReceived' and 
-                    'response' in message['message']['params']):
-                    
-                    response = message['message']['params']['response']
-                    url = response['url']
-                    
-                    # Filter for API calls
-                    if ('/api/' in url or 'json' in response.get('mimeType', '')) and response['status'] == 200:
-                        try:
-                            # Get response body
-                            request_id = message['message']['params']['requestId']
-                            self.driver.execute_cdp_cmd('Network.enable', {})
-                            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                            body = result.get('body', '')
-                            
-                            if result.get('base64Encoded', False):
-                                import base64
-                                body = base64.b64decode(body).decode('utf-8')
-                                
-                            try:
-                                body = json.loads(body)
-                            except:
-                                pass
-                                
-                            api_entry = {
-                                'url': url,
-                                'status': response['status'],
-                                'timestamp': log['timestamp'],
-                                'response': body,
-                                'site': site_name
-                            }
-                            api_responses.append(api_entry)
-                        except Exception as e:
-                            # Ignore errors getting body (sometimes request is gone)
-                            pass
-            except:
+        for entry in self.network.take():
+            # Skip bodies that could not be fetched
+            if 'error' in entry:
                 continue
+            api_entry = {
+                'url': entry['url'],
+                'status': entry['status'],
+                'timestamp': entry['timestamp'],
+                'response': entry['response'],
+                'site': site_name
+            }
+            api_responses.append(api_entry)
                 
         # Save responses
         if api_responses:
@@ -172,7 +141,7 @@ class ComprehensiveCapture:
             # Assuming we can navigate to a URL or use the dropdown.
             # For now, let's assume we are on the sites page and can click.
             self.driver.get(f"{self.base_url}/sites")
-            time.sleep(2)
+            self.network.wait_until_settled()
             
             # Try to select the site
             try:
@@ -184,14 +153,14 @@ class ComprehensiveCapture:
                 try:
                     dropdown = self.driver.find_element(By.CSS_SELECTOR, ".site-dropdown, .dropdown-toggle")
                     dropdown.click()
-                    time.sleep(1)
+                    self.network.wait_until_settled()
                     # Find option by text
                     option = self.driver.find_element(By.XPATH, f"//li[contains(text(), '{site_name}')] | //a[contains(text(), '{site_name}')]")
                     option.click()
                 except:
                     print(f"  Could not select site {site_name} via UI")
             
-            time.sleep(3) # Wait for load
+            self.network.wait_until_settled()  # Wait for load
             
             # 2. Capture Dashboard
             self.driver.save_screenshot(os.path.join(site_dir, "dashboard.png"))
@@ -204,7 +173,7 @@ class ComprehensiveCapture:
             # 4. Visit Assets Page (if exists)
             try:
                 self.driver.get(f"{self.base_url}/assets")
-                time.sleep(2)
+                self.network.wait_until_settled()
                 self.driver.save_screenshot(os.path.join(site_dir, "assets.png"))
                 with open(os.path.join(site_dir, "assets.html"), 'w') as f:
                     f.write(self.driver.page_source)
@@ -226,6 +195,8 @@ class ComprehensiveCapture:
                 for site in sites:
                     self.capture_site_data(site)
         finally:
+            if self.network:
+                self.network.stop()
             if self.driver:
                 self.driver.quit()
         
@@ -8,6 +8,12 @@ import json
 import os
 import difflib
 from collections import defaultdict
+from collections.abc import Sequence
+from capture_stream import CaptureIndex
+from json_diff_engine import (
+    iter_raw_differences, render_path, SeverityCounter, TYPE_MISMATCH, KEY_ADDED,
+    KEY_REMOVED, LENGTH_MISMATCH, VALUE_CHANGED
+)
 
 def load_json_file(filepath):
     """Load JSON data from a file"""
@@ -20,107 +26,87 @@ def load_json_file(filepath):
 
 def deep_compare_json(obj1, obj2, path=""):
     """
-    Recursively compare two JSON objects and return all differences.
+    Compare two JSON objects and return all differences.
     Returns a list of differences with paths and values.
     """
-    differences = []
-    
-    # If types are different, that's a difference
-    if type(obj1) != type(obj2):
-        differences.append({
-            "path": path,
-            "type": "type_mismatch",
-            "old_value": obj1,
-            "new_value": obj2
-        })
-        return differences
-    
-    # Handle different types
-    if isinstance(obj1, dict):
-        # Get all keys from both objects
-        all_keys = set(obj1.keys()) | set(obj2.keys())
-        
-        for key in all_keys:
-            new_path = f"{path}.{key}" if path else key
-            
-            if key not in obj1:
-                differences.append({
-                    "path": new_path,
-                    "type": "added",
-                    "old_value": None,
-                    "new_value": obj2[key]
-                })
-            elif key not in obj2:
-                differences.append({
-                    "path": new_path,
-                    "type": "removed",
-                    "old_value": obj1[key],
-                    "new_value": None
-                })
-            else:
-                # Recursively compare nested objects
-                differences.extend(deep_compare_json(obj1[key], obj2[key], new_path))
-                
-    elif isinstance(obj1, list):
-        # For lists, compare by index if same length, otherwise mark as different
-        if len(obj1) != len(obj2):
-            differences.append({
-                "path": path,
+    return list(iter_json_differences(obj1, obj2, path))
+
+def iter_json_differences(obj1, obj2, path=""):
+    """
+    Stream the differences between two JSON objects one record at a time.
+    Built on the shared iterative diff walk, so nothing is buffered and deep
+    nesting cannot hit the recursion limit.
+    """
+    for kind, diff_path, key, old_value, new_value in iter_raw_differences(obj1, obj2, path):
+        diff_path = render_path(diff_path)
+        # If types are different, that's a difference
+        if kind == TYPE_MISMATCH:
+            yield {
+                "path": diff_path,
+                "type": "type_mismatch",
+                "old_value": old_value,
+                "new_value": new_value
+            }
+        elif kind == KEY_ADDED:
+            yield {
+                "path": diff_path,
+                "type": "added",
+                "old_value": None,
+                "new_value": new_value
+            }
+        elif kind == KEY_REMOVED:
+            yield {
+                "path": diff_path,
+                "type": "removed",
+                "old_value": old_value,
+                "new_value": None
+            }
+        elif kind == LENGTH_MISMATCH:
+            # Lists of different length are still compared element by element
+            yield {
+                "path": diff_path,
                 "type": "list_length_mismatch",
-                "old_value": len(obj1),
-                "new_value": len(obj2)
-            })
-            # Still try to compare elements if possible
-            min_len = min(len(obj1), len(obj2))
-            for i in range(min_len):
-                differences.extend(deep_compare_json(obj1[i], obj2[i], f"{path}[{i}]"))
-        else:
-            # Same length, compare element by element
-            for i in range(len(obj1)):
-                differences.extend(deep_compare_json(obj1[i], obj2[i], f"{path}[{i}]"))
-                
-    else:
-        # Primitive values - compare directly
-        if obj1 != obj2:
+                "old_value": len(old_value),
+                "new_value": len(new_value)
+            }
+        elif kind == VALUE_CHANGED:
             # Special handling for numeric values that change from positive to zero
-            if isinstance(obj1, (int, float)) and isinstance(obj2, (int, float)):
-                if obj1 > 0 and obj2 == 0:
-                    differences.append({
-                        "path": path,
-                        "type": "critical_data_loss",
-                        "old_value": obj1,
-                        "new_value": obj2,
-                        "severity": "CRITICAL"
-                    })
-                elif obj1 == 0 and obj2 > 0:
-                    differences.append({
-                        "path": path,
-                        "type": "data_added",
-                        "old_value": obj1,
-                        "new_value": obj2,
-                        "severity": "MINOR"
-                    })
+            if isinstance(old_value, (int, float)) and isinstance(new_value, (int, float)):
+                if old_value > 0 and new_value == 0:
+                    diff_type, severity = "critical_data_loss", "CRITICAL"
+                elif old_value == 0 and new_value > 0:
+                    diff_type, severity = "data_added", "MINOR"
                 else:
-                    differences.append({
-                        "path": path,
-                        "type": "value_changed",
-                        "old_value": obj1,
-                        "new_value": obj2,
-                        "severity": "MINOR"
-                    })
+                    diff_type, severity = "value_changed", "MINOR"
+                yield {
+                    "path": diff_path,
+                    "type": diff_type,
+                    "old_value": old_value,
+                    "new_value": new_value,
+                    "severity": severity
+                }
             else:
-                differences.append({
-                    "path": path,
+                yield {
+                    "path": diff_path,
                     "type": "value_changed",
-                    "old_value": obj1,
-                    "new_value": obj2
-                })
-    
-    return differences
+                    "old_value": old_value,
+                    "new_value": new_value
+                }
+
+def _positions_by_url(responses):
+    """{url: position of its last response}; a CaptureIndex answers from its index without decoding"""
+    entries = getattr(responses, 'entries', None)
+    if entries is not None:
+        urls = (entry.url for entry in entries)
+    else:
+        urls = (resp.get('url') for resp in responses)
+    return {url if url is not None else f"response_{i}": i for i, url in enumerate(urls)}
 
 def compare_api_responses(old_responses, new_responses):
     """
     Compare API responses by URL and return structured differences.
+    Responses are grouped by position and read only when a pair is compared,
+    so a CaptureIndex decodes one entry at a time.
     """
     results = {
         "summary": {
@@ -133,9 +119,15 @@ def compare_api_responses(old_responses, new_responses):
         "detailed_differences": []
     }
     
+    # Responses have to be indexable (a list or a CaptureIndex)
+    if not isinstance(old_responses, Sequence):
+        old_responses = list(old_responses)
+    if not isinstance(new_responses, Sequence):
+        new_responses = list(new_responses)
+    
     # Group responses by URL
-    old_by_url = {resp.get('url', f"response_{i}"): resp for i, resp in enumerate(old_responses)}
-    new_by_url = {resp.get('url', f"response_{i}"): resp for i, resp in enumerate(new_responses)}
+    old_by_url = _positions_by_url(old_responses)
+    new_by_url = _positions_by_url(new_responses)
     
     # Get all URLs
     all_urls = set(old_by_url.keys()) | set(new_by_url.keys())
@@ -144,8 +136,10 @@ def compare_api_responses(old_responses, new_responses):
     for url in all_urls:
         results["summary"]["endpoints_compared"] += 1
         
-        old_resp = old_by_url.get(url)
-        new_resp = new_by_url.get(url)
+        old_position = old_by_url.get(url)
+        new_position = new_by_url.get(url)
+        old_resp = old_responses[old_position] if old_position is not None else None
+        new_resp = new_responses[new_position] if new_position is not None else None
         
         if old_resp is None and new_resp is not None:
             # New endpoint
@@ -175,13 +169,14 @@ def compare_api_responses(old_responses, new_responses):
             })
         elif old_resp is not None and new_resp is not None:
             # Compare responses
-            differences = deep_compare_json(old_resp, new_resp)
+            severity_counter = SeverityCounter()
+            differences = list(severity_counter.track(iter_json_differences(old_resp, new_resp)))
             
             if differences:
                 results["summary"]["endpoints_with_differences"] += 1
                 
                 # Determine overall severity for this endpoint
-                has_critical = any(diff.get("severity") == "CRITICAL" for diff in differences)
+                has_critical = severity_counter.counts["CRITICAL"] > 0
                 severity = "CRITICAL" if has_critical else "MINOR"
                 
                 if has_critical:
@@ -204,12 +199,12 @@ def compare_api_responses(old_responses, new_responses):
 def load_complete_capture(directory):
     """
     Load complete capture data from a directory.
+    Returns the api_responses as a CaptureIndex, which decodes entries on
+    demand (the sidecar index is built on the first load).
     """
     capture_file = os.path.join(directory, "complete_capture.json")
     if os.path.exists(capture_file):
-        data = load_json_file(capture_file)
-        if data and "api_responses" in data:
-            return data["api_responses"]
+        return CaptureIndex.open(capture_file)
     return []
 
 def generate_comprehensive_html_report(comparison_results, old_dir, new_dir):
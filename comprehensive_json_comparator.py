@@ -2,6 +2,11 @@
 """
 COMPREHENSIVE JSON COMPARATOR
 Performs complete JSON comparison showing ALL differences with detailed HTML reports
+
+Capture files (a top-level object with an api_responses array) are not
+loaded whole: the other sections are decoded, and api_responses is compared
+entry by entry through a CaptureIndex. The differences and statistics are
+the same as for the whole documents.
 """
 
 import json
@@ -9,13 +14,31 @@ import os
 import sys
 from datetime import datetime
 from collections import defaultdict
+from capture_stream import CaptureFile, CaptureIndex, LAZY_ARRAY
+from diff_store import DiffStore, DEFAULT_SPILL_BYTES
+from json_diff_engine import (
+    iter_raw_differences, DiffRecord, json_default, key_path, index_path,
+    TYPE_MISMATCH, KEY_ADDED, KEY_REMOVED, LENGTH_MISMATCH, ITEM_ADDED, ITEM_REMOVED
+)
 
 class ComprehensiveJSONComparator:
-    def __init__(self, old_json_path, new_json_path, output_name="comparison_report"):
+    # Nesting the walk descends into
+    MAX_DEPTH = 100
+    
+    # Bump whenever a change here alters the differences found for the same
+    # input (severity rules, formatting...), so cached results are not reused
+    RULESET_VERSION = 1
+    
+    def __init__(self, old_json_path, new_json_path, output_name="comparison_report",
+                 spill_bytes=DEFAULT_SPILL_BYTES, diff_cache=None):
         self.old_json_path = old_json_path
         self.new_json_path = new_json_path
         self.output_name = output_name
-        self.all_differences = []
+        # Differences are kept column-wise; values spill to disk past spill_bytes
+        self.spill_bytes = spill_bytes
+        # Optional DiffCache: file pairs compared before are not diffed again
+        self.diff_cache = diff_cache
+        self.all_differences = DiffStore(spill_bytes)
         self.statistics = {
             "total_paths_compared": 0,
             "differences_found": 0,
@@ -34,6 +57,16 @@ class ComprehensiveJSONComparator:
             print(f"Error loading {filepath}: {e}")
             return None
     
+    def load_capture_sections(self, filepath):
+        """
+        Top-level sections of a capture file with api_responses left on disk
+        (LAZY_ARRAY), or None when the file is not a JSON object
+        """
+        try:
+            return CaptureFile(filepath).sections()
+        except (OSError, ValueError):
+            return None
+    
     def get_all_paths(self, obj, prefix=""):
         """
         Extract ALL paths from a JSON object recursively.
@@ -59,144 +92,145 @@ class ComprehensiveJSONComparator:
         
         return paths
     
-    def deep_compare(self, obj1, obj2, path="", depth=0):
+    def deep_compare(self, obj1, obj2, path=""):
         """
-        Deep recursive comparison that finds ALL differences
+        Deep comparison that finds ALL differences
         Returns list of differences with full context
         """
-        differences = []
-        max_depth = 100  # Prevent infinite recursion
-        
-        if depth > max_depth:
-            return differences
-        
-        # Type mismatch
-        if type(obj1) != type(obj2):
-            differences.append({
-                "path": path if path else "root",
-                "type": "type_mismatch",
-                "old_type": type(obj1).__name__,
-                "new_type": type(obj2).__name__,
-                "old_value": str(obj1)[:500],
-                "new_value": str(obj2)[:500],
-                "severity": "MAJOR"
-            })
-            return differences
-        
-        # Handle dictionaries - COMPARE ALL KEYS
-        if isinstance(obj1, dict) and isinstance(obj2, dict):
-            all_keys = set(obj1.keys()) | set(obj2.keys())
-            
-            for key in sorted(all_keys):  # Sort for consistent output
-                new_path = f"{path}.{key}" if path else key
-                self.statistics["total_paths_compared"] += 1
-                
-                if key not in obj1 and key in obj2:
-                    # Key only in new
-                    differences.append({
-                        "path": new_path,
-                        "type": "key_added",
-                        "old_value": None,
-                        "new_value": self._format_value(obj2[key]),
-                        "severity": "MINOR"
-                    })
-                    self.statistics["differences_found"] += 1
-                    self.statistics["minor"] += 1
-                
-                elif key in obj1 and key not in obj2:
-                    # Key only in old
-                    differences.append({
-                        "path": new_path,
-                        "type": "key_removed",
-                        "old_value": self._format_value(obj1[key]),
-                        "new_value": None,
-                        "severity": "CRITICAL"
-                    })
-                    self.statistics["differences_found"] += 1
-                    self.statistics["critical"] += 1
-                
-                else:
-                    # Key in both - recursively compare
-                    nested_diffs = self.deep_compare(obj1[key], obj2[key], new_path, depth + 1)
-                    differences.extend(nested_diffs)
-        
-        # Handle lists - COMPARE ALL ELEMENTS
-        elif isinstance(obj1, list) and isinstance(obj2, list):
-            # Check length difference
-            if len(obj1) != len(obj2):
-                differences.append({
-                    "path": path if path else "root",
-                    "type": "list_length_changed",
-                    "old_value": f"Length: {len(obj1)}",
-                    "new_value": f"Length: {len(obj2)}",
-                    "severity": "MAJOR"
-                })
-                self.statistics["differences_found"] += 1
-                self.statistics["major"] += 1
+        return list(self.iter_differences(obj1, obj2, path))
+    
+    def iter_differences(self, obj1, obj2, path=""):
+        """
+        Stream every difference between obj1 and obj2 as it is found.
+        Statistics are updated as the records flow, so callers can write
+        them out without holding the full list in memory.
+        """
+        return self._records(self._raw_differences(obj1, obj2, path))
+    
+    def iter_capture_differences(self, old_sections, new_sections):
+        """
+        iter_differences() of two capture files given by load_capture_sections():
+        the sections are compared key by key, api_responses one entry at a time
+        """
+        return self._records(self._raw_capture_differences(old_sections, new_sections))
+    
+    @staticmethod
+    def _lazy_keys(sections):
+        return {key for key, value in sections.items() if value is LAZY_ARRAY}
+    
+    def _raw_differences(self, obj1, obj2, path="", depth=0):
+        # Events of a walk starting depth levels below the document root
+        return iter_raw_differences(
+            obj1, obj2, path,
+            sort_keys=True,  # Sort for consistent output
+            max_depth=self.MAX_DEPTH - depth,  # Prevent runaway nesting
+            stats=self.statistics
+        )
+    
+    def _raw_capture_differences(self, old_sections, new_sections):
+        # The events iter_raw_differences() yields for the whole documents, with
+        # the same steps counted as compared
+        for key in sorted(old_sections.keys() | new_sections.keys()):
+            path = key_path("", key)
+            self.statistics["total_paths_compared"] += 1
+            if key not in new_sections:
+                yield (KEY_REMOVED, path, key, old_sections[key], None)
+            elif key not in old_sections:
+                yield (KEY_ADDED, path, key, None, new_sections[key])
+            elif old_sections[key] is LAZY_ARRAY:
+                yield from self._raw_response_differences(path)
+            else:
+                yield from self._raw_differences(old_sections[key], new_sections[key], path, depth=1)
+    
+    def _raw_response_differences(self, path):
+        # api_responses paired by position, as align_by_index pairs list elements
+        with CaptureIndex.open(self.old_json_path) as old_responses, \
+                CaptureIndex.open(self.new_json_path) as new_responses:
+            if len(old_responses) != len(new_responses):
+                yield (LENGTH_MISMATCH, path, None, old_responses, new_responses)
             
-            # Compare common elements
-            min_len = min(len(obj1), len(obj2))
-            for idx in range(min_len):
-                new_path = f"{path}[{idx}]"
+            common = min(len(old_responses), len(new_responses))
+            for idx in range(common):
                 self.statistics["total_paths_compared"] += 1
-                nested_diffs = self.deep_compare(obj1[idx], obj2[idx], new_path, depth + 1)
-                differences.extend(nested_diffs)
+                yield from self._raw_differences(old_responses[idx], new_responses[idx],
+                                                 index_path(path, idx), depth=2)
             
-            # Handle extra elements
-            if len(obj1) > len(obj2):
-                for idx in range(min_len, len(obj1)):
-                    new_path = f"{path}[{idx}]"
-                    differences.append({
-                        "path": new_path,
-                        "type": "list_element_removed",
-                        "old_value": self._format_value(obj1[idx]),
-                        "new_value": None,
-                        "severity": "CRITICAL"
-                    })
-                    self.statistics["differences_found"] += 1
-                    self.statistics["critical"] += 1
+            for idx in range(common, len(old_responses)):
+                yield (ITEM_REMOVED, index_path(path, idx), idx, old_responses[idx], None)
+            for idx in range(common, len(new_responses)):
+                yield (ITEM_ADDED, index_path(path, idx), idx, None, new_responses[idx])
+    
+    def _records(self, events):
+        # DiffRecords for raw difference events, counted into the statistics
+        for kind, diff_path, key, old_value, new_value in events:
+            if kind == TYPE_MISMATCH:
+                yield DiffRecord(
+                    path=diff_path if diff_path else "root",
+                    diff_type="type_mismatch",
+                    old_value=str(old_value)[:500],
+                    new_value=str(new_value)[:500],
+                    severity="MAJOR",
+                    extra={
+                        "old_type": type(old_value).__name__,
+                        "new_type": type(new_value).__name__
+                    }
+                )
+                continue
             
-            elif len(obj2) > len(obj1):
-                for idx in range(min_len, len(obj2)):
-                    new_path = f"{path}[{idx}]"
-                    differences.append({
-                        "path": new_path,
-                        "type": "list_element_added",
-                        "old_value": None,
-                        "new_value": self._format_value(obj2[idx]),
-                        "severity": "MINOR"
-                    })
-                    self.statistics["differences_found"] += 1
-                    self.statistics["minor"] += 1
-        
-        # Handle primitives - COMPARE VALUES
-        else:
-            if obj1 != obj2:
-                self.statistics["total_paths_compared"] += 1
-                self.statistics["differences_found"] += 1
-                
-                # Determine severity
-                severity = self._determine_severity(obj1, obj2)
-                
-                differences.append({
-                    "path": path if path else "root",
-                    "type": "value_changed",
-                    "old_value": self._format_value(obj1),
-                    "new_value": self._format_value(obj2),
-                    "severity": severity
-                })
-                
-                if severity == "CRITICAL":
-                    self.statistics["critical"] += 1
-                elif severity == "MAJOR":
-                    self.statistics["major"] += 1
-                else:
-                    self.statistics["minor"] += 1
+            if kind == KEY_ADDED:
+                # Key only in new
+                diff = DiffRecord(
+                    path=diff_path,
+                    diff_type="key_added",
+                    old_value=None,
+                    new_value=self._format_value(new_value),
+                    severity="MINOR"
+                )
+            elif kind == KEY_REMOVED:
+                # Key only in old
+                diff = DiffRecord(
+                    path=diff_path,
+                    diff_type="key_removed",
+                    old_value=self._format_value(old_value),
+                    new_value=None,
+                    severity="CRITICAL"
+                )
+            elif kind == LENGTH_MISMATCH:
+                diff = DiffRecord(
+                    path=diff_path if diff_path else "root",
+                    diff_type="list_length_changed",
+                    old_value=f"Length: {len(old_value)}",
+                    new_value=f"Length: {len(new_value)}",
+                    severity="MAJOR"
+                )
+            elif kind == ITEM_REMOVED:
+                diff = DiffRecord(
+                    path=diff_path,
+                    diff_type="list_element_removed",
+                    old_value=self._format_value(old_value),
+                    new_value=None,
+                    severity="CRITICAL"
+                )
+            elif kind == ITEM_ADDED:
+                diff = DiffRecord(
+                    path=diff_path,
+                    diff_type="list_element_added",
+                    old_value=None,
+                    new_value=self._format_value(new_value),
+                    severity="MINOR"
+                )
             else:
-                self.statistics["total_paths_compared"] += 1
-                self.statistics["identical"] += 1
-        
-        return differences
+                diff = DiffRecord(
+                    path=diff_path if diff_path else "root",
+                    diff_type="value_changed",
+                    old_value=self._format_value(old_value),
+                    new_value=self._format_value(new_value),
+                    severity=self._determine_severity(old_value, new_value)
+                )
+            
+            self.statistics["differences_found"] += 1
+            self.statistics[diff["severity"].lower()] += 1
+            yield diff
     
     def _determine_severity(self, old_val, new_val):
         """Determine severity of change"""
@@ -233,39 +267,83 @@ class ComprehensiveJSONComparator:
         else:
             return str(value)
     
+    def _cache_key(self):
+        cache = self.diff_cache
+        return cache.key(cache.content_hash(self.old_json_path),
+                         cache.content_hash(self.new_json_path),
+                         f"{type(self).__name__}/{self.RULESET_VERSION}")
+    
     def compare(self):
         """Perform the complete comparison"""
-        print(f"Loading old JSON: {self.old_json_path}")
-        old_data = self.load_json_file(self.old_json_path)
-        if old_data is None:
-            return False
+        cache_key = None
+        if self.diff_cache is not None:
+            try:
+                cache_key = self._cache_key()
+            except OSError as e:
+                print(f"Error loading {e.filename}: {e}")
+                return False
+            cached = self.diff_cache.get(cache_key)
+            if cached is not None:
+                statistics, records = cached
+                print(f"♻️  Reusing cached comparison of {self.old_json_path} and {self.new_json_path}")
+                self.statistics = statistics
+                self.all_differences.close()
+                self.all_differences = DiffStore(self.spill_bytes)
+                self.all_differences.extend(records)
+                self._print_statistics()
+                return True
         
+        print(f"Loading old JSON: {self.old_json_path}")
+        old_sections = self.load_capture_sections(self.old_json_path)
         print(f"Loading new JSON: {self.new_json_path}")
-        new_data = self.load_json_file(self.new_json_path)
-        if new_data is None:
-            return False
+        new_sections = self.load_capture_sections(self.new_json_path)
         
-        print(f"Comparing JSON structures...")
-        self.all_differences = self.deep_compare(old_data, new_data)
-        
-        print(f"✅ Comparison complete!")
+        # api_responses streams only when both files hold it as an array
+        if (old_sections is not None and new_sections is not None
+                and self._lazy_keys(old_sections) == self._lazy_keys(new_sections)):
+            print("Comparing capture sections...")
+            differences = self.iter_capture_differences(old_sections, new_sections)
+        else:
+            old_data = self.load_json_file(self.old_json_path)
+            if old_data is None:
+                return False
+            new_data = self.load_json_file(self.new_json_path)
+            if new_data is None:
+                return False
+            print("Comparing JSON structures...")
+            differences = self.iter_differences(old_data, new_data)
+        
+        self.all_differences.close()
+        self.all_differences = DiffStore(self.spill_bytes)
+        self.all_differences.extend(differences)
+        
+        if cache_key is not None:
+            self.diff_cache.put(cache_key, self.statistics, self.all_differences)
+        
+        self._print_statistics()
+        return True
+    
+    def _print_statistics(self):
+        print("✅ Comparison complete!")
         print(f"   Total paths compared: {self.statistics['total_paths_compared']}")
         print(f"   Differences found: {self.statistics['differences_found']}")
         print(f"   - Critical: {self.statistics['critical']}")
         print(f"   - Major: {self.statistics['major']}")
         print(f"   - Minor: {self.statistics['minor']}")
         print(f"   - Identical: {self.statistics['identical']}")
-        
-        return True
     
     def generate_html_report(self):
         """Generate comprehensive HTML report"""
         report_path = f"{self.output_name}.html"
         
-        # Organize differences by severity
-        critical_diffs = [d for d in self.all_differences if d["severity"] == "CRITICAL"]
-        major_diffs = [d for d in self.all_differences if d["severity"] == "MAJOR"]
-        minor_diffs = [d for d in self.all_differences if d["severity"] == "MINOR"]
+        # Counts come from the severity column; only the rows the report shows are decoded
+        counts = self.all_differences.severity_counts()
+        critical_count = counts.get("CRITICAL", 0)
+        major_count = counts.get("MAJOR", 0)
+        minor_count = counts.get("MINOR", 0)
+        critical_diffs = list(self.all_differences.iter_severity("CRITICAL", limit=100))
+        major_diffs = list(self.all_differences.iter_severity("MAJOR", limit=100))
+        minor_diffs = list(self.all_differences.iter_severity("MINOR", limit=200))
         
         html = f"""<!DOCTYPE html>
 <html>
@@ -576,10 +654,10 @@ class ComprehensiveJSONComparator:
 """
         
         # Critical differences section
-        if critical_diffs:
+        if critical_count:
             html += f"""
         <div class="section">
-            <h2>🔴 Critical Issues ({len(critical_diffs)})</h2>
+            <h2>🔴 Critical Issues ({critical_count})</h2>
             <p><strong style="color: #e74c3c;">IMMEDIATE ACTION REQUIRED</strong> - These differences indicate potential data loss or missing functionality.</p>
             <table class="difference-table">
                 <thead>
@@ -593,7 +671,7 @@ class ComprehensiveJSONComparator:
                 </thead>
                 <tbody>
 """
-            for diff in critical_diffs[:100]:  # Limit to first 100 for performance
+            for diff in critical_diffs:  # Limited to first 100 for performance
                 html += f"""
                     <tr>
                         <td><div class="path">{diff['path']}</div></td>
@@ -607,17 +685,17 @@ class ComprehensiveJSONComparator:
                 </tbody>
             </table>
 """
-            if len(critical_diffs) > 100:
-                html += f"<p><em>Showing 100 of {len(critical_diffs)} critical issues</em></p>"
+            if critical_count > 100:
+                html += f"<p><em>Showing 100 of {critical_count} critical issues</em></p>"
             html += """
         </div>
 """
         
         # Major differences section
-        if major_diffs:
+        if major_count:
             html += f"""
         <div class="section">
-            <h2>🟡 Major Changes ({len(major_diffs)})</h2>
+            <h2>🟡 Major Changes ({major_count})</h2>
             <p><strong style="color: #f39c12;">REVIEW RECOMMENDED</strong> - These changes should be reviewed to ensure they are intentional.</p>
             <table class="difference-table">
                 <thead>
@@ -631,7 +709,7 @@ class ComprehensiveJSONComparator:
                 </thead>
                 <tbody>
 """
-            for diff in major_diffs[:100]:  # Limit to first 100 for performance
+            for diff in major_diffs:  # Limited to first 100 for performance
                 html += f"""
                     <tr>
                         <td><div class="path">{diff['path']}</div></td>
@@ -645,23 +723,23 @@ class ComprehensiveJSONComparator:
                 </tbody>
             </table>
 """
-            if len(major_diffs) > 100:
-                html += f"<p><em>Showing 100 of {len(major_diffs)} major changes</em></p>"
+            if major_count > 100:
+                html += f"<p><em>Showing 100 of {major_count} major changes</em></p>"
             html += """
         </div>
 """
         
         # Minor differences section (collapsible if too many)
-        if minor_diffs:
+        if minor_count:
             html += f"""
         <div class="section">
-            <h2>🔵 Minor Changes ({len(minor_diffs)})</h2>
+            <h2>🔵 Minor Changes ({minor_count})</h2>
             <p>These are minor differences that may not require action.</p>
 """
-            if len(minor_diffs) > 50:
+            if minor_count > 50:
                 html += f"""
             <div class="collapsible" onclick="toggleCollapsible(this)">
-                <span>Show all {len(minor_diffs)} minor changes</span>
+                <span>Show all {minor_count} minor changes</span>
                 <span class="expand-icon">▼</span>
             </div>
             <div class="collapsible-content">
@@ -684,7 +762,7 @@ class ComprehensiveJSONComparator:
                     </thead>
                     <tbody>
 """
-            for diff in minor_diffs[:200]:  # Limit to first 200 for performance
+            for diff in minor_diffs:  # Limited to first 200 for performance
                 html += f"""
                         <tr>
                             <td><div class="path">{diff['path']}</div></td>
@@ -699,13 +777,13 @@ class ComprehensiveJSONComparator:
                 </table>
             </div>
 """
-            if len(minor_diffs) > 200:
-                html += f"<p><em>Showing 200 of {len(minor_diffs)} minor changes</em></p>"
+            if minor_count > 200:
+                html += f"<p><em>Showing 200 of {minor_count} minor changes</em></p>"
             html += """
         </div>
 """
         
-        if not critical_diffs and not major_diffs and not minor_diffs:
+        if not critical_count and not major_count and not minor_count:
             html += """
         <div class="section">
             <div class="empty-state">
@@ -742,18 +820,24 @@ class ComprehensiveJSONComparator:
         """Generate JSON report with all differences"""
         report_path = f"{self.output_name}.json"
         
-        report = {
-            "metadata": {
-                "generated_at": datetime.now().isoformat(),
-                "old_file": self.old_json_path,
-                "new_file": self.new_json_path
-            },
-            "statistics": self.statistics,
-            "differences": self.all_differences
+        metadata = {
+            "generated_at": datetime.now().isoformat(),
+            "old_file": self.old_json_path,
+            "new_file": self.new_json_path
         }
         
+        # Differences are written one record at a time, so the report never
+        # needs a second in-memory copy of them
         with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2)
+            f.write('{\n  "metadata": ')
+            f.write(json.dumps(metadata, indent=2).replace('\n', '\n  '))
+            f.write(',\n  "statistics": ')
+            f.write(json.dumps(self.statistics, indent=2).replace('\n', '\n  '))
+            f.write(',\n  "differences": [')
+            for idx, diff in enumerate(self.all_differences):
+                f.write(',\n    ' if idx else '\n    ')
+                f.write(json.dumps(diff, default=json_default))
+            f.write('\n  ]\n}\n')
         
         print(f"✅ JSON report generated: {report_path}")
         return report_path
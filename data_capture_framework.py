@@ -1,16 +1,23 @@
 import json
 import os
-import time
+import re
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-import requests
+from network_capture import NetworkCapture
+from browser_session import export_session
+from session_store import chrome_driver
+from api_replay import ApiReplay, build_catalog
+
+# Replayed when the browser capture saw no API calls
+FALLBACK_ENDPOINTS = [
+    "/api/sites",
+    "/api/users/profile",
+    "/api/dashboard/stats",
+    "/api/notifications",
+]
 
 class APIDataCapture:
     def __init__(self, base_url, email, password):
@@ -18,8 +25,11 @@ class APIDataCapture:
         self.email = email
         self.password = password
         self.driver = None
+        self.network = None
         self.api_responses = {}
-        self.session = requests.Session()
+        # API calls the browser made, the catalog for the replay
+        self.network_entries = []
+        self.replay = ApiReplay()
         
         # Create directories for storing data
         self.output_dir = "captured_data_" + datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -28,7 +38,7 @@ class APIDataCapture:
         os.makedirs(os.path.join(self.output_dir, "ui_data"), exist_ok=True)
     
     def setup_driver(self):
-        """Setup Chrome driver with network logging enabled"""
+        """Setup Chrome driver with a live network capture attached"""
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -36,14 +46,12 @@ class APIDataCapture:
         # Uncomment the line below to run in headless mode
         # chrome_options.add_argument("--headless")
         
-        # Enable logging
-        caps = DesiredCapabilities.CHROME
-        caps['goog:loggingPrefs'] = {'performance': 'ALL'}
-        
-        # Automatically download and setup ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options, desired_capabilities=caps)
+        # Automatically download and setup ChromeDriver (the path is looked up once, then cached)
+        self.driver = chrome_driver(chrome_options)
         print("Chrome driver initialized")
+        
+        # Collect API response bodies as they finish loading
+        self.network = NetworkCapture(self.driver).start()
     
     def login(self):
         """Login to the ACME website"""
@@ -73,28 +81,20 @@ class APIDataCapture:
         )
         
         print("Login successful")
-        time.sleep(3)  # Wait for dashboard to fully load
+        self.network.wait_until_settled()  # Wait for dashboard to fully load
     
     def capture_network_logs(self):
-        """Capture network logs from browser"""
+        """Capture the API calls the browser made"""
         print("Capturing network logs...")
-        logs = self.driver.get_log('performance')
+        self.network_entries.extend(self.network.take())
         
-        api_calls = []
-        for log in logs:
-            message = json.loads(log['message'])
-            if message['message']['method'] == 'Network.responseReceived':
-                response = message['message']['params']['response']
-                url = response['url']
-                
-                # Filter for API calls (you may need to adjust this based on the actual API structure)
-                if '/api/' in url or 'json' in response.get('mimeType', ''):
-                    api_calls.append({
-                        'url': url,
-                        'status': response['status'],
-                        'headers': response['headers'],
-                        'timestamp': log['timestamp']
-                    })
+        api_calls = [{
+            'url': entry['url'],
+            'method': entry['method'],
+            'status': entry['status'],
+            'mimeType': entry['mimeType'],
+            'timestamp': entry['timestamp']
+        } for entry in self.network_entries]
         
         # Save API call metadata
         with open(os.path.join(self.output_dir, "api_calls_summary.json"), 'w') as f:
@@ -104,53 +104,42 @@ class APIDataCapture:
         return api_calls
     
     def capture_api_responses(self):
-        """Capture actual API responses by replaying requests"""
+        """Capture actual API responses by replaying the browser's API calls for every site"""
         print("Capturing API responses...")
         
-        # Get current session cookies from selenium
-        selenium_cookies = self.driver.get_cookies()
-        for cookie in selenium_cookies:
-            self.session.cookies.set(cookie['name'], cookie['value'])
-        
-        # Example API endpoints (you'll need to adjust these based on the actual website)
-        api_endpoints = [
-            "/api/sites",
-            "/api/users/profile",
-            "/api/dashboard/stats",
-            "/api/notifications",
-            # Add more endpoints as needed
-        ]
+        # The calls the pages made, with per-site IDs as {sld_id}; the
+        # browser's login authorizes the replay
+        catalog = build_catalog(self.network_entries) or FALLBACK_ENDPOINTS
+        snapshot = self.replay.snapshot(catalog, {
+            "capture": (self.base_url, export_session(self.driver))
+        })
         
         captured_responses = {}
         
-        for endpoint in api_endpoints:
-            try:
-                url = f"{self.base_url}{endpoint}"
-                print(f"Fetching {url}...")
-                
-                response = self.session.get(url)
-                response_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else response.text
-                
-                # Save response to file
-                filename = f"{endpoint.replace('/', '_').replace('api_', '')}.json"
-                filepath = os.path.join(self.output_dir, "api_responses", filename)
-                
-                with open(filepath, 'w') as f:
-                    if isinstance(response_data, (dict, list)):
-                        json.dump(response_data, f, indent=2)
-                    else:
-                        f.write(response_data)
-                
-                captured_responses[endpoint] = {
-                    'status_code': response.status_code,
-                    'data': response_data,
-                    'headers': dict(response.headers)
-                }
-                
-                print(f"Saved response for {endpoint} to {filename}")
-                
-            except Exception as e:
-                print(f"Error fetching {endpoint}: {str(e)}")
+        for entry in snapshot["capture"]:
+            endpoint = entry['url'][len(self.base_url):]
+            if 'error' in entry:
+                print(f"Error fetching {endpoint}: {entry['error']}")
+                continue
+            response_data = entry['response']
+            
+            # Save response to file
+            filename = re.sub(r'[^\w.-]', '_', endpoint.replace('api/', '', 1)) + ".json"
+            filepath = os.path.join(self.output_dir, "api_responses", filename)
+            
+            with open(filepath, 'w') as f:
+                if isinstance(response_data, (dict, list)):
+                    json.dump(response_data, f, indent=2)
+                else:
+                    f.write(response_data)
+            
+            captured_responses[endpoint] = {
+                'status_code': entry['status'],
+                'data': response_data,
+                'site': entry.get('site')
+            }
+        
+        print(f"Saved {len(captured_responses)} responses to {os.path.join(self.output_dir, 'api_responses')}")
         
         self.api_responses = captured_responses
         return captured_responses
@@ -163,7 +152,7 @@ class APIDataCapture:
         # Navigate to dashboard if not already there
         if "dashboard" not in self.driver.current_url:
             self.driver.get(f"{self.base_url}/dashboard")
-            time.sleep(3)
+            self.network.wait_until_settled()
         
         # Capture page title
         ui_data['page_title'] = self.driver.title
@@ -226,7 +215,7 @@ class APIDataCapture:
         for url_path, name in pages:
             try:
                 self.driver.get(f"{self.base_url}{url_path}")
-                time.sleep(2)  # Wait for page to load
+                self.network.wait_until_settled()  # Wait for page to load
                 self.driver.save_screenshot(os.path.join(screenshot_dir, f"{name}.png"))
                 print(f"Captured screenshot for {name}")
             except Exception as e:
@@ -271,6 +260,8 @@ class APIDataCapture:
             raise
             
         finally:
+            if self.network:
+                self.network.stop()
             if self.driver:
                 self.driver.quit()
 
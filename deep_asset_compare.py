@@ -10,6 +10,7 @@ import json
 import time
 import os
 import sys
+from network_capture import NetworkCapture
 
 def capture_assets(url, site_name, output_dir):
     print(f"\n{'='*80}")
@@ -21,11 +22,15 @@ def capture_assets(url, site_name, output_dir):
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
     
     driver = webdriver.Chrome(options=chrome_options)
     
+    # Asset-related endpoints, fetched while you navigate
+    network = NetworkCapture(driver, accept=lambda response: '/api/' in response['url'] and (
+        'asset' in response['url'] or 'equipment' in response['url']))
+    
     try:
+        network.start()
         driver.get(url)
         
         print("\n" + "!"*80)
@@ -40,36 +45,24 @@ def capture_assets(url, site_name, output_dir):
         
         print("\n🔄 Capturing asset data...")
         
-        # Capture network logs to find asset API calls
-        logs = driver.get_log('performance')
+        # Find lists of assets in the captured asset API calls
         assets = []
         
-        for entry in logs:
-            try:
-                log = json.loads(entry['message'])['message']
-                if log['method'] == 'Network.responseReceived':
-                    response = log['params']['response']
-                    # Look for asset-related endpoints
-                    if '/api/' in response['url'] and ('asset' in response['url'] or 'equipment' in response['url']):
-                        try:
-                            request_id = log['params']['requestId']
-                            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                            data = json.loads(body['body'])
-                            
-                            # Try to find list of assets in response
-                            items = []
-                            if isinstance(data, list):
-                                items = data
-                            elif isinstance(data, dict):
-                                items = data.get('assets', []) or data.get('items', []) or data.get('data', [])
-                            
-                            if items and isinstance(items, list):
-                                print(f"  ✓ Found {len(items)} items in {response['url']}")
-                                assets.extend(items)
-                        except:
-                            pass
-            except:
+        for entry in network.take():
+            if 'error' in entry:
                 continue
+            data = entry['response']
+            
+            # Try to find list of assets in response
+            items = []
+            if isinstance(data, list):
+                items = data
+            elif isinstance(data, dict):
+                items = data.get('assets', []) or data.get('items', []) or data.get('data', [])
+            
+            if items and isinstance(items, list):
+                print(f"  ✓ Found {len(items)} items in {entry['url']}")
+                assets.extend(items)
         
         # Remove duplicates based on ID or Name
         unique_assets = {}
@@ -92,6 +85,7 @@ def capture_assets(url, site_name, output_dir):
         return list(unique_assets.values())
         
     finally:
+        network.stop()
         driver.quit()
 
 def compare_asset_lists(old_assets, new_assets):
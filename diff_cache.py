@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+DIFF CACHE
+Content-addressed, on-disk cache of comparison results.
+
+Consecutive captures are mostly byte-identical, so batch runs keep diffing
+the same file pairs. DiffCache stores the result of each comparison under
+the pair's content hashes plus the comparator's ruleset version:
+
+    (old_hash, new_hash, ruleset_version) -> statistics + difference records
+
+A pair that was seen before (in any directory, under any name) is answered
+from the cache without loading either file. Bumping the ruleset version
+(e.g. after changing severity rules) makes every old entry miss.
+
+Entries are gzip'd JSON lines (statistics first, then one record per line),
+so large results are written and read back one record at a time. The cache
+is size-bounded: when it grows past max_bytes, the least recently used
+entries are evicted.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from json_diff_engine import DiffRecord, json_default
+
+# Default cache location and size
+DEFAULT_CACHE_DIR = ".diff_cache"
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+_ENTRY_SUFFIX = ".jsonl.gz"
+_HASH_BLOCK = 1024 * 1024
+
+
+def file_content_hash(filepath):
+    """SHA-1 of a file's bytes"""
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DiffCache:
+    """Comparison results keyed by (old_hash, new_hash, ruleset_version), LRU-evicted by size"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # path -> (size, mtime_ns, hash), so a file shared by two pairs is hashed once
+        self._file_hashes = {}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # Entry name -> size, least recently used first (mtime is the use time)
+        entries = []
+        for item in os.scandir(cache_dir):
+            if item.name.endswith(_ENTRY_SUFFIX) and item.is_file():
+                stat = item.stat()
+                entries.append((stat.st_mtime_ns, item.name, stat.st_size))
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self.total_bytes = sum(self._entries.values())
+        self._evict()
+
+    def content_hash(self, filepath):
+        """Content hash of a file, remembered for as long as the file is unchanged"""
+        stat = os.stat(filepath)
+        known = self._file_hashes.get(filepath)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        digest = file_content_hash(filepath)
+        self._file_hashes[filepath] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    @staticmethod
+    def key(old_hash, new_hash, ruleset_version):
+        return hashlib.sha1(f"{old_hash}:{new_hash}:{ruleset_version}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + _ENTRY_SUFFIX)
+
+    def get(self, key):
+        """
+        (statistics, record iterator) for a cached result, or None.
+        The records are read lazily, so consume them before the next put().
+        """
+        name = key + _ENTRY_SUFFIX
+        if name not in self._entries:
+            self.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            f = gzip.open(path, 'rt', encoding='utf-8')
+            statistics = json.loads(f.readline())
+        except (OSError, ValueError, EOFError):
+            # Removed or truncated behind our back
+            self._forget(name)
+            self.misses += 1
+            return None
+
+        # Mark as recently used
+        os.utime(path)
+        self._entries.move_to_end(name)
+        self.hits += 1
+        return statistics, self._iter_records(f)
+
+    @staticmethod
+    def _iter_records(f):
+        with f:
+            for line in f:
+                path, diff_type, old_value, new_value, severity, extra = json.loads(line)
+                yield DiffRecord(path, diff_type, old_value, new_value, severity, extra)
+
+    def put(self, key, statistics, records):
+        """Store a result; records is any iterable of DiffRecords (e.g. a DiffStore)"""
+        name = key + _ENTRY_SUFFIX
+        path = self._path(key)
+        try:
+            with gzip.open(path + ".tmp", 'wt', encoding='utf-8') as f:
+                f.write(json.dumps(statistics) + "\n")
+                for record in records:
+                    f.write(json.dumps([record.path, record.type, record.old_value, record.new_value,
+                                        record.severity, record.extra], default=json_default) + "\n")
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"⚠️  Could not write diff cache entry {path}: {e}")
+            return False
+
+        self._forget(name)
+        self._entries[name] = os.path.getsize(path)
+        self.total_bytes += self._entries[name]
+        self._evict()
+        return True
+
+    def _forget(self, name):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+DIFF STORE
+Columnar, array-backed storage for difference records.
+
+Large comparisons produce millions of small records that mostly repeat the
+same few strings ("MINOR", "value_changed", ...). DiffStore keeps them as
+columns instead of dicts:
+- severity and type:   small integer codes into per-store vocabularies
+- path:                an ID into a path table (repeated paths are stored once)
+- old/new values:      a kind code plus (offset, length) into a byte arena
+- extra fields:        JSON in the arena (e.g. old_type/new_type)
+
+The arena is the only part that grows with the size of the values. It lives
+in memory until it passes spill_bytes, then moves to a temporary file that is
+read back through mmap, so a comparison runs in a fixed memory budget of
+roughly 60 bytes per record plus spill_bytes.
+
+DiffStore is a read-only sequence: len(), indexing, slicing (a DiffStoreView)
+and iteration hand back DiffRecord objects, so report code written for lists
+of record dicts reads from it unchanged.
+"""
+
+import json
+import mmap
+import tempfile
+from array import array
+from collections.abc import Sequence
+from json_diff_engine import DiffRecord
+
+# Arena size (bytes) after which values spill to a memory-mapped temp file
+DEFAULT_SPILL_BYTES = 64 * 1024 * 1024
+
+# Value kinds
+_NONE, _STR, _JSON = 0, 1, 2
+
+# Recent paths are deduplicated through a small dict (the same path tends to
+# repeat across endpoints and neighbouring records); it is reset when full so
+# it never holds more than this many path strings in memory
+_PATH_DEDUP_LIMIT = 4096
+
+
+class _Arena:
+    """Append-only byte arena, in memory until it spills to an mmap-backed temp file"""
+
+    def __init__(self, spill_bytes, spill_dir=None):
+        self.spill_bytes = spill_bytes
+        self.spill_dir = spill_dir
+        self.size = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._map = None
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    def append(self, data):
+        offset = self.size
+        if self._file is None:
+            self._buffer += data
+            if len(self._buffer) > self.spill_bytes:
+                self._spill()
+        else:
+            self._file.write(data)
+        self.size += len(data)
+        return offset
+
+    def _spill(self):
+        self._file = tempfile.TemporaryFile(prefix="diff_store_", dir=self.spill_dir)
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def read(self, offset, length):
+        if self._file is None:
+            return bytes(self._buffer[offset:offset + length])
+        if self._map is None or len(self._map) < offset + length:
+            # Map everything written so far; remapped only when reads pass the end
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._buffer = bytearray()
+        self.size = 0
+
+
+class _Vocabulary:
+    """Small string <-> code table"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class DiffStore(Sequence):
+    """Columnar store of difference records"""
+
+    def __init__(self, spill_bytes=DEFAULT_SPILL_BYTES, spill_dir=None):
+        self._arena = _Arena(spill_bytes, spill_dir)
+        self._severities = _Vocabulary()
+        self._types = _Vocabulary()
+
+        # One entry per record
+        self._severity = array('H')
+        self._type = array('H')
+        self._path = array('I')
+        self._old_kind = array('B')
+        self._old = array('q')
+        self._old_len = array('I')
+        self._new_kind = array('B')
+        self._new = array('q')
+        self._new_len = array('I')
+        self._extra = array('q')
+        self._extra_len = array('I')
+
+        # Path table: arena (offset, length) per path ID
+        self._path_offset = array('q')
+        self._path_len = array('I')
+        self._path_ids = {}
+
+    @property
+    def spilled(self):
+        """True once the value arena has moved to disk"""
+        return self._arena.spilled
+
+    def _put(self, data):
+        return self._arena.append(data), len(data)
+
+    def _put_value(self, value):
+        if value is None:
+            return _NONE, -1, 0
+        if type(value) is str:
+            return (_STR,) + self._put(value.encode('utf-8', 'surrogatepass'))
+        return (_JSON,) + self._put(json.dumps(value, default=str).encode('utf-8'))
+
+    def _path_id(self, path):
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            if len(self._path_ids) >= _PATH_DEDUP_LIMIT:
+                self._path_ids.clear()
+            path_id = self._path_ids[path] = len(self._path_offset)
+            offset, length = self._put(path.encode('utf-8', 'surrogatepass'))
+            self._path_offset.append(offset)
+            self._path_len.append(length)
+        return path_id
+
+    def append(self, record):
+        """Add one record (a DiffRecord or a record dict)"""
+        if isinstance(record, DiffRecord):
+            severity, diff_type, path = record.severity, record.type, record.path
+            old_value, new_value, extra = record.old_value, record.new_value, record.extra
+        else:
+            severity, diff_type, path = record.get("severity"), record["type"], record["path"]
+            old_value, new_value = record["old_value"], record["new_value"]
+            extra = {key: value for key, value in record.items()
+                     if key not in ("path", "type", "old_value", "new_value", "severity")}
+
+        self._severity.append(self._severities.code(severity))
+        self._type.append(self._types.code(diff_type))
+        self._path.append(self._path_id(str(path)))
+
+        kind, offset, length = self._put_value(old_value)
+        self._old_kind.append(kind)
+        self._old.append(offset)
+        self._old_len.append(length)
+
+        kind, offset, length = self._put_value(new_value)
+        self._new_kind.append(kind)
+        self._new.append(offset)
+        self._new_len.append(length)
+
+        if extra:
+            offset, length = self._put(json.dumps(extra, default=str).encode('utf-8'))
+        else:
+            offset, length = -1, 0
+        self._extra.append(offset)
+        self._extra_len.append(length)
+
+    def extend(self, records):
+        """Add records from any iterable; returns the view holding them"""
+        start = len(self)
+        for record in records:
+            self.append(record)
+        return DiffStoreView(self, start, len(self))
+
+    def __len__(self):
+        return len(self._severity)
+
+    def _value(self, kind, offset, length):
+        if kind == _NONE:
+            return None
+        data = self._arena.read(offset, length)
+        if kind == _STR:
+            return data.decode('utf-8', 'surrogatepass')
+        return json.loads(data)
+
+    def severity_at(self, index):
+        """Severity of one record without materializing it"""
+        return self._severities.values[self._severity[index]]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return DiffStoreView(self, start, stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("diff store index out of range")
+
+        path_id = self._path[index]
+        path = self._arena.read(self._path_offset[path_id], self._path_len[path_id]).decode('utf-8', 'surrogatepass')
+        extra = None
+        if self._extra[index] >= 0:
+            extra = json.loads(self._arena.read(self._extra[index], self._extra_len[index]))
+        return DiffRecord(
+            path,
+            self._types.values[self._type[index]],
+            self._value(self._old_kind[index], self._old[index], self._old_len[index]),
+            self._value(self._new_kind[index], self._new[index], self._new_len[index]),
+            self._severities.values[self._severity[index]],
+            extra
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def iter_severity(self, severity, limit=None):
+        """Records of one severity, in order, decoding only the ones returned"""
+        code = self._severities.codes.get(severity)
+        if code is None:
+            return
+        shown = 0
+        for index, record_code in enumerate(self._severity):
+            if record_code == code:
+                if limit is not None and shown >= limit:
+                    return
+                shown += 1
+                yield self[index]
+
+    def severity_counts(self):
+        """{severity: count} from the severity column alone"""
+        counts = {}
+        for code in self._severity:
+            severity = self._severities.values[code]
+            counts[severity] = counts.get(severity, 0) + 1
+        return counts
+
+    def close(self):
+        """Release the arena (and its temp file, if it spilled)"""
+        self._arena.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DiffStoreView(Sequence):
+    """A contiguous range of a DiffStore, e.g. the records of one endpoint"""
+
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return DiffStoreView(self.store, self.start + start, self.start + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("diff store view index out of range")
+        return self.store[self.start + index]
+
+    def __iter__(self):
+        store = self.store
+        for index in range(self.start, self.stop):
+            yield store[index]
+
+    def __repr__(self):
+        return f"DiffStoreView({self.start}:{self.stop}, {len(self)} records)"
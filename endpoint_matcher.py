@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+ENDPOINT MATCHER
+Matches API responses between two captures by endpoint template.
+
+Raw URL paths carry tenant data: the same call is
+/api/users/96aa4804-.../slds on one environment and /api/users/3f1c...-.../slds
+on another, so matching on urlparse(url).path reports it as one endpoint
+removed and another added. normalize_endpoint() turns a URL into:
+- a template, where path segments that are IDs become typed placeholders
+  ({uuid}, {int}, {hash}) and the query string becomes its sorted key set:
+      /api/lookup/site-overview/{uuid}?company_id
+- the IDs it took out (path IDs, then query values by key), kept as match
+  attributes
+
+match_endpoints() indexes both captures by template in one pass each and
+joins the two indexes. When a template occurs once per side, the two calls
+are paired whatever their IDs. Repeated calls of a template (the same call
+made three times, or one site-overview call per site) are matched by body:
+- calls whose bodies are identical (by content hash) count once
+- identical bodies on both sides are paired without any diffing
+- the remaining bodies are paired by (same IDs, estimated similarity),
+  where similarity is estimated from small MinHash sketches of the bodies'
+  leaf values instead of diffing every candidate pair; calls with other IDs
+  pair only when at least MIN_SIMILARITY alike, the rest are reported as
+  added or removed
+Pairs of repeated calls are labelled "template [ids]" (plus " #2"... when
+the label repeats).
+"""
+
+import hashlib
+import heapq
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import urlparse, parse_qsl
+
+_ID_PATTERNS = (
+    ("uuid", re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')),
+    ("int", re.compile(r'\d+$')),
+    ("hash", re.compile(r'[0-9a-fA-F]{16,}$')),
+)
+
+# Leaf hashes kept per body for similarity estimates
+SKETCH_SIZE = 64
+
+# Estimated similarity below which calls with different IDs are not paired
+MIN_SIMILARITY = 0.3
+
+
+class EndpointKey(namedtuple("EndpointKey", "template ids")):
+    """Endpoint template plus the IDs taken out of the URL"""
+
+    __slots__ = ()
+
+    @property
+    def label(self):
+        """Template with its IDs, for telling several calls of one template apart"""
+        return f"{self.template} [{', '.join(self.ids)}]" if self.ids else self.template
+
+
+def _id_kind(segment):
+    for kind, pattern in _ID_PATTERNS:
+        if pattern.match(segment):
+            return kind
+    return None
+
+
+@lru_cache(maxsize=65536)
+def normalize_endpoint(url):
+    """EndpointKey for a URL (the host is ignored, like the raw-path keys were)"""
+    parsed = urlparse(url)
+
+    segments = []
+    ids = []
+    for segment in parsed.path.rstrip('/').split('/'):
+        kind = _id_kind(segment)
+        if kind is None:
+            segments.append(segment)
+        else:
+            segments.append('{' + kind + '}')
+            ids.append(segment)
+    template = '/'.join(segments) or '/'
+
+    query = sorted(parse_qsl(parsed.query, keep_blank_values=True))
+    if query:
+        template += '?' + '&'.join(sorted({name for name, _ in query}))
+        ids.extend(f"{name}={value}" for name, value in query)
+
+    return EndpointKey(template, tuple(ids))
+
+
+def endpoint_template(url):
+    """Just the template of a URL"""
+    return normalize_endpoint(url).template
+
+
+def response_content_hash(entry):
+    """Hash of an entry's response body; key order and formatting don't matter"""
+    body = entry.get('response', entry) if isinstance(entry, dict) else entry
+    text = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def _leaf_tokens(body):
+    """One token per leaf value: its path (list positions left out) and value"""
+    stack = [("", body)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict):
+            for key, child in value.items():
+                stack.append((f"{path}.{key}", child))
+        elif isinstance(value, list):
+            for child in value:
+                stack.append((path + "[]", child))
+        else:
+            yield f"{path}={value!r}"
+
+
+def similarity_sketch(entry, size=SKETCH_SIZE):
+    """
+    Bottom-k MinHash sketch of an entry's response body: the `size` smallest
+    leaf-token hashes. Two sketches estimate the bodies' Jaccard similarity.
+    The hashes are stable across processes and runs, unlike hash().
+    """
+    body = entry.get('response', entry) if isinstance(entry, dict) else entry
+    return frozenset(heapq.nsmallest(size, {_token_hash(token) for token in _leaf_tokens(body)}))
+
+
+def _token_hash(token):
+    digest = hashlib.blake2b(token.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def estimate_similarity(sketch1, sketch2, size=SKETCH_SIZE):
+    """Jaccard similarity (0..1) estimated from two similarity_sketch() results"""
+    union = heapq.nsmallest(size, sketch1 | sketch2)
+    if not union:
+        return 1.0
+    return sum(1 for value in union if value in sketch1 and value in sketch2) / len(union)
+
+
+class _Call:
+    """One distinct response body of an endpoint template"""
+
+    __slots__ = ("ids", "value", "content_hash", "sketch")
+
+    def __init__(self, ids, value, content_hash):
+        self.ids = ids
+        self.value = value
+        self.content_hash = content_hash
+        self.sketch = None
+
+
+def _distinct_calls(calls, load):
+    """Calls with repeated bodies dropped (first one kept), in call order"""
+    distinct = {}
+    for ids, value in calls:
+        content_hash = response_content_hash(load(value))
+        if content_hash not in distinct:
+            distinct[content_hash] = _Call(ids, value, content_hash)
+    return list(distinct.values())
+
+
+def _pair_calls(old_calls, new_calls, load):
+    """
+    Pair distinct calls of one template: identical bodies first, then by
+    (same IDs, estimated similarity). When one call is left on each side
+    they pair whatever their IDs and bodies, as single calls do; with more
+    to choose from, calls with different IDs pair only at MIN_SIMILARITY or
+    above. Returns (pairs, unpaired old, unpaired new).
+    """
+    pairs = []
+    new_by_hash = {}
+    for call in new_calls:
+        new_by_hash[call.content_hash] = call
+    old_rest = []
+    for call in old_calls:
+        match = new_by_hash.pop(call.content_hash, None)
+        if match is None:
+            old_rest.append(call)
+        else:
+            pairs.append((call, match))
+    new_rest = [call for call in new_calls if call.content_hash in new_by_hash]
+
+    if len(old_rest) == 1 and len(new_rest) == 1:
+        pairs.append((old_rest[0], new_rest[0]))
+        return pairs, [], []
+
+    if old_rest and new_rest:
+        for call in old_rest + new_rest:
+            call.sketch = similarity_sketch(load(call.value))
+        candidates = sorted(
+            ((old.ids == new.ids, estimate_similarity(old.sketch, new.sketch), -i, -j)
+             for i, old in enumerate(old_rest) for j, new in enumerate(new_rest)),
+            reverse=True
+        )
+        used_old, used_new = set(), set()
+        for same_ids, similarity, i, j in candidates:
+            i, j = -i, -j
+            if not same_ids and similarity < MIN_SIMILARITY:
+                continue
+            if i not in used_old and j not in used_new:
+                used_old.add(i)
+                used_new.add(j)
+                pairs.append((old_rest[i], new_rest[j]))
+        old_rest = [call for i, call in enumerate(old_rest) if i not in used_old]
+        new_rest = [call for j, call in enumerate(new_rest) if j not in used_new]
+
+    return pairs, old_rest, new_rest
+
+
+def index_endpoints(items, normalize=normalize_endpoint):
+    """{template: [(ids, value), ...]} for (url, value) items, in call order"""
+    index = {}
+    for url, value in items:
+        key = normalize(url)
+        index.setdefault(key.template, []).append((key.ids, value))
+    return index
+
+
+def join_endpoint_indexes(old_index, new_index, load=None):
+    """
+    Join two index_endpoints() results.
+    Returns (old_by_endpoint, new_by_endpoint), keyed by the same labels.
+    load turns a stored value into its response entry (default: the value
+    is the entry); it is only called for templates with repeated calls.
+    """
+    load = load or (lambda value: value)
+    old_by_endpoint = {}
+    new_by_endpoint = {}
+
+    for template in old_index.keys() | new_index.keys():
+        old_calls = old_index.get(template, [])
+        new_calls = new_index.get(template, [])
+
+        if len(old_calls) > 1 or len(new_calls) > 1:
+            old_calls = _distinct_calls(old_calls, load)
+            new_calls = _distinct_calls(new_calls, load)
+            if len(old_calls) > 1 or len(new_calls) > 1:
+                _join_repeated(template, old_calls, new_calls, load, old_by_endpoint, new_by_endpoint)
+                continue
+            old_calls = [(call.ids, call.value) for call in old_calls]
+            new_calls = [(call.ids, call.value) for call in new_calls]
+
+        # A single call on each side pairs whatever its IDs
+        for _, value in old_calls:
+            old_by_endpoint[template] = value
+        for _, value in new_calls:
+            new_by_endpoint[template] = value
+
+    return old_by_endpoint, new_by_endpoint
+
+
+def _join_repeated(template, old_calls, new_calls, load, old_by_endpoint, new_by_endpoint):
+    """Label and store the pairs of a template with several distinct bodies"""
+    pairs, old_rest, new_rest = _pair_calls(old_calls, new_calls, load)
+    used = set()
+
+    def label_for(ids):
+        base = EndpointKey(template, ids).label
+        label, n = base, 1
+        while label in used:
+            n += 1
+            label = f"{base} #{n}"
+        used.add(label)
+        return label
+
+    for old, new in pairs:
+        label = label_for(old.ids)
+        old_by_endpoint[label] = old.value
+        new_by_endpoint[label] = new.value
+    for old in old_rest:
+        old_by_endpoint[label_for(old.ids)] = old.value
+    for new in new_rest:
+        new_by_endpoint[label_for(new.ids)] = new.value
+
+
+def match_endpoints(old_items, new_items, normalize=normalize_endpoint, load=None):
+    """
+    Pair (url, value) items from two captures by endpoint template.
+    Returns (old_by_endpoint, new_by_endpoint); an endpoint present in only
+    one of them was added or removed.
+    """
+    return join_endpoint_indexes(index_endpoints(old_items, normalize),
+                                 index_endpoints(new_items, normalize), load)
@@ -1,14 +1,13 @@
 import json
 import os
-import time
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from network_capture import NetworkCapture, wait_for_dom_stable
+from browser_session import export_session
+from session_store import SessionStore, chrome_driver
 
 class EnhancedSiteDataCapture:
     def __init__(self, base_url, email, password):
@@ -16,6 +15,9 @@ class EnhancedSiteDataCapture:
         self.email = email
         self.password = password
         self.driver = None
+        self.network = None
+        # Logins saved by earlier runs, reused while the API accepts them
+        self.sessions = SessionStore()
         
         # Create timestamped output directory
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -29,7 +31,7 @@ class EnhancedSiteDataCapture:
         print(f"Created output directory: {self.output_dir}")
     
     def setup_driver(self):
-        """Setup Chrome driver with network logging enabled"""
+        """Setup Chrome driver with a live network capture attached"""
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -37,19 +39,20 @@ class EnhancedSiteDataCapture:
         # Run in headless mode to avoid display issues
         chrome_options.add_argument("--headless")
         
-        # Enable performance logging
-        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-        
-        # Setup ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Setup ChromeDriver (the path is looked up once, then cached)
+        self.driver = chrome_driver(chrome_options)
         print("Chrome driver initialized successfully")
+        
+        # Collect API response bodies as they finish loading
+        self.network = NetworkCapture(self.driver).start()
     
     def login(self):
-        """Login to the ACME website"""
+        """Login to the ACME website, reusing the saved session when it is still valid"""
         print("Logging in to the website...")
+        if self.sessions.restore(self.driver, self.base_url, self.email, wait=self.network.wait_until_settled):
+            return
         self.driver.get(f"{self.base_url}/login")
-        time.sleep(2)
+        self.network.wait_until_settled()
         
         # Enter credentials
         self.driver.find_element(By.NAME, "email").send_keys(self.email)
@@ -61,7 +64,8 @@ class EnhancedSiteDataCapture:
             EC.url_contains("/dashboard")
         )
         print("Login successful")
-        time.sleep(3)
+        self.network.wait_until_settled()
+        self.sessions.save(export_session(self.driver), self.email)
     
     def get_all_sites_from_dropdown(self):
         """Get all sites from the site dropdown"""
@@ -69,7 +73,7 @@ class EnhancedSiteDataCapture:
         
         # Navigate to sites page or wherever the dropdown is accessible
         self.driver.get(f"{self.base_url}/sites")
-        time.sleep(3)
+        self.network.wait_until_settled()
         
         try:
             # Find the site dropdown - adjust selector based on actual website
@@ -86,7 +90,7 @@ class EnhancedSiteDataCapture:
             else:
                 # If it's a custom dropdown, we need to click it to reveal options
                 site_dropdown.click()
-                time.sleep(1)
+                wait_for_dom_stable(self.driver)
                 
                 # Find all option elements - adjust selector based on actual website
                 option_elements = self.driver.find_elements(By.CSS_SELECTOR, 
@@ -118,7 +122,7 @@ class EnhancedSiteDataCapture:
         try:
             # Navigate to sites page
             self.driver.get(f"{self.base_url}/sites")
-            time.sleep(3)
+            self.network.wait_until_settled()
             
             # Select the site from dropdown
             # Adjust these selectors based on the actual website structure
@@ -135,7 +139,7 @@ class EnhancedSiteDataCapture:
                     dropdown_trigger = self.driver.find_element(By.CSS_SELECTOR,
                         ".site-dropdown, .dropdown-toggle, [data-toggle='dropdown']")
                     dropdown_trigger.click()
-                    time.sleep(1)
+                    wait_for_dom_stable(self.driver)
                     
                     # Find and click the specific site option
                     site_option = self.driver.find_element(By.XPATH,
@@ -146,7 +150,7 @@ class EnhancedSiteDataCapture:
                     return False
             
             # Wait for page to update after site selection
-            time.sleep(3)
+            self.network.wait_until_settled()
             
             # Capture data for this site
             site_dir = os.path.join(self.output_dir, "sites", site_name.replace("/", "_").replace("\\", "_"))
@@ -190,7 +194,7 @@ class EnhancedSiteDataCapture:
                     
                     print(f"  Accessing {page_name} for {site_name}...")
                     self.driver.get(f"{self.base_url}{page_url}")
-                    time.sleep(2)
+                    self.network.wait_until_settled()
                     
                     # Take screenshot
                     page_screenshot = os.path.join(site_dir, "screenshots", f"{page_name}.png")
@@ -218,8 +222,8 @@ class EnhancedSiteDataCapture:
         print(f"Capturing API responses for site: {site_name}...")
         
         try:
-            # Get performance logs
-            logs = self.driver.get_log('performance')
+            # Everything that finished loading since the previous site
+            entries = self.network.take()
             
             api_responses = []
             response_count = 0
@@ -228,68 +232,33 @@ class EnhancedSiteDataCapture:
             api_dir = os.path.join(site_dir, "api_responses")
             os.makedirs(api_dir, exist_ok=True)
             
-            for log in logs:
-                try:
-                    message = json.loads(log['message'])
-                    
-                    # Check if this is a response received event
-                    if (message['message']['method'] == 'Network.responseReceived' and 
-                        'response' in message['message']['params']):
-                        
-                        response = message['message']['params']['response']
-                        url = response['url']
-                        
-                        # Filter for API endpoints (typically containing /api/ or returning JSON)
-                        if (('/api/' in url or 'json' in response.get('mimeType', '')) and 
-                            response['status'] == 200):
-                            
-                            try:
-                                # Enable Network domain to get response bodies
-                                self.driver.execute_cdp_cmd('Network.enable', {})
-                                
-                                # Get response body
-                                request_id = message['message']['params']['requestId']
-                                result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                                response_body = result.get('body', '')
-                                
-                                # Handle base64 encoded responses
-                                if result.get('base64Encoded', False):
-                                    import base64
-                                    response_body = base64.b64decode(response_body).decode('utf-8')
-                                
-                                # Try to parse as JSON
-                                try:
-                                    response_body = json.loads(response_body)
-                                except:
-                                    pass  # Keep as string if not JSON
-                                
-                                # Create API response entry
-                                api_entry = {
-                                    'url': url,
-                                    'status': response['status'],
-                                    'mimeType': response.get('mimeType', ''),
-                                    'timestamp': log['timestamp'],
-                                    'response': response_body,
-                                    'site': site_name
-                                }
-                                
-                                api_responses.append(api_entry)
-                                response_count += 1
-                                
-                                # Save individual response to file
-                                filename = f"response_{response_count}.json"
-                                filepath = os.path.join(api_dir, filename)
-                                
-                                with open(filepath, 'w') as f:
-                                    json.dump(api_entry, f, indent=2, default=str)
-                                
-                                print(f"  ✓ API response saved: {filename}")
-                                
-                            except Exception as e:
-                                print(f"  ✗ Could not get response body for {url}: {e}")
-                                
-                except Exception as e:
-                    continue  # Skip malformed log entries
+            for entry in entries:
+                url = entry['url']
+                if 'error' in entry:
+                    print(f"  ✗ Could not get response body for {url}: {entry['error']}")
+                    continue
+                
+                # Create API response entry
+                api_entry = {
+                    'url': url,
+                    'status': entry['status'],
+                    'mimeType': entry['mimeType'],
+                    'timestamp': entry['timestamp'],
+                    'response': entry['response'],
+                    'site': site_name
+                }
+                
+                api_responses.append(api_entry)
+                response_count += 1
+                
+                # Save individual response to file
+                filename = f"response_{response_count}.json"
+                filepath = os.path.join(api_dir, filename)
+                
+                with open(filepath, 'w') as f:
+                    json.dump(api_entry, f, indent=2, default=str)
+                
+                print(f"  ✓ API response saved: {filename}")
             
             print(f"Captured {len(api_responses)} API responses for site: {site_name}")
             return api_responses
@@ -348,6 +317,8 @@ class EnhancedSiteDataCapture:
             raise
             
         finally:
+            if self.network:
+                self.network.stop()
             if self.driver:
                 self.driver.quit()
 
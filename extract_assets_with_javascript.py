@@ -12,6 +12,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from network_capture import NetworkCapture, wait_for_dom_stable
 
 class JavaScriptAssetExtractor:
     def __init__(self):
@@ -21,6 +22,8 @@ class JavaScriptAssetExtractor:
         chrome_options.add_argument("--window-size=1920,1080")
 
         self.driver = webdriver.Chrome(options=chrome_options)
+        # Tracks in-flight requests so each step waits only until the page settles
+        self.network = NetworkCapture(self.driver, accept=None).start()
         self.driver.maximize_window()
         self.wait = WebDriverWait(self.driver, 20)
 
@@ -31,7 +34,7 @@ class JavaScriptAssetExtractor:
         print(f"{'='*70}")
 
         self.driver.get(f"{url}/login")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         try:
             email_field = self.wait.until(
@@ -47,7 +50,7 @@ class JavaScriptAssetExtractor:
             sign_in_button = self.driver.find_element(By.XPATH, "//button[@type='submit']")
             sign_in_button.click()
 
-            time.sleep(8)
+            self.network.wait_until_settled()
             print(f"✓ Login successful!\n")
             return True
 
@@ -60,7 +63,7 @@ class JavaScriptAssetExtractor:
         print(f"🔍 Navigating to Assets page...")
 
         try:
-            time.sleep(3)
+            self.network.wait_until_settled()
 
             # Try to find and click Assets link
             try:
@@ -68,14 +71,14 @@ class JavaScriptAssetExtractor:
                     EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Assets')]"))
                 )
                 assets_link.click()
-                time.sleep(5)
+                self.network.wait_until_settled()
                 print(f"✓ Clicked Assets tab\n")
             except:
                 # Direct navigation
                 current_url = self.driver.current_url
                 base_url = current_url.split('/dashboard')[0] if '/dashboard' in current_url else current_url.split('/site')[0]
                 self.driver.get(f"{base_url}/assets")
-                time.sleep(5)
+                self.network.wait_until_settled()
                 print(f"✓ Navigated via URL\n")
 
             return True
@@ -94,7 +97,7 @@ class JavaScriptAssetExtractor:
         print(f"🔧 Extracting assets using JavaScript...\n")
 
         # Wait for page to fully load
-        time.sleep(5)
+        self.network.wait_until_settled()
 
         # Take screenshot
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -273,11 +276,11 @@ class JavaScriptAssetExtractor:
             # Click dropdown
             dropdown = self.driver.find_element(By.XPATH, "//div[contains(@class, 'MuiTablePagination-select')]")
             dropdown.click()
-            time.sleep(1)
+            wait_for_dom_stable(self.driver)
             # Select 100
             option = self.driver.find_element(By.XPATH, "//li[@data-value='100']")
             option.click()
-            time.sleep(3)
+            self.network.wait_until_settled()
             print(f"✓ Set to 100 rows per page\n")
         except:
             print(f"⚠ Could not set rows per page\n")
@@ -304,6 +307,7 @@ class JavaScriptAssetExtractor:
         try:
             print("\n👋 Closing browser...")
             time.sleep(2)
+            self.network.stop()
             self.driver.quit()
         except:
             pass
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+FIELD RULES
+Compiled ignore / important-ID / critical-field rules for the comparators.
+
+Rule kinds:
+- ignore_fields:       field names that are expected to change (timestamps, tokens...)
+- ignore_patterns:     regexes for more field names to ignore (re.match semantics)
+- important_id_fields: field names that are never ignored, even if a pattern matches
+- critical_fields:     business-critical field names (never ignored by a pattern)
+- ignore_paths / keep_paths / critical_paths:
+                       path-scoped rules like "sites.*.updated_at"
+- list_key_fields:     field names that identify the rows of a list, besides
+                       id-like names (id, name, *_id, ...), e.g. "serial_number"
+
+Path rules are matched against the end of a field's path. Segments are
+separated by dots, a list index or selector counts as a segment of its own,
+and "*" matches exactly one segment. So "sites.*.updated_at" matches
+"response.sites[3].updated_at" and "response.sites.abc.updated_at".
+A path rule overrides the name rules for the fields it matches; keep_paths
+wins over ignore_paths.
+
+All name patterns are compiled into one regex and every decision is cached
+per field name (and per path, with list selectors blanked, for fields that
+have path rules), so evaluating the rules costs a dict lookup per visit.
+
+Extra rules can be loaded from a JSON file with any of the keys above, e.g.:
+
+{
+  "ignore_fields": ["request_id"],
+  "ignore_paths": ["sites.*.updated_at"],
+  "keep_paths": ["sites.*.last_modified"],
+  "critical_paths": ["summary.*.asset_count"],
+  "list_key_fields": ["serial_number"]
+}
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from json_diff_engine import render_path
+
+# Rules file picked up by the comparators when present
+DEFAULT_RULES_FILE = "comparison_rules.json"
+
+RULE_KEYS = ("ignore_fields", "ignore_patterns", "important_id_fields", "critical_fields",
+             "ignore_paths", "keep_paths", "critical_paths", "list_key_fields")
+
+_SELECTOR = re.compile(r'\[[^\]]*\]')
+
+
+def _canonical_path(path):
+    """Path with every list selector turned into a '[]' segment: a.b[3].c -> a.b.[].c"""
+    return _SELECTOR.sub('.[]', path).lstrip('.')
+
+
+def _compile_path_rules(rules):
+    """One regex matching the end of a canonical path against any of the rules"""
+    if not rules:
+        return None
+    alternatives = []
+    for rule in rules:
+        segments = _canonical_path(rule).split('.')
+        alternatives.append(r'\.'.join('[^.]+' if segment == '*' else re.escape(segment)
+                                       for segment in segments))
+    return re.compile(r'(?:^|\.)(?:' + '|'.join(alternatives) + r')$')
+
+
+class FieldRuleMatcher:
+    """Decides whether a field is ignored and/or critical"""
+
+    def __init__(self, ignore_fields=(), ignore_patterns=(), important_id_fields=(),
+                 critical_fields=(), ignore_paths=(), keep_paths=(), critical_paths=(),
+                 list_key_fields=(), cache_size=65536):
+        self.rules = {
+            "ignore_fields": ignore_fields if isinstance(ignore_fields, set) else set(ignore_fields),
+            "ignore_patterns": ignore_patterns if isinstance(ignore_patterns, list) else list(ignore_patterns),
+            "important_id_fields": important_id_fields if isinstance(important_id_fields, set) else set(important_id_fields),
+            "critical_fields": critical_fields if isinstance(critical_fields, set) else set(critical_fields),
+            "ignore_paths": list(ignore_paths),
+            "keep_paths": list(keep_paths),
+            "critical_paths": list(critical_paths),
+            "list_key_fields": set(list_key_fields),
+        }
+        self.cache_size = cache_size
+        self.compile()
+
+    def load(self, rules_file):
+        """Add the rules from a JSON rules file. Returns True if the file was loaded."""
+        if not rules_file or not os.path.exists(rules_file):
+            return False
+
+        with open(rules_file, 'r') as f:
+            data = json.load(f)
+
+        unknown = set(data) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown rule keys in {rules_file}: {', '.join(sorted(unknown))}")
+
+        for name, values in data.items():
+            if isinstance(values, str):
+                values = [values]
+            rule = self.rules[name]
+            if isinstance(rule, set):
+                rule.update(values)
+            else:
+                rule.extend(value for value in values if value not in rule)
+
+        self.compile()
+        return True
+
+    def compile(self):
+        """(Re)build the compiled matchers and reset the decision caches"""
+        patterns = self.rules["ignore_patterns"]
+        self._ignore_pattern = re.compile('|'.join(f'(?:{p})' for p in patterns)) if patterns else None
+
+        self._ignore_paths = _compile_path_rules(self.rules["ignore_paths"])
+        self._keep_paths = _compile_path_rules(self.rules["keep_paths"])
+        self._critical_paths = _compile_path_rules(self.rules["critical_paths"])
+
+        # Fields whose decision can depend on their path
+        self._scoped_fields = set()
+        self._scope_all_fields = False
+        for name in ("ignore_paths", "keep_paths", "critical_paths"):
+            for rule in self.rules[name]:
+                last = _canonical_path(rule).split('.')[-1]
+                if last in ('*', '[]'):
+                    self._scope_all_fields = True
+                else:
+                    self._scoped_fields.add(last)
+
+        self._decide_name = lru_cache(maxsize=self.cache_size)(self._evaluate_name)
+        self._decide_path = lru_cache(maxsize=self.cache_size)(self._evaluate_path)
+
+    def _evaluate_name(self, field_name):
+        critical = field_name in self.rules["critical_fields"]
+
+        # Don't ignore if it's in the important list
+        if field_name in self.rules["important_id_fields"]:
+            ignored = False
+        # Ignore if in the ignore list
+        elif field_name in self.rules["ignore_fields"]:
+            ignored = True
+        # Pattern matches are ignored, unless the field is critical
+        elif self._ignore_pattern is not None and self._ignore_pattern.match(field_name):
+            ignored = not critical
+        else:
+            ignored = False
+
+        return ignored, critical
+
+    def _evaluate_path(self, field_name, canonical_path):
+        ignored, critical = self._decide_name(field_name)
+        if self._critical_paths is not None and self._critical_paths.search(canonical_path):
+            critical = True
+        if self._keep_paths is not None and self._keep_paths.search(canonical_path):
+            ignored = False
+        elif self._ignore_paths is not None and self._ignore_paths.search(canonical_path):
+            ignored = True
+        return ignored, critical
+
+    def decide(self, field_name, path=None):
+        """
+        (ignored, critical) for a field; path is the field's full path (a
+        string or a diff-walk path node), if known
+        """
+        if path and (self._scope_all_fields or field_name in self._scoped_fields):
+            return self._decide_path(field_name, _canonical_path(render_path(path, blank_selectors=True)))
+        return self._decide_name(field_name)
+
+    def is_ignored(self, field_name, path=None):
+        return self.decide(field_name, path)[0]
+
+    def is_critical(self, field_name, path=None):
+        return self.decide(field_name, path)[1]
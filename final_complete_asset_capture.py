@@ -12,6 +12,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
+from network_capture import NetworkCapture, wait_for_dom_stable
 
 class CompleteAssetCapture:
     def __init__(self):
@@ -22,6 +23,8 @@ class CompleteAssetCapture:
         chrome_options.add_argument("--start-maximized")
 
         self.driver = webdriver.Chrome(options=chrome_options)
+        # Tracks in-flight requests so each step waits only until the page settles
+        self.network = NetworkCapture(self.driver, accept=None).start()
         self.wait = WebDriverWait(self.driver, 20)
 
     def login(self, url, email, password):
@@ -31,7 +34,7 @@ class CompleteAssetCapture:
         print(f"{'='*70}")
 
         self.driver.get(f"{url}/login")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         email_field = self.wait.until(EC.presence_of_element_located((By.NAME, "email")))
         email_field.send_keys(email)
@@ -41,7 +44,7 @@ class CompleteAssetCapture:
 
         sign_in_button = self.driver.find_element(By.XPATH, "//button[@type='submit']")
         sign_in_button.click()
-        time.sleep(8)
+        self.network.wait_until_settled()
 
         print(f"✓ Login successful!\n")
         return True
@@ -49,7 +52,7 @@ class CompleteAssetCapture:
     def navigate_to_assets(self):
         """Navigate to Assets"""
         print(f"🔍 Navigating to Assets...")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         try:
             assets_link = self.wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Assets')]")))
@@ -59,7 +62,7 @@ class CompleteAssetCapture:
             base_url = current_url.split('/dashboard')[0] if '/dashboard' in current_url else current_url.split('/site')[0]
             self.driver.get(f"{base_url}/assets")
 
-        time.sleep(5)
+        self.network.wait_until_settled()
         print(f"✓ On Assets page\n")
         return True
 
@@ -69,10 +72,10 @@ class CompleteAssetCapture:
         try:
             dropdown = self.driver.find_element(By.XPATH, "//div[contains(@class, 'MuiTablePagination-select')]")
             dropdown.click()
-            time.sleep(1)
+            wait_for_dom_stable(self.driver)
             option = self.driver.find_element(By.XPATH, "//li[@data-value='100']")
             option.click()
-            time.sleep(5)  # Wait longer for table to reload
+            self.network.wait_until_settled()  # Wait for table to reload
             print(f"✓ Set to 100 rows\n")
             return True
         except:
@@ -84,13 +87,13 @@ class CompleteAssetCapture:
         print(f"📜 Scrolling page to load all data...")
         # Scroll down
         self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+        self.network.wait_until_settled()
         # Scroll up
         self.driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(2)
+        self.network.wait_until_settled()
         # Scroll middle
         self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-        time.sleep(2)
+        self.network.wait_until_settled()
         print(f"✓ Scrolling complete\n")
 
     def extract_assets_from_page(self):
@@ -138,7 +141,7 @@ class CompleteAssetCapture:
 
             if next_button.is_enabled() and 'disabled' not in next_button.get_attribute('class').lower():
                 next_button.click()
-                time.sleep(4)  # Wait for page to load
+                self.network.wait_until_settled()  # Wait for page to load
                 return True
         except:
             pass
@@ -201,6 +204,7 @@ class CompleteAssetCapture:
         try:
             print("\n👋 Closing browser...")
             time.sleep(2)
+            self.network.stop()
             self.driver.quit()
         except:
             pass
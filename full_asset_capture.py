@@ -12,6 +12,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
+from network_capture import NetworkCapture, wait_for_dom_stable
 import sys
 
 class FullAssetCapture:
@@ -29,10 +30,9 @@ class FullAssetCapture:
         # Run in visible mode to see what's happening
         # options.add_argument('--headless')
 
-        # Enable logging to see network requests
-        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-
         self.driver = webdriver.Chrome(options=options)
+        # Tracks in-flight requests so each step waits only until the page settles
+        self.network = NetworkCapture(self.driver, accept=None).start()
         self.driver.maximize_window()
 
     def login(self, url, email, password):
@@ -42,7 +42,7 @@ class FullAssetCapture:
         print(f"{'='*60}")
 
         self.driver.get(f"{url}/login")
-        time.sleep(3)
+        self.network.wait_until_settled()
 
         try:
             email_field = WebDriverWait(self.driver, 10).until(
@@ -61,7 +61,7 @@ class FullAssetCapture:
             sign_in_button.click()
             print(f"✓ Clicked Sign In")
 
-            time.sleep(8)
+            self.network.wait_until_settled()
 
             current_url = self.driver.current_url
             if "dashboard" in current_url or "site" in current_url:
@@ -92,7 +92,7 @@ class FullAssetCapture:
                 try:
                     assets_link = self.driver.find_element(By.XPATH, selector)
                     assets_link.click()
-                    time.sleep(3)
+                    self.network.wait_until_settled()
                     print(f"✓ Navigated to Assets page")
                     return True
                 except:
@@ -111,7 +111,7 @@ class FullAssetCapture:
 
             for asset_url in asset_urls:
                 self.driver.get(asset_url)
-                time.sleep(3)
+                self.network.wait_until_settled()
 
                 # Check if we got to assets page
                 if "asset" in self.driver.current_url.lower() or "Assets" in self.driver.page_source:
@@ -234,7 +234,7 @@ class FullAssetCapture:
         while True:
             # Scroll down
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
+            self.network.wait_until_settled()
 
             # Calculate new scroll height
             new_height = self.driver.execute_script("return document.body.scrollHeight")
@@ -262,12 +262,12 @@ class FullAssetCapture:
                 try:
                     dropdown = self.driver.find_element(By.XPATH, selector)
                     dropdown.click()
-                    time.sleep(1)
+                    wait_for_dom_stable(self.driver)
 
                     # Try to select 100
                     option = self.driver.find_element(By.XPATH, f"//option[@value='{rows}'] | //li[contains(text(), '{rows}')]")
                     option.click()
-                    time.sleep(3)
+                    self.network.wait_until_settled()
 
                     print(f"✓ Set to {rows} rows per page")
                     return True
@@ -296,7 +296,7 @@ class FullAssetCapture:
                     # Check if button is enabled
                     if button.is_enabled() and not button.get_attribute("disabled"):
                         button.click()
-                        time.sleep(3)
+                        self.network.wait_until_settled()
                         return True
                 except:
                     continue
@@ -446,6 +446,7 @@ class FullAssetCapture:
             if self.driver:
                 print(f"\n🚪 Closing browser...")
                 input("Press Enter to close browser...")
+                self.network.stop()
                 self.driver.quit()
 
     def generate_detailed_comparison(self, rnd_assets, ai_assets):
@@ -7,8 +7,12 @@ and compares all JSON data to detect every difference.
 import json
 import os
 import difflib
-from urllib.parse import urlparse
 from collections import defaultdict
+from endpoint_matcher import endpoint_template, match_endpoints
+from json_diff_engine import (
+    iter_raw_differences, render_path, SeverityCounter, TYPE_MISMATCH, KEY_ADDED,
+    KEY_REMOVED, LENGTH_MISMATCH, VALUE_CHANGED
+)
 
 def load_json_file(filepath):
     """Load JSON data from a file"""
@@ -21,113 +25,80 @@ def load_json_file(filepath):
 
 def extract_endpoint_key(url):
     """
-    Extract a comparable key from URL (path + query params without values)
+    Extract a comparable key from URL (path template + query param names)
     This allows matching endpoints between old and new domains
+    (and tenants: IDs in the path become placeholders)
     """
-    parsed = urlparse(url)
-    # For our purposes, we'll use the path and query parameter names
-    path = parsed.path
-    return path
+    return endpoint_template(url)
 
 def deep_compare_json(obj1, obj2, path=""):
     """
-    Recursively compare two JSON objects and return all differences.
+    Compare two JSON objects and return all differences.
     Returns a list of differences with paths and values.
     """
-    differences = []
-    
-    # If types are different, that's a difference
-    if type(obj1) != type(obj2):
-        differences.append({
-            "path": path,
-            "type": "type_mismatch",
-            "old_value": str(obj1),
-            "new_value": str(obj2)
-        })
-        return differences
-    
-    # Handle different types
-    if isinstance(obj1, dict):
-        # Get all keys from both objects
-        all_keys = set(obj1.keys()) | set(obj2.keys())
-        
-        for key in all_keys:
-            new_path = f"{path}.{key}" if path else key
-            
-            if key not in obj1:
-                differences.append({
-                    "path": new_path,
-                    "type": "added",
-                    "old_value": None,
-                    "new_value": str(obj2[key])
-                })
-            elif key not in obj2:
-                differences.append({
-                    "path": new_path,
-                    "type": "removed",
-                    "old_value": str(obj1[key]),
-                    "new_value": None
-                })
-            else:
-                # Recursively compare nested objects
-                differences.extend(deep_compare_json(obj1[key], obj2[key], new_path))
-                
-    elif isinstance(obj1, list):
-        # For lists, compare by index if same length, otherwise mark as different
-        if len(obj1) != len(obj2):
-            differences.append({
-                "path": path,
+    return list(iter_json_differences(obj1, obj2, path))
+
+def iter_json_differences(obj1, obj2, path=""):
+    """
+    Stream the differences between two JSON objects one record at a time.
+    Built on the shared iterative diff walk, so nothing is buffered and deep
+    nesting cannot hit the recursion limit.
+    """
+    for kind, diff_path, key, old_value, new_value in iter_raw_differences(obj1, obj2, path):
+        diff_path = render_path(diff_path)
+        # If types are different, that's a difference
+        if kind == TYPE_MISMATCH:
+            yield {
+                "path": diff_path,
+                "type": "type_mismatch",
+                "old_value": str(old_value),
+                "new_value": str(new_value)
+            }
+        elif kind == KEY_ADDED:
+            yield {
+                "path": diff_path,
+                "type": "added",
+                "old_value": None,
+                "new_value": str(new_value)
+            }
+        elif kind == KEY_REMOVED:
+            yield {
+                "path": diff_path,
+                "type": "removed",
+                "old_value": str(old_value),
+                "new_value": None
+            }
+        elif kind == LENGTH_MISMATCH:
+            # Lists of different length are still compared element by element
+            yield {
+                "path": diff_path,
                 "type": "list_length_mismatch",
-                "old_value": f"Length: {len(obj1)}",
-                "new_value": f"Length: {len(obj2)}"
-            })
-            # Still try to compare elements if possible
-            min_len = min(len(obj1), len(obj2))
-            for i in range(min_len):
-                differences.extend(deep_compare_json(obj1[i], obj2[i], f"{path}[{i}]"))
-        else:
-            # Same length, compare element by element
-            for i in range(len(obj1)):
-                differences.extend(deep_compare_json(obj1[i], obj2[i], f"{path}[{i}]"))
-                
-    else:
-        # Primitive values - compare directly
-        if obj1 != obj2:
+                "old_value": f"Length: {len(old_value)}",
+                "new_value": f"Length: {len(new_value)}"
+            }
+        elif kind == VALUE_CHANGED:
             # Special handling for numeric values that change from positive to zero
-            if isinstance(obj1, (int, float)) and isinstance(obj2, (int, float)):
-                if obj1 > 0 and obj2 == 0:
-                    differences.append({
-                        "path": path,
-                        "type": "critical_data_loss",
-                        "old_value": obj1,
-                        "new_value": obj2,
-                        "severity": "CRITICAL"
-                    })
-                elif obj1 == 0 and obj2 > 0:
-                    differences.append({
-                        "path": path,
-                        "type": "data_added",
-                        "old_value": obj1,
-                        "new_value": obj2,
-                        "severity": "MINOR"
-                    })
+            if isinstance(old_value, (int, float)) and isinstance(new_value, (int, float)):
+                if old_value > 0 and new_value == 0:
+                    diff_type, severity = "critical_data_loss", "CRITICAL"
+                elif old_value == 0 and new_value > 0:
+                    diff_type, severity = "data_added", "MINOR"
                 else:
-                    differences.append({
-                        "path": path,
-                        "type": "value_changed",
-                        "old_value": obj1,
-                        "new_value": obj2,
-                        "severity": "MINOR"
-                    })
+                    diff_type, severity = "value_changed", "MINOR"
+                yield {
+                    "path": diff_path,
+                    "type": diff_type,
+                    "old_value": old_value,
+                    "new_value": new_value,
+                    "severity": severity
+                }
             else:
-                differences.append({
-                    "path": path,
+                yield {
+                    "path": diff_path,
                     "type": "value_changed",
-                    "old_value": str(obj1),
-                    "new_value": str(obj2)
-                })
-    
-    return differences
+                    "old_value": str(old_value),
+                    "new_value": str(new_value)
+                }
 
 def compare_matching_endpoints(old_responses, new_responses):
     """
@@ -146,18 +117,11 @@ def compare_matching_endpoints(old_responses, new_responses):
         "detailed_differences": []
     }
     
-    # Group responses by endpoint key (path)
-    old_by_endpoint = {}
-    for resp in old_responses:
-        if 'url' in resp:
-            key = extract_endpoint_key(resp['url'])
-            old_by_endpoint[key] = resp
-    
-    new_by_endpoint = {}
-    for resp in new_responses:
-        if 'url' in resp:
-            key = extract_endpoint_key(resp['url'])
-            new_by_endpoint[key] = resp
+    # Group responses by endpoint key (path template) and match them up
+    old_by_endpoint, new_by_endpoint = match_endpoints(
+        ((resp['url'], resp) for resp in old_responses if 'url' in resp),
+        ((resp['url'], resp) for resp in new_responses if 'url' in resp)
+    )
     
     # Get all endpoint keys
     all_endpoints = set(old_by_endpoint.keys()) | set(new_by_endpoint.keys())
@@ -207,13 +171,14 @@ def compare_matching_endpoints(old_responses, new_responses):
             })
         elif old_resp is not None and new_resp is not None:
             # Compare responses
-            differences = deep_compare_json(old_resp, new_resp)
+            severity_counter = SeverityCounter()
+            differences = list(severity_counter.track(iter_json_differences(old_resp, new_resp)))
             
             if differences:
                 results["summary"]["endpoints_with_differences"] += 1
                 
                 # Determine overall severity for this endpoint
-                has_critical = any(diff.get("severity") == "CRITICAL" for diff in differences)
+                has_critical = severity_counter.counts["CRITICAL"] > 0
                 severity = "CRITICAL" if has_critical else "MINOR"
                 
                 if has_critical:
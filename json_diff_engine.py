@@ -0,0 +1,926 @@
+#!/usr/bin/env python3
+"""
+JSON DIFF ENGINE
+Shared building blocks for the JSON comparators.
+
+Provides:
+- Merkle-style content hashes for every dict/list subtree of a JSON document,
+  so identical subtrees can be skipped in O(1) during a deep comparison
+- One iterative, generator-based diff walk that every deep_compare
+  implementation builds its difference records on
+- Hash-based sequence alignment (patience anchors + capped Myers diff) for
+  lists whose elements have no identifying key
+- Key inference and hash-join alignment for lists of objects, with a
+  persistent cache of the key chosen per list
+- Compact difference records (DiffRecord) with lazily rendered paths
+- Streaming severity counters for those records
+- Tolerance comparison of long numeric lists as whole arrays (numpy when it
+  is installed, a plain loop otherwise), summarized in one event
+"""
+
+import bisect
+import itertools
+import json
+import math
+import os
+from collections import namedtuple
+from collections.abc import Mapping
+
+try:
+    import numpy as np
+except ImportError:
+    # compare_numeric_arrays falls back to a plain loop with the same results
+    np = None
+
+
+class SubtreeHashIndex:
+    """
+    Content hashes for the dict/list nodes of a JSON tree. Each subtree is
+    hashed at most once, bottom-up.
+
+    Each container is stored by id() with (digest, paths, leaves):
+    - digest: hash of the subtree content. Dict key order does not matter and
+      int/float/bool leaves are kept apart, matching the type()-strict
+      comparison the comparators use.
+    - paths:  how many paths a full walk of the subtree would count
+    - leaves: how many primitive values the subtree holds
+
+    Digests use Python's built-in hash(), so they are only meaningful inside
+    the current process. The index is only valid while the indexed tree is
+    alive and unmodified.
+    """
+
+    def __init__(self, root=None):
+        self._nodes = {}
+        if root is not None:
+            self.add(root)
+
+    def add(self, obj):
+        """Hash obj and all of its nested containers. Returns the root digest."""
+        if isinstance(obj, (dict, list)):
+            return self._hash(obj)[0]
+        return None
+
+    def _hash(self, obj):
+        nodes = self._nodes
+        cached = nodes.get(id(obj))
+        if cached is not None:
+            return cached
+
+        # Iterative post-order walk; a suspended frame is
+        # (container, is_dict, items, entries, paths, leaves, pending_key)
+        stack = []
+        is_dict = type(obj) is dict
+        items = iter(obj.items()) if is_dict else enumerate(obj)
+        entries = []
+        paths = leaves = 0
+
+        while True:
+            descended = False
+            for key, value in items:
+                value_type = type(value)
+                if value_type is dict or value_type is list:
+                    child = nodes.get(id(value))
+                    if child is None:
+                        stack.append((obj, is_dict, items, entries, paths, leaves, key))
+                        obj = value
+                        is_dict = value_type is dict
+                        items = iter(value.items()) if is_dict else enumerate(value)
+                        entries = []
+                        paths = leaves = 0
+                        descended = True
+                        break
+                    token = child[0]
+                    paths += 1 + child[1]
+                    leaves += child[2]
+                else:
+                    # A primitive is one path for its key/index plus one for the value
+                    token = value if value_type is str else (value_type, value)
+                    paths += 2
+                    leaves += 1
+                entries.append((key, token) if is_dict else token)
+
+            if descended:
+                continue
+
+            digest = hash(frozenset(entries)) if is_dict else hash((list, tuple(entries)))
+            entry = (digest, paths, leaves)
+            nodes[id(obj)] = entry
+            if not stack:
+                return entry
+
+            obj, is_dict, items, entries, paths, leaves, key = stack.pop()
+            paths += 1 + entry[1]
+            leaves += entry[2]
+            entries.append((key, digest) if is_dict else digest)
+
+    def lookup(self, obj):
+        """Return (digest, paths, leaves) for an indexed container, or None"""
+        return self._nodes.get(id(obj))
+
+    def same_subtree(self, other_index, obj1, obj2):
+        """
+        Check whether obj1 (hashed here) and obj2 (hashed in other_index)
+        hold identical content.
+
+        Each tree is hashed once, on the first call that reaches it, so a
+        pair with different digests is rejected by two memoized lookups.
+        hash() collides (hash(-1) == hash(-2)), so matching digests are
+        confirmed with ==; a confirmed subtree is skipped, so each node is
+        compared this way at most once per walk.
+
+        Returns the (digest, paths, leaves) entry of obj1 on a match so callers
+        can reuse its node counts, otherwise None.
+        """
+        if type(obj1) is not type(obj2):
+            return None
+        entry1 = self._hash(obj1)
+        if other_index._hash(obj2) != entry1:
+            return None
+        try:
+            if obj1 != obj2:
+                return None
+        except RecursionError:
+            # Too deep for the C-level check; let the iterative walk handle it
+            return None
+        return entry1
+
+
+# ---------------------------------------------------------------------------
+# Streaming diff core
+# ---------------------------------------------------------------------------
+
+# Raw difference kinds. Every event is a (kind, path, key, old_value, new_value)
+# tuple; key is the dict key or list index the event sits under (None at root).
+TYPE_MISMATCH = "type_mismatch"
+KEY_ADDED = "key_added"
+KEY_REMOVED = "key_removed"
+LENGTH_MISMATCH = "length_mismatch"
+ITEM_ADDED = "item_added"
+ITEM_REMOVED = "item_removed"
+VALUE_CHANGED = "value_changed"
+# An element that only changed position; old_value/new_value carry the old and new index
+ITEM_MOVED = "item_moved"
+# A numeric list compared as an array; old_value is its ArrayDiff summary, new_value is None
+ARRAY_CHANGED = "array_changed"
+
+# Step emitted by dict walkers and list aligners: compare old_value/new_value at path
+DESCEND = "descend"
+
+SEVERITY_LEVELS = ("CRITICAL", "MAJOR", "MINOR")
+
+
+# Paths are kept as parent-pointer nodes while walking: the root path is a
+# plain string, every step below it is a (parent, segment, is_index) tuple.
+# Building a node never copies the parent path, and identical subtrees that
+# are skipped never pay for a string at all; render_path() produces the
+# familiar "a.b[3].c" form only for the paths that end up in a report.
+
+def key_path(path, key):
+    """Path of a dict key below path"""
+    return (path, key, False)
+
+
+def index_path(path, index):
+    """
+    Path of a list index below path. index may also be a selector string
+    ("2->5") or a (fields, values) key selector, rendered as "[id=5]".
+    """
+    return (path, index, True)
+
+
+def render_path(path, blank_selectors=False):
+    """
+    Render a path node as "a.b[3].c". With blank_selectors every list
+    index/selector is rendered as "[]", giving the structural path.
+    """
+    if type(path) is not tuple:
+        return path
+
+    segments = []
+    while type(path) is tuple:
+        segments.append(path)
+        path = path[0]
+
+    rendered = path
+    for _, segment, is_index in reversed(segments):
+        if is_index:
+            if blank_selectors:
+                rendered += "[]"
+            elif type(segment) is tuple:
+                fields, values = segment
+                rendered += "[" + ",".join(f"{field}={value}" for field, value in zip(fields, values)) + "]"
+            else:
+                rendered += f"[{segment}]"
+        else:
+            rendered = f"{rendered}.{segment}" if rendered else segment
+    return rendered
+
+
+def last_key(path):
+    """
+    Name of the field a path points into: its last dict key, skipping list
+    indexes ("a.b[3]" -> "b"). Same as taking the rendered path's
+    .split('.')[-1].split('[')[0].
+    """
+    while type(path) is tuple:
+        if not path[2]:
+            return path[1].split('.')[-1].split('[')[0]
+        path = path[0]
+    return path.split('.')[-1].split('[')[0]
+
+
+def align_by_index(list1, list2, path, report_extras=True):
+    """
+    Default list aligner: pair elements by position.
+
+    Yields a LENGTH_MISMATCH event when the lengths differ, a DESCEND step for
+    every common index and, if report_extras is set, ITEM_REMOVED / ITEM_ADDED
+    events for the trailing elements only one side has.
+    """
+    if len(list1) != len(list2):
+        yield (LENGTH_MISMATCH, path, None, list1, list2)
+
+    min_len = min(len(list1), len(list2))
+    for idx in range(min_len):
+        yield (DESCEND, index_path(path, idx), idx, list1[idx], list2[idx])
+
+    if report_extras:
+        for idx in range(min_len, len(list1)):
+            yield (ITEM_REMOVED, index_path(path, idx), idx, list1[idx], None)
+        for idx in range(min_len, len(list2)):
+            yield (ITEM_ADDED, index_path(path, idx), idx, None, list2[idx])
+
+
+# Default edit budget for one gap of a sequence alignment
+DEFAULT_ALIGNMENT_COST = 500
+
+
+def _element_token(item):
+    """Exact, type-strict content token for a list element"""
+    if isinstance(item, (dict, list)):
+        return json.dumps(item, sort_keys=True, separators=(',', ':'), default=repr)
+    return (type(item), item)
+
+
+def _patience_anchors(tokens1, tokens2, lo1, hi1, lo2, hi2):
+    """
+    Patience anchors: elements unique on both sides, kept in the longest
+    run where their order agrees. Returns (i, j) pairs in increasing order.
+    """
+    def unique_positions(tokens, lo, hi):
+        positions = {}
+        for idx in range(lo, hi):
+            token = tokens[idx]
+            positions[token] = None if token in positions else idx
+        return positions
+
+    unique1 = unique_positions(tokens1, lo1, hi1)
+    unique2 = unique_positions(tokens2, lo2, hi2)
+    candidates = [
+        (i, unique2[token]) for token, i in unique1.items()
+        if i is not None and unique2.get(token) is not None
+    ]
+    candidates.sort()
+
+    # Longest increasing subsequence on j (patience sorting)
+    pile_tops = []
+    pile_top_idx = []
+    back = [None] * len(candidates)
+    for idx, (_, j) in enumerate(candidates):
+        pile = bisect.bisect_left(pile_tops, j)
+        if pile:
+            back[idx] = pile_top_idx[pile - 1]
+        if pile == len(pile_tops):
+            pile_tops.append(j)
+            pile_top_idx.append(idx)
+        else:
+            pile_tops[pile] = j
+            pile_top_idx[pile] = idx
+
+    anchors = []
+    idx = pile_top_idx[-1] if pile_top_idx else None
+    while idx is not None:
+        anchors.append(candidates[idx])
+        idx = back[idx]
+    anchors.reverse()
+    return anchors
+
+
+def _myers_matches(tokens1, tokens2, lo1, hi1, lo2, hi2, max_cost):
+    """
+    Matched (i, j) pairs of the shortest edit script between two token
+    ranges (Myers' O(ND) algorithm), or None if it needs more than max_cost
+    inserts + deletes.
+    """
+    n = hi1 - lo1
+    m = hi2 - lo2
+    v = {1: 0}
+    trace = []
+
+    for d in range(min(n + m, max_cost) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and tokens1[lo1 + x] == tokens2[lo2 + y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+    else:
+        return None
+
+    # Walk the recorded frontiers back from (n, m) to collect the diagonals
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((lo1 + x, lo2 + y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+
+def align_by_sequence(list1, list2, path, max_cost=DEFAULT_ALIGNMENT_COST):
+    """
+    List aligner for lists without identifying keys.
+
+    Elements are reduced to exact content tokens and aligned like lines in a
+    text diff: common prefix/suffix are stripped, unique elements anchor the
+    middle (patience diff) and the gaps between anchors are solved with a
+    Myers diff. A gap needing more than max_cost edits is not searched
+    further; its elements are paired by position instead, which keeps large,
+    heavily rewritten lists near-linear.
+
+    Yields, instead of a per-index comparison:
+    - ITEM_MOVED for elements that only changed position
+    - DESCEND for unmatched old/new elements sitting in the same gap
+      (an element edited in place)
+    - ITEM_REMOVED / ITEM_ADDED for the true deletes and inserts
+    """
+    tokens1 = [_element_token(item) for item in list1]
+    tokens2 = [_element_token(item) for item in list2]
+    n, m = len(tokens1), len(tokens2)
+
+    lo = 0
+    while lo < n and lo < m and tokens1[lo] == tokens2[lo]:
+        lo += 1
+    hi1, hi2 = n, m
+    while hi1 > lo and hi2 > lo and tokens1[hi1 - 1] == tokens2[hi2 - 1]:
+        hi1 -= 1
+        hi2 -= 1
+
+    matches = []
+    prev1, prev2 = lo, lo
+    for i, j in _patience_anchors(tokens1, tokens2, lo, hi1, lo, hi2) + [(hi1, hi2)]:
+        if i > prev1 and j > prev2:
+            matches.extend(_myers_matches(tokens1, tokens2, prev1, i, prev2, j, max_cost) or [])
+        if i < hi1:
+            matches.append((i, j))
+        prev1, prev2 = i + 1, j + 1
+
+    # Unmatched elements, grouped by the gap (between matches) they sit in
+    gaps = []
+    prev1, prev2 = lo, lo
+    for i, j in matches + [(hi1, hi2)]:
+        if i > prev1 or j > prev2:
+            gaps.append((list(range(prev1, i)), list(range(prev2, j))))
+        prev1, prev2 = i + 1, j + 1
+
+    # An element deleted in one place and inserted in another was moved
+    inserted_at = {}
+    for _, added in gaps:
+        for j in added:
+            inserted_at.setdefault(tokens2[j], []).append(j)
+    moved_old, moved_new = set(), set()
+    moves = []
+    for removed, _ in gaps:
+        for i in removed:
+            candidates = inserted_at.get(tokens1[i])
+            if candidates:
+                j = candidates.pop(0)
+                moved_old.add(i)
+                moved_new.add(j)
+                moves.append((i, j))
+
+    for removed, added in gaps:
+        removed = [i for i in removed if i not in moved_old]
+        added = [j for j in added if j not in moved_new]
+        for i, j in zip(removed, added):
+            item_path = index_path(path, i if i == j else f"{i}->{j}")
+            yield (DESCEND, item_path, j, list1[i], list2[j])
+        for i in removed[len(added):]:
+            yield (ITEM_REMOVED, index_path(path, i), i, list1[i], None)
+        for j in added[len(removed):]:
+            yield (ITEM_ADDED, index_path(path, j), j, None, list2[j])
+
+    for i, j in moves:
+        yield (ITEM_MOVED, index_path(path, f"{i}->{j}"), j, i, j)
+
+
+# ---------------------------------------------------------------------------
+# Key inference for lists of objects
+# ---------------------------------------------------------------------------
+
+# Value types that can identify a row
+_KEY_VALUE_TYPES = (str, int)
+# How many of the most selective fields are tried in combinations
+MAX_KEY_CANDIDATES = 8
+
+
+def _is_id_like(field):
+    return field in ('id', 'name', 'key', 'uuid') or field.endswith(('_id', '_key', '_code'))
+
+
+def key_field_allowed(field, declared=()):
+    """True for fields that may identify rows: id-like names, or declared key fields"""
+    return field in declared or _is_id_like(field)
+
+
+def _key_values(rows, fields):
+    """Key tuple of every row, or None if a row lacks a field or holds a non-key value"""
+    values = []
+    for row in rows:
+        value = []
+        for field in fields:
+            item = row.get(field)
+            if type(item) not in _KEY_VALUE_TYPES:
+                return None
+            value.append(item)
+        values.append(tuple(value))
+    return values
+
+
+def key_is_unique(list1, list2, fields):
+    """Check that fields identify every row of both lists exactly once"""
+    for rows in (list1, list2):
+        if not all(type(row) is dict for row in rows):
+            return False
+        values = _key_values(rows, fields)
+        if values is None or len(set(values)) != len(values):
+            return False
+    return True
+
+
+def key_join_count(list1, list2, fields):
+    """How many old rows the (unique) key fields join to a new row"""
+    return len(set(_key_values(list1, fields)) & set(_key_values(list2, fields)))
+
+
+def infer_list_key(list1, list2, exclude=None, max_fields=2, declared=()):
+    """
+    Profile two lists of objects once and pick the field, or combination of
+    up to max_fields fields, that identifies their rows best.
+
+    Only id-like field names (id, name, *_id, *_code, ...) and the declared
+    fields are considered: a value field that happens to be unique in these
+    two lists would make rows whose value changed look removed and added. A
+    usable key holds a str/int value in every row and is unique on both
+    sides. Among those, the key joining the most old rows to new rows wins,
+    ties going to field order. A key that joins nothing is still used, since
+    its rows are then simply different entities. Single fields are tried
+    first, combinations only when no single field works; combinations are
+    built from the MAX_KEY_CANDIDATES most selective fields.
+
+    exclude: callable(field) -> True for fields that must not be used
+    (e.g. timestamps, which change between captures).
+
+    Returns a tuple of field names, or None if no usable key was found.
+    """
+    if not list1 or not list2:
+        return None
+    if not all(type(row) is dict for row in list1) or not all(type(row) is dict for row in list2):
+        return None
+
+    shared = set(list1[0])
+    for row in list1:
+        shared &= row.keys()
+    for row in list2:
+        shared &= row.keys()
+    fields = [field for field in list1[0] if field in shared and key_field_allowed(field, declared) and
+              not (exclude and exclude(field))]
+
+    # Per-field profile: (distinct values, unique on both sides, old/new hits)
+    profile = {}
+    for field in fields:
+        values1 = _key_values(list1, (field,))
+        values2 = _key_values(list2, (field,)) if values1 is not None else None
+        if values2 is None:
+            continue
+        set1, set2 = set(values1), set(values2)
+        unique = len(set1) == len(values1) and len(set2) == len(values2)
+        profile[field] = (len(set1) + len(set2), unique, len(set1 & set2))
+
+    def best(candidates):
+        chosen, chosen_rank = None, None
+        for position, (key, hits) in enumerate(candidates):
+            rank = (hits, -position)
+            if chosen_rank is None or rank > chosen_rank:
+                chosen, chosen_rank = key, rank
+        return chosen
+
+    chosen = best([((field,), hits) for field, (_, unique, hits) in profile.items() if unique])
+    if chosen is not None or max_fields < 2:
+        return chosen
+
+    selective = sorted(profile, key=lambda field: -profile[field][0])[:MAX_KEY_CANDIDATES]
+    selective.sort(key=fields.index)
+    for size in range(2, max_fields + 1):
+        candidates = []
+        for combo in itertools.combinations(selective, size):
+            values1 = _key_values(list1, combo)
+            values2 = _key_values(list2, combo)
+            set1, set2 = set(values1), set(values2)
+            if len(set1) == len(values1) and len(set2) == len(values2):
+                candidates.append((combo, len(set1 & set2)))
+        chosen = best(candidates)
+        if chosen is not None:
+            return chosen
+    return None
+
+
+def align_by_key(list1, list2, path, fields):
+    """
+    List aligner for lists of objects with a known key: hash-join the rows on
+    the key fields (which must be unique, see key_is_unique).
+
+    Matched rows are compared (DESCEND) at paths like [id=5] or
+    [node_class_id=3,label=Pump]; old rows without a partner yield
+    ITEM_REMOVED and new rows without one ITEM_ADDED, in list order.
+    """
+    values1 = _key_values(list1, fields)
+    values2 = _key_values(list2, fields)
+    single = len(fields) == 1
+
+    new_by_key = {value: idx for idx, value in enumerate(values2)}
+    for idx, value in enumerate(values1):
+        item_key = value[0] if single else value
+        partner = new_by_key.pop(value, None)
+        if partner is None:
+            yield (ITEM_REMOVED, index_path(path, (fields, value)), item_key, list1[idx], None)
+        else:
+            yield (DESCEND, index_path(path, (fields, value)), item_key, list1[idx], list2[partner])
+
+    for value, idx in new_by_key.items():
+        item_key = value[0] if single else value
+        yield (ITEM_ADDED, index_path(path, (fields, value)), item_key, None, list2[idx])
+
+
+def list_key_slot(endpoint, path):
+    """Cache slot of a list: (endpoint template, its path with every list selector blanked)"""
+    return endpoint, render_path(path, blank_selectors=True)
+
+
+class ListKeyCache:
+    """
+    The list keys chosen by infer_list_key, per endpoint template and list
+    path (list_key_slot), so later runs can skip the profiling. Kept in
+    memory and optionally persisted to a JSON file:
+
+        {"version": 2, "keys": {template: {list path: [field, ...]}}}
+
+    Callers should check a cached key against the lists at hand
+    (key_is_unique) and profile again if it no longer fits.
+    """
+
+    VERSION = 2
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.keys = {}
+        self.dirty = False
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self.keys = {endpoint: {path: tuple(fields) for path, fields in lists.items()}
+                                 for endpoint, lists in data.get("keys", {}).items()}
+            except (OSError, ValueError, AttributeError):
+                self.keys = {}
+
+    def get(self, slot):
+        """Cached key fields for slot, or None"""
+        endpoint, path = slot
+        return self.keys.get(endpoint, {}).get(path)
+
+    def set(self, slot, fields):
+        endpoint, path = slot
+        fields = tuple(fields)
+        lists = self.keys.setdefault(endpoint, {})
+        if lists.get(path) != fields:
+            lists[path] = fields
+            self.dirty = True
+
+    def save(self):
+        """Write the cache file if anything changed"""
+        if not self.cache_file or not self.dirty:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.cache_file, 'w') as f:
+            json.dump({"version": self.VERSION,
+                       "keys": {endpoint: {path: list(fields) for path, fields in sorted(lists.items())}
+                                for endpoint, lists in sorted(self.keys.items())}},
+                      f, indent=2)
+        self.dirty = False
+
+
+def _dict_steps(dict1, dict2, path, sort_keys, skip_key):
+    if sort_keys:
+        keys = sorted(dict1.keys() | dict2.keys())
+    else:
+        keys = list(dict1)
+        keys.extend(key for key in dict2 if key not in dict1)
+
+    for key in keys:
+        child_path = key_path(path, key)
+        if skip_key is not None and skip_key(key, child_path):
+            continue
+        if key not in dict1:
+            yield (KEY_ADDED, child_path, key, None, dict2[key])
+        elif key not in dict2:
+            yield (KEY_REMOVED, child_path, key, dict1[key], None)
+        else:
+            yield (DESCEND, child_path, key, dict1[key], dict2[key])
+
+
+class ArrayTolerance(namedtuple("ArrayTolerance", "abs_tol rel_tol nan_equal min_length max_indexes",
+                                 defaults=(0.0, 0.0, True, 8, 10))):
+    """
+    How iter_raw_differences compares numeric lists as arrays. Two values are
+    equal when |a - b| <= max(abs_tol, rel_tol * max(|a|, |b|)); with
+    nan_equal NaN equals NaN. Only lists of at least min_length ints/floats
+    (on both sides) are compared this way; an ArrayDiff lists up to
+    max_indexes offending indexes.
+    """
+
+    __slots__ = ()
+
+
+class ArrayDiff(namedtuple("ArrayDiff", "old_length new_length compared changed max_abs_delta first_indexes")):
+    """
+    Summary of a numeric array comparison: lengths, elements compared (the
+    common prefix), how many differ beyond tolerance, the largest finite
+    |new - old| among them (None if there is none) and the first offending
+    indexes
+    """
+
+    __slots__ = ()
+
+
+# Integers beyond this are not exact as floats, so such lists are compared element by element
+_EXACT_FLOAT_INT = 2 ** 53
+
+
+def _numeric_array(value):
+    """True if value is a list of ints/floats (no bools) that converts to floats exactly"""
+    types = set(map(type, value))
+    if not types or not types <= {int, float}:
+        return False
+    if int in types:
+        return all(abs(item) <= _EXACT_FLOAT_INT for item in value if type(item) is int)
+    return True
+
+
+def compare_numeric_arrays(list1, list2, tolerance):
+    """
+    Compare two numeric lists element-wise within tolerance (an
+    ArrayTolerance). Returns an ArrayDiff, or None if they are equal.
+    """
+    compared = min(len(list1), len(list2))
+    abs_tol, rel_tol, nan_equal = tolerance.abs_tol, tolerance.rel_tol, tolerance.nan_equal
+
+    if np is not None:
+        old = np.asarray(list1[:compared], dtype=float)
+        new = np.asarray(list2[:compared], dtype=float)
+        with np.errstate(invalid='ignore', over='ignore'):
+            delta = np.abs(new - old)
+            allowed = np.maximum(abs_tol, rel_tol * np.maximum(np.abs(old), np.abs(new)))
+            close = (old == new) | (delta <= allowed)
+            if nan_equal:
+                close |= np.isnan(old) & np.isnan(new)
+        offending = np.flatnonzero(~close)
+        changed = int(offending.size)
+        deltas = delta[offending]
+        deltas = deltas[np.isfinite(deltas)]
+        max_abs_delta = float(deltas.max()) if deltas.size else None
+        first_indexes = offending[:tolerance.max_indexes].tolist()
+    else:
+        changed = 0
+        max_abs_delta = None
+        first_indexes = []
+        for index, (a, b) in enumerate(zip(list1, list2)):
+            if a == b or (nan_equal and a != a and b != b):
+                continue
+            delta = abs(b - a)
+            if delta <= max(abs_tol, rel_tol * max(abs(a), abs(b))):
+                continue
+            changed += 1
+            if len(first_indexes) < tolerance.max_indexes:
+                first_indexes.append(index)
+            if math.isfinite(delta) and (max_abs_delta is None or delta > max_abs_delta):
+                max_abs_delta = float(delta)
+
+    if not changed and len(list1) == len(list2):
+        return None
+    return ArrayDiff(len(list1), len(list2), compared, changed, max_abs_delta, first_indexes)
+
+
+def iter_raw_differences(obj1, obj2, path="", sort_keys=False, skip_key=None,
+                         list_aligner=align_by_index, loose_equality=False,
+                         max_depth=None, stats=None, numeric_arrays=None):
+    """
+    Walk two JSON trees and yield raw difference events lazily.
+
+    The walk is iterative (an explicit stack of step generators), so deeply
+    nested payloads cannot hit the recursion limit, and nothing is buffered:
+    memory stays proportional to the nesting depth, not the number of
+    differences. Identical subtrees are skipped through SubtreeHashIndex.
+
+    Options:
+    - sort_keys:      visit dict keys in sorted order instead of old-then-new order
+    - skip_key:       callable(key, path) -> True to leave a dict key (at
+                      path) out entirely
+    - list_aligner:   callable(list1, list2, path) yielding DESCEND steps and
+                      list events (paths built with index_path); defaults to
+                      align_by_index
+    - loose_equality: treat values that compare == as identical (1 == 1.0)
+    - max_depth:      do not descend into pairs nested deeper than this
+    - stats:          dict whose "total_paths_compared" and "identical"
+                      counters are updated while walking
+    - numeric_arrays: an ArrayTolerance; long lists of numbers on both sides
+                      are then compared as arrays within it and reported as
+                      one ARRAY_CHANGED event instead of one per element
+
+    Events are (kind, path, key, old_value, new_value) tuples, see the kind
+    constants above; path is a path node (see render_path). Leaf pairs of different type yield TYPE_MISMATCH, equal
+    types with different values yield VALUE_CHANGED.
+    """
+    old_hashes = SubtreeHashIndex()
+    new_hashes = SubtreeHashIndex()
+    stack = [iter(((DESCEND, path, None, obj1, obj2),))]
+
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            continue
+
+        kind = step[0]
+        depth = len(stack) - 1
+        if stats is not None and depth and kind in (DESCEND, KEY_ADDED, KEY_REMOVED):
+            stats["total_paths_compared"] += 1
+
+        if kind != DESCEND:
+            yield step
+            continue
+
+        _, step_path, key, value1, value2 = step
+        if max_depth is not None and depth > max_depth:
+            continue
+
+        if loose_equality and value1 == value2:
+            continue
+
+        if isinstance(value1, (dict, list)):
+            matched = old_hashes.same_subtree(new_hashes, value1, value2)
+            if matched is not None:
+                if stats is not None:
+                    stats["total_paths_compared"] += matched[1]
+                    stats["identical"] += matched[2]
+                continue
+
+        if type(value1) != type(value2):
+            yield (TYPE_MISMATCH, step_path, key, value1, value2)
+        elif isinstance(value1, dict):
+            stack.append(_dict_steps(value1, value2, step_path, sort_keys, skip_key))
+        elif isinstance(value1, list):
+            if (numeric_arrays is not None and min(len(value1), len(value2)) >= numeric_arrays.min_length
+                    and _numeric_array(value1) and _numeric_array(value2)):
+                summary = compare_numeric_arrays(value1, value2, numeric_arrays)
+                if stats is not None:
+                    stats["total_paths_compared"] += summary.compared if summary else len(value1)
+                    stats["identical"] += summary.compared - summary.changed if summary else len(value1)
+                if summary is not None:
+                    yield (ARRAY_CHANGED, step_path, key, summary, None)
+                continue
+            stack.append(iter(list_aligner(value1, value2, step_path)))
+        else:
+            if stats is not None:
+                stats["total_paths_compared"] += 1
+            if value1 != value2:
+                yield (VALUE_CHANGED, step_path, key, value1, value2)
+            elif stats is not None:
+                stats["identical"] += 1
+
+
+class DiffRecord(Mapping):
+    """
+    One difference record. Reads like the dict records the comparators used
+    to build (record["path"], record.get("severity"), iteration in the same
+    key order), but is stored in __slots__ and keeps its path as a path node
+    that is only rendered when first read.
+
+    extra holds additional fields (e.g. old_type/new_type), listed after "type".
+    """
+
+    __slots__ = ("_path", "type", "old_value", "new_value", "severity", "extra")
+
+    def __init__(self, path, diff_type, old_value, new_value, severity, extra=None):
+        self._path = path
+        self.type = diff_type
+        self.old_value = old_value
+        self.new_value = new_value
+        self.severity = severity
+        self.extra = extra
+
+    @property
+    def path(self):
+        path = self._path
+        if type(path) is tuple:
+            path = self._path = render_path(path)
+        return path
+
+    def __getitem__(self, name):
+        if name == "path":
+            return self.path
+        if name in ("type", "old_value", "new_value", "severity"):
+            return getattr(self, name)
+        if self.extra and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def __iter__(self):
+        yield "path"
+        yield "type"
+        if self.extra:
+            yield from self.extra
+        yield "old_value"
+        yield "new_value"
+        yield "severity"
+
+    def __len__(self):
+        return 5 + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+def json_default(obj):
+    """json.dump(s) default= hook that serializes DiffRecords as plain objects"""
+    if isinstance(obj, DiffRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class SeverityCounter:
+    """
+    Counts the severities of difference records as they stream past.
+
+    Use track() to wrap a record stream; the records are passed through
+    unchanged, so counting never needs a second pass or a buffered list.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.counts = {level: 0 for level in SEVERITY_LEVELS}
+
+    def track(self, records):
+        """Yield every record while counting its severity"""
+        counts = self.counts
+        for record in records:
+            self.total += 1
+            severity = record.get("severity")
+            if severity in counts:
+                counts[severity] += 1
+            yield record
+
+    def overall(self, default="MINOR"):
+        """Highest severity seen so far, or default if only unrated records were seen"""
+        for level in SEVERITY_LEVELS[:-1]:
+            if self.counts[level]:
+                return level
+        return default
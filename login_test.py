@@ -1,11 +1,9 @@
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from session_store import chrome_driver
 
 def test_login_and_screenshot():
     """Test login to ACME website and capture screenshot"""
@@ -23,9 +21,8 @@ def test_login_and_screenshot():
     # Remove headless mode so we can see what's happening
     # chrome_options.add_argument("--headless")
     
-    # Setup ChromeDriver automatically
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Setup ChromeDriver automatically (the path is looked up once, then cached)
+    driver = chrome_driver(chrome_options)
     
     try:
         print("Navigating to login page...")
@@ -11,6 +11,7 @@ import json
 import time
 import os
 from datetime import datetime
+from network_capture import NetworkCapture
 
 def manual_assist_capture(url, output_name):
     print(f"\n{'='*80}")
@@ -22,12 +23,14 @@ def manual_assist_capture(url, output_name):
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--window-size=1920,1080')
-    # Enable performance logging
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
     
     driver = webdriver.Chrome(options=chrome_options)
     
+    # Fetch API bodies while you browse; Chrome drops old ones before Enter is pressed
+    network = NetworkCapture(driver, accept=lambda response: '/api/' in response['url'])
+    
     try:
+        network.start()
         print(f"🌐 Navigating to: {url}")
         driver.get(url)
         
@@ -41,25 +44,10 @@ def manual_assist_capture(url, output_name):
         
         print("\n🔄 Capturing data...")
         
-        # Capture network logs
-        logs = driver.get_log('performance')
-        api_responses = []
-        
-        for entry in logs:
-            try:
-                log = json.loads(entry['message'])['message']
-                if log['method'] == 'Network.responseReceived':
-                    response = log['params']['response']
-                    if '/api/' in response['url']:
-                        try:
-                            request_id = log['params']['requestId']
-                            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                            data = json.loads(body['body'])
-                            api_responses.append({'url': response['url'], 'response': data})
-                        except:
-                            pass
-            except:
-                continue
+        # Collect the JSON API responses of the session
+        api_responses = [{'url': entry['url'], 'response': entry['response']}
+                         for entry in network.take()
+                         if 'error' not in entry and not isinstance(entry['response'], str)]
                 
         print(f"✅ Captured {len(api_responses)} API responses")
         
@@ -71,6 +59,7 @@ def manual_assist_capture(url, output_name):
         return output_name
         
     finally:
+        network.stop()
         driver.quit()
 
 def main():
@@ -1,7 +1,5 @@
 import json
 import os
-import time
-import re
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -10,6 +8,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import chromedriver_autoinstaller
 from selenium.webdriver.chrome.service import Service
+from network_capture import NetworkCapture
+from numeric_text import numeric_values_by_label, join_numeric_values
+from browser_session import export_session
+from session_store import SessionStore
 
 class MigrationVerifier:
     def __init__(self, old_website_url, new_website_url, email, password):
@@ -18,6 +20,9 @@ class MigrationVerifier:
         self.email = email
         self.password = password
         self.driver = None
+        self.network = None
+        # Logins saved by earlier runs, reused while the API accepts them
+        self.sessions = SessionStore()
         
         # Create timestamped output directory
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -45,15 +50,19 @@ class MigrationVerifier:
             # Setup ChromeDriver
             self.driver = webdriver.Chrome(options=chrome_options)
             print("Chrome driver initialized successfully")
+            # Tells when a page has finished loading its data
+            self.network = NetworkCapture(self.driver).start()
         except Exception as e:
             print(f"Error initializing Chrome driver: {e}")
             raise Exception(f"Could not initialize Chrome driver: {e}")
     
     def login_to_website(self, website_url):
-        """Login to a website"""
+        """Login to a website, reusing the saved session when it is still valid"""
         print(f"Logging in to {website_url}...")
+        if self.sessions.restore(self.driver, website_url, self.email, wait=self.network.wait_until_settled):
+            return
         self.driver.get(f"{website_url}/login")
-        time.sleep(2)
+        self.network.wait_until_settled()
         
         # Enter credentials
         self.driver.find_element(By.NAME, "email").send_keys(self.email)
@@ -65,7 +74,8 @@ class MigrationVerifier:
             EC.url_contains("/dashboard")
         )
         print("Login successful")
-        time.sleep(3)
+        self.network.wait_until_settled()
+        self.sessions.save(export_session(self.driver), self.email)
     
     def capture_dashboard_data(self, website_url):
         """Capture dashboard data from a website"""
@@ -74,7 +84,7 @@ class MigrationVerifier:
         try:
             # Navigate to dashboard
             self.driver.get(f"{website_url}/dashboard")
-            time.sleep(3)
+            self.network.wait_until_settled()
             
             # Capture data
             site_dir = os.path.join(self.output_dir, 
@@ -112,7 +122,7 @@ class MigrationVerifier:
         try:
             # Navigate to sites page
             self.driver.get(f"{website_url}/sites")
-            time.sleep(3)
+            self.network.wait_until_settled()
             
             # Get list of sites
             sites = ["London UK", "All Facilities", "Melbourne AU", "ShowSite3", "test", "test site", "Toronto Canada"]
@@ -146,7 +156,6 @@ class MigrationVerifier:
                         print(f"    ✗ Error extracting visible text: {e}")
                     
                     captured_sites.append(site)
-                    time.sleep(1)  # Small delay between sites
                     
                 except Exception as e:
                     print(f"    Error capturing data for site '{site}': {e}")
@@ -160,23 +169,8 @@ class MigrationVerifier:
     
     def extract_numeric_values(self, text):
         """Extract numeric values from text that might represent asset counts or similar metrics"""
-        # Look for patterns like "Total Assets: 5" or "Assets (3)" or "count: 10"
-        patterns = [
-            r'(?:total\s*)?assets?\s*[:\-]?\s*(\d+)',
-            r'assets?\s*\((\d+)\)',
-            r'count\s*[:\-]?\s*(\d+)',
-            r'total\s*[:\-]?\s*(\d+)',
-            r'(\d+)\s*assets?',
-        ]
-        
-        results = {}
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for i, match in enumerate(matches):
-                key = f"pattern_{pattern}_{i}"
-                results[key] = int(match)
-        
-        return results
+        # Keyed by label ("total assets", "opportunities value ($)"), not by position
+        return numeric_values_by_label(text)
     
     def compare_numeric_differences(self, old_text, new_text):
         """Compare numeric values between old and new text to find discrepancies"""
@@ -185,12 +179,8 @@ class MigrationVerifier:
         
         differences = []
         
-        # Compare all numeric values
-        all_keys = set(old_numbers.keys()) | set(new_numbers.keys())
-        for key in all_keys:
-            old_val = old_numbers.get(key, None)
-            new_val = new_numbers.get(key, None)
-            
+        # Compare all numeric values, aligned by label
+        for key, old_val, new_val in join_numeric_values(old_numbers, new_numbers):
             if old_val is None and new_val is not None:
                 differences.append({
                     "type": "numeric_value_added",
@@ -555,6 +545,8 @@ class MigrationVerifier:
             raise
             
         finally:
+            if self.network:
+                self.network.stop()
             if self.driver:
                 self.driver.quit()
 
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+NETWORK CAPTURE
+Live capture of API response bodies over the Chrome DevTools Protocol.
+
+The capture scripts used to read driver.get_log('performance') once at the
+end of a run and then ask for every body with a blocking
+Network.getResponseBody WebDriver call. By then Chrome had often evicted
+the bodies of earlier pages, so responses went missing, and each lookup
+cost a full WebDriver round-trip.
+
+NetworkCapture listens on Selenium's async CDP connection instead, in a
+background thread running trio:
+- Network.responseReceived: remember the responses the filter accepts
+- Network.loadingFinished: queue the body for fetching right away
+- Network.loadingFailed: forget the request
+
+A fixed number of fetchers take finished requests off a bounded queue and
+send one Network.getResponseBody each over the websocket, so a body is
+fetched while Chrome still holds it. take() waits for the queue to drain
+and hands back everything completed since the last take(), in the order
+the responses arrived - the same shape of data the log polling produced.
+
+    network = NetworkCapture(driver).start()
+    driver.get(url)
+    for entry in network.take():
+        ...
+    network.stop()
+
+The same events say how many requests are in flight, which replaces the
+fixed time.sleep() after logins, tab switches and pagination clicks:
+- wait_for_network_idle(): at most max_inflight requests open for quiet_ms
+- wait_for_dom_stable(): no DOM mutation for quiet_ms (a MutationObserver)
+- wait_until_settled(): both, one after the other
+Each returns True once the page is settled, or False when timeout runs out
+first, so a step takes as long as the app needs and no longer. Pass
+accept=None to track requests without keeping any bodies.
+"""
+
+import base64
+import binascii
+import itertools
+import json
+import math
+import threading
+import time
+import trio
+from selenium.common.exceptions import WebDriverException
+
+# Bodies fetched at the same time
+MAX_CONCURRENT_FETCHES = 8
+
+# Finished requests waiting for a fetcher before the listener waits too
+FETCH_QUEUE_SIZE = 256
+
+# Chrome's buffers for response bodies (Network.enable)
+MAX_TOTAL_BUFFER_SIZE = 256 * 1024 * 1024
+MAX_RESOURCE_BUFFER_SIZE = 64 * 1024 * 1024
+
+# Seconds to wait for the listener to attach, and between checks in take()
+START_TIMEOUT = 30
+FLUSH_INTERVAL = 0.05
+
+# Quiet period (ms) that counts as settled, and the longest wait (s)
+QUIET_MS = 500
+SETTLE_TIMEOUT = 30
+
+# Resolves once the DOM has not changed for quietMs, or false at timeoutMs
+_DOM_STABLE_SCRIPT = """
+const [quietMs, timeoutMs, done] = arguments;
+let quietTimer = null;
+const finish = (stable) => {
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(deadline);
+    done(stable);
+};
+const observer = new MutationObserver(() => {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(() => finish(true), quietMs);
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+quietTimer = setTimeout(() => finish(true), quietMs);
+const deadline = setTimeout(() => finish(false), timeoutMs);
+"""
+
+
+def is_api_response(response):
+    """The capture scripts' filter: /api/ URLs or JSON responses, status 200"""
+    return (('/api/' in response['url'] or 'json' in response.get('mimeType', '')) and
+            response['status'] == 200)
+
+
+def decode_body(body, base64_encoded=False):
+    """Response body as parsed JSON when it is JSON, otherwise as text"""
+    if base64_encoded:
+        try:
+            body = base64.b64decode(body).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError):
+            return body  # binary content stays base64
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body
+
+
+def wait_for_dom_stable(driver, quiet_ms=QUIET_MS, timeout=SETTLE_TIMEOUT):
+    """True once the page's DOM has not changed for quiet_ms, False after timeout seconds"""
+    previous = driver.timeouts.script
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return bool(driver.execute_async_script(_DOM_STABLE_SCRIPT, quiet_ms, int(timeout * 1000)))
+    except WebDriverException:
+        # A navigation replaced the document while watching it
+        return False
+    finally:
+        driver.set_script_timeout(previous)
+
+
+class NetworkCapture:
+    """Collects response bodies of a driver's page as the requests finish"""
+
+    def __init__(self, driver, accept=is_api_response,
+                 max_concurrent_fetches=MAX_CONCURRENT_FETCHES, queue_size=FETCH_QUEUE_SIZE):
+        self.driver = driver
+        self.accept = accept
+        self.max_concurrent_fetches = max_concurrent_fetches
+        self.queue_size = queue_size
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._completed = []
+        self._pending = {}
+        self._inflight = set()
+        self._methods = {}
+        self._idle_waiters = []
+        self._outstanding = 0
+        self._sequence = itertools.count()
+        self._thread = None
+        self._ready = threading.Event()
+        self._token = None
+        self._events = None
+        self._listening = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self, timeout=START_TIMEOUT):
+        """Attach to the browser and start listening; returns self"""
+        self._thread = threading.Thread(target=trio.run, args=(self._run,),
+                                        name="network-capture", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("DevTools connection did not open in time")
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def take(self):
+        """
+        Responses completed since the last take(), in arrival order. Each is
+        {'url', 'method', 'status', 'mimeType', 'timestamp', 'event_timestamp',
+        'response'}, or has 'error' instead of 'response' when the body
+        could not be fetched.
+        """
+        if self._running():
+            trio.from_thread.run(self._flush, trio_token=self._token)
+        with self._lock:
+            completed, self._completed = self._completed, []
+        completed.sort(key=lambda item: item[0])
+        return [entry for _, entry in completed]
+
+    def wait_for_network_idle(self, max_inflight=0, quiet_ms=QUIET_MS, timeout=SETTLE_TIMEOUT):
+        """
+        True once at most max_inflight requests have been open for quiet_ms
+        (counted from this call), False after timeout seconds. Allow a few
+        in flight when the app keeps long-polling requests open.
+        """
+        if not self._running():
+            time.sleep(quiet_ms / 1000)
+            return False
+        return trio.from_thread.run(self._wait_idle, max_inflight, quiet_ms / 1000, timeout,
+                                    trio_token=self._token)
+
+    def wait_until_settled(self, max_inflight=0, quiet_ms=QUIET_MS, timeout=SETTLE_TIMEOUT):
+        """Network idle, then a stable DOM, both within timeout seconds"""
+        deadline = time.monotonic() + timeout
+        idle = self.wait_for_network_idle(max_inflight, quiet_ms, timeout)
+        remaining = max(deadline - time.monotonic(), quiet_ms / 1000)
+        return wait_for_dom_stable(self.driver, quiet_ms, remaining) and idle
+
+    def stop(self):
+        """Fetch what is still queued, then close the DevTools connection"""
+        if self._running():
+            try:
+                trio.from_thread.run_sync(self._listening.cancel, trio_token=self._token)
+            except trio.RunFinishedError:
+                pass
+            self._thread.join()
+
+    def _running(self):
+        return self._thread is not None and self._thread.is_alive() and self._token is not None
+
+    async def _run(self):
+        self._token = trio.lowlevel.current_trio_token()
+        self._listening = trio.CancelScope()
+        try:
+            async with self.driver.bidi_connection() as connection:
+                session, network = connection.session, connection.devtools.network
+                # Unbounded: events must never be dropped while fetchers are busy
+                self._events = session.listen(network.RequestWillBeSent, network.ResponseReceived,
+                                              network.LoadingFinished, network.LoadingFailed,
+                                              buffer_size=math.inf)
+                await session.execute(network.enable(max_total_buffer_size=MAX_TOTAL_BUFFER_SIZE,
+                                                     max_resource_buffer_size=MAX_RESOURCE_BUFFER_SIZE))
+                send_queue, receive_queue = trio.open_memory_channel(self.queue_size)
+                async with trio.open_nursery() as nursery:
+                    async with receive_queue:
+                        for _ in range(self.max_concurrent_fetches):
+                            nursery.start_soon(self._fetch_bodies, session, network, receive_queue.clone())
+                    nursery.start_soon(self._dispatch, network, send_queue)
+                    self._ready.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+
+    async def _dispatch(self, network, queue):
+        async with queue:
+            with self._listening:
+                async for event in self._events:
+                    # Only waiting for the next event is cancelled by stop()
+                    with trio.CancelScope(shield=True):
+                        await self._handle(event, network, queue)
+
+            # Events that arrived before stop()
+            while True:
+                try:
+                    event = self._events.receive_nowait()
+                except trio.WouldBlock:
+                    break
+                await self._handle(event, network, queue)
+
+            # Responses still loading: try anyway, as the log polling did
+            pending, self._pending = self._pending, {}
+            for request_id, (sequence, entry) in pending.items():
+                await self._enqueue(queue, request_id, sequence, entry)
+
+    async def _handle(self, event, network, queue):
+        if isinstance(event, network.RequestWillBeSent):
+            self._inflight.add(event.request_id)
+            self._methods[event.request_id] = event.request.method
+            self._request_activity(len(self._inflight))
+        elif isinstance(event, network.ResponseReceived):
+            response = event.response
+            entry = {
+                'url': response.url,
+                'method': self._methods.get(event.request_id, 'GET'),
+                'status': response.status,
+                'mimeType': response.mime_type,
+                'timestamp': int(time.time() * 1000),
+                'event_timestamp': float(event.timestamp)
+            }
+            if self.accept is not None and self.accept(entry):
+                self._pending[event.request_id] = (next(self._sequence), entry)
+        else:
+            if event.request_id in self._inflight:
+                self._request_activity(len(self._inflight))
+                self._inflight.discard(event.request_id)
+            self._methods.pop(event.request_id, None)
+            pending = self._pending.pop(event.request_id, None)
+            if pending is not None and isinstance(event, network.LoadingFinished):
+                await self._enqueue(queue, event.request_id, *pending)
+
+    def _request_activity(self, busiest):
+        # Restart the quiet period of every wait whose limit the request count exceeded
+        now = time.monotonic()
+        for waiter in self._idle_waiters:
+            if busiest > waiter[0]:
+                waiter[1] = now
+
+    async def _enqueue(self, queue, request_id, sequence, entry):
+        self._outstanding += 1
+        await queue.send((request_id, sequence, entry))
+
+    async def _fetch_bodies(self, session, network, queue):
+        async with queue:
+            async for request_id, sequence, entry in queue:
+                try:
+                    body, base64_encoded = await session.execute(network.get_response_body(request_id))
+                    entry['response'] = decode_body(body, base64_encoded)
+                except Exception as e:
+                    entry['error'] = str(e)
+                with self._lock:
+                    self._completed.append((sequence, entry))
+                self._outstanding -= 1
+
+    def _caught_up(self):
+        # No event is buffered or in the dispatcher's hands
+        events = self._events.statistics()
+        return not events.current_buffer_used and events.tasks_waiting_receive
+
+    async def _flush(self):
+        while not (self._caught_up() and not self._outstanding):
+            await trio.sleep(FLUSH_INTERVAL)
+
+    async def _wait_idle(self, max_inflight, quiet, timeout):
+        # [request limit, start of the current quiet period]
+        waiter = [max_inflight, time.monotonic()]
+        self._idle_waiters.append(waiter)
+        try:
+            with trio.move_on_after(timeout):
+                while not (self._caught_up() and len(self._inflight) <= max_inflight and
+                           time.monotonic() - waiter[1] >= quiet):
+                    await trio.sleep(FLUSH_INTERVAL)
+                return True
+            return False
+        finally:
+            self._idle_waiters.remove(waiter)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+NUMERIC TEXT
+One-pass extraction of labelled numbers from visible page text.
+
+The visible-text comparison used to run five regexes over the text and key
+each match by pattern and position (pattern_<regex>_<i>), so one extra
+number near the top of a page shifted every key after it and showed up as a
+cascade of differences. Here one compiled tokenizer reads the text line by
+line and turns each number into a (label, number, unit) tuple:
+
+    Total Assets: 2,535          -> ("total assets", 2535, "")
+    OPPORTUNITIES VALUE\\n$485k   -> ("opportunities value", 485000, "$")
+    71 issues                    -> ("issues", 71, "issues")
+    Site657 has 12 assets        -> ("assets", 12, "assets")
+    Completion 85%               -> ("completion", 85, "%")
+    Variance: -12%               -> ("variance", -12, "%")
+
+The label is the text before the number on its line when that text ends
+like a label ("Total Assets:", "Assets ("), otherwise the word after the
+number ("12 assets"), otherwise the text before it. A number alone on its
+line takes the caption: the line without numbers right above it (dashboards
+put the caption on its own line). A blank line, or a caption's number line,
+ends the caption. Dates and times ("2025-11-21 20:18:27", "11/21/2025",
+"20:18") are skipped, since they differ between any two captures, and so
+are numbers left with neither a label nor a unit. Old and new values are
+aligned by label with a hash join, not by position; a label that repeats
+is numbered ("#2", ...) in page order.
+
+Input can be a string or any iterable of lines (e.g. an open file), so
+multi-MB visible_text.txt dumps are read one line at a time.
+
+parse_card_values() is the batch form for dashboard stat cards, whose text is
+a single value ("2,535", "$485k", "1.2M", "85%", "—"): it parses the card
+texts of all sites and metrics with one regex pass into a float array, with
+NaN for placeholders and anything that isn't a number.
+"""
+
+import math
+import re
+from array import array
+from collections import namedtuple
+
+# sign, currency, digits (1,234 or 1234), fraction, k/M/B scale, percent,
+# and a word right after the number ("71 issues")
+_NUMBER = re.compile(r'''
+    (?<![\w.,])
+    (?P<sign>[-−])?
+    (?P<currency>[$€£])?
+    (?P<digits>\d{1,3}(?:,\d{3})+(?!\d)|\d+)
+    (?P<fraction>\.\d+)?
+    (?:(?P<scale>[kKmMbB])(?![A-Za-z]))?
+    (?P<percent>%)?
+    (?:[ \t]+(?P<word>[A-Za-z]+))?
+''', re.VERBOSE)
+
+_SCALE = {'k': 1000, 'm': 1000000, 'b': 1000000000}
+
+_MONTH = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+_DATE = rf'''(?:
+    \d{{4}}-\d{{1,2}}-\d{{1,2}}
+  | \d{{1,2}}[/.]\d{{1,2}}[/.]\d{{2,4}}
+  | {_MONTH}[ \t]+\d{{1,2}}(?:st|nd|rd|th)?,?[ \t]+\d{{4}}
+  | \d{{1,2}}[ \t]+{_MONTH}[ \t]+\d{{4}}
+)'''
+_TIME = r'''(?:
+    \d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?
+    (?:[ \t]*[ap]\.?m\.?(?![A-Za-z]))?
+    (?:Z|[+-]\d{2}:?\d{2})?
+)'''
+
+# Dates and times ("2025-11-21 20:18:27", "Nov 21, 2025", "8:05 pm")
+_DATE_TIME = re.compile(rf'''
+    (?<![\w.,:/-])
+    (?:{_DATE}(?:(?:[T \t]|,[ \t]*){_TIME})?|{_TIME})
+    (?![\w:])
+''', re.VERBOSE | re.IGNORECASE)
+
+# A whole stat-card value; anything else on the line leaves it unmatched
+_CARD_VALUE = re.compile(r'''
+    ^[ \t]*
+    (?:
+        (?P<placeholder>[—–-]*|n/?a)
+      | (?P<sign>[-−])?[ \t]*[$€£]?[ \t]*
+        (?P<digits>\d{1,3}(?:,\d{3})+|\d+)(?P<fraction>\.\d+)?[ \t]*
+        (?P<scale>[kmb])?[ \t]*(?P<percent>%)?
+    )
+    [ \t]*$
+''', re.VERBOSE | re.MULTILINE | re.IGNORECASE)
+
+# Characters trimmed off labels ("Total Assets:", "Assets ("); text ending
+# in one of them labels the number after it
+_LABEL_TRIM = " \t:-–=(|"
+_LABEL_END = tuple(":-–=(|")
+_SPACES = re.compile(r'\s+')
+
+
+class NumericToken(namedtuple("NumericToken", "label number unit")):
+    """A number found in page text, with its label and unit"""
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Label plus unit when the unit isn't already the label"""
+        if self.unit and self.unit != self.label:
+            return f"{self.label} ({self.unit})"
+        return self.label
+
+
+def _clean_label(text):
+    return _SPACES.sub(" ", text).strip(_LABEL_TRIM).lower()
+
+
+def _number(match):
+    value = int(match.group('digits').replace(',', ''))
+    if match.group('fraction'):
+        value = float(f"{value}{match.group('fraction')}")
+    if match.group('scale'):
+        value *= _SCALE[match.group('scale').lower()]
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return -value if match.group('sign') else value
+
+
+def _segments(line):
+    # The parts of a line between its dates and times
+    start = 0
+    for match in _DATE_TIME.finditer(line):
+        yield line[start:match.start()]
+        start = match.end()
+    yield line[start:]
+
+
+def _segment_tokens(segment, caption):
+    start = 0
+    for match in _NUMBER.finditer(segment):
+        lead = segment[start:match.start()].rstrip()
+        label = _clean_label(lead)
+        word = match.group('word')
+        word = word.lower() if word else ""
+        # The word, if any, starts the next label ("42 Active Issues: 3")
+        start = match.start('word') if word else match.end()
+
+        if match.group('currency'):
+            unit = match.group('currency')
+        elif match.group('percent'):
+            unit = "%"
+        else:
+            unit = ""
+
+        if word and not (label and lead.endswith(_LABEL_END)):
+            # "12 assets and 4 tasks": the word names the number
+            label = word
+            unit = unit or word
+        elif not label:
+            label = caption or unit
+        if label:
+            yield NumericToken(label, _number(match), unit)
+
+
+def iter_numeric_tokens(text):
+    """NumericTokens of a text (a string or an iterable of lines), in page order"""
+    lines = text.splitlines() if isinstance(text, str) else text
+    caption = ""
+    for line in lines:
+        if not any(char.isdigit() for char in line):
+            # A caption line, or a blank line ending the caption
+            caption = _clean_label(line)
+            continue
+        for segment in _segments(line):
+            yield from _segment_tokens(segment, caption)
+        caption = ""
+
+
+def numeric_values_by_label(text):
+    """{key: number} for a text; repeated keys get " #2", " #3"... in page order"""
+    values = {}
+    seen = {}
+    for token in iter_numeric_tokens(text):
+        key = token.key
+        n = seen.get(key, 0) + 1
+        seen[key] = n
+        values[key if n == 1 else f"{key} #{n}"] = token.number
+    return values
+
+
+def join_numeric_values(old_values, new_values):
+    """(key, old number or None, new number or None) for every key of either side"""
+    for key, old_value in old_values.items():
+        yield key, old_value, new_values.get(key)
+    for key, new_value in new_values.items():
+        if key not in old_values:
+            yield key, None, new_value
+
+
+def parse_card_values(texts):
+    """
+    Stat-card texts -> array('d') of their values, in one pass over all of
+    them. "$485k" -> 485000, "1.2M" -> 1200000, "85%" -> 85; placeholders
+    ("—", "N/A", ""), None and unparseable texts -> NaN.
+    """
+    texts = ["" if text is None else str(text).replace("\n", " ") for text in texts]
+    values = array('d', [math.nan]) * len(texts)
+
+    # Line start offset -> position in texts
+    line_of = {}
+    offset = 0
+    for i, text in enumerate(texts):
+        line_of[offset] = i
+        offset += len(text) + 1
+
+    for match in _CARD_VALUE.finditer("\n".join(texts)):
+        digits = match.group('digits')
+        i = line_of.get(match.start())
+        if digits is None or i is None:
+            continue
+        value = float(digits.replace(',', '') + (match.group('fraction') or ""))
+        if match.group('scale'):
+            value *= _SCALE[match.group('scale').lower()]
+        values[i] = -value if match.group('sign') else value
+    return values
+
+
+def card_number(value):
+    """A parse_card_values() entry as a plain number: int when whole, None for NaN"""
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
@@ -1,14 +1,13 @@
 import json
 import os
-import time
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from network_capture import NetworkCapture
+from browser_session import export_session
+from session_store import SessionStore, chrome_driver
 
 class PostMigrationDataCapture:
     def __init__(self, base_url, email, password):
@@ -16,6 +15,9 @@ class PostMigrationDataCapture:
         self.email = email
         self.password = password
         self.driver = None
+        self.network = None
+        # Logins saved by earlier runs, reused while the API accepts them
+        self.sessions = SessionStore()
         
         # Create timestamped output directory
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -29,7 +31,7 @@ class PostMigrationDataCapture:
         print(f"Created output directory: {self.output_dir}")
     
     def setup_driver(self):
-        """Setup Chrome driver with network logging enabled"""
+        """Setup Chrome driver with a live network capture attached"""
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -37,19 +39,20 @@ class PostMigrationDataCapture:
         # Uncomment the line below to run in headless mode
         # chrome_options.add_argument("--headless")
         
-        # Enable performance logging
-        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-        
-        # Setup ChromeDriver automatically
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Setup ChromeDriver automatically (the path is looked up once, then cached)
+        self.driver = chrome_driver(chrome_options)
         print("Chrome driver initialized")
+        
+        # Collect API response bodies as they finish loading
+        self.network = NetworkCapture(self.driver).start()
     
     def login(self):
-        """Login to the ACME website"""
+        """Login to the ACME website, reusing the saved session when it is still valid"""
         print("Logging in to the website...")
+        if self.sessions.restore(self.driver, self.base_url, self.email, wait=self.network.wait_until_settled):
+            return
         self.driver.get(f"{self.base_url}/login")
-        time.sleep(2)
+        self.network.wait_until_settled()
         
         # Enter credentials
         self.driver.find_element(By.NAME, "email").send_keys(self.email)
@@ -61,7 +64,8 @@ class PostMigrationDataCapture:
             EC.url_contains("/dashboard")
         )
         print("Login successful")
-        time.sleep(3)
+        self.network.wait_until_settled()
+        self.sessions.save(export_session(self.driver), self.email)
     
     def capture_all_pages_data(self):
         """Navigate to all pages and capture data"""
@@ -88,7 +92,7 @@ class PostMigrationDataCapture:
             
             # Navigate to page
             self.driver.get(f"{self.base_url}{page_url}")
-            time.sleep(3)  # Wait for page to load
+            self.network.wait_until_settled()  # Wait for page to load
             
             # Take screenshot
             screenshot_path = os.path.join(self.output_dir, "screenshots", f"{page_name}.png")
@@ -138,7 +142,7 @@ class PostMigrationDataCapture:
                             continue
                     
                     element.click()
-                    time.sleep(1)
+                    self.network.wait_until_settled()
                     clicked += 1
                     
                     # Take a screenshot after clicking
@@ -151,82 +155,44 @@ class PostMigrationDataCapture:
             
             if clicked > 0:
                 print(f"  Triggered {clicked} API calls by clicking elements")
-                time.sleep(2)  # Wait for API calls to complete
+                self.network.wait_for_network_idle()  # Wait for API calls to complete
                 
         except Exception as e:
             print(f"  Warning: Could not trigger API calls: {e}")
     
     def capture_api_responses(self):
-        """Capture all API responses automatically from browser network logs"""
+        """Save the API responses the network capture collected"""
         print("Capturing API responses...")
         
-        # Get performance logs
-        logs = self.driver.get_log('performance')
-        
         api_responses = []
         response_count = 0
         
-        for log in logs:
-            try:
-                message = json.loads(log['message'])
-                
-                # Check if this is a response received event
-                if (message['message']['method'] == 'Network.responseReceived' and 
-                    'response' in message['message']['params']):
-                    
-                    response = message['message']['params']['response']
-                    url = response['url']
-                    
-                    # Filter for API endpoints (typically containing /api/ or returning JSON)
-                    if (('/api/' in url or 'json' in response.get('mimeType', '')) and 
-                        response['status'] == 200):
-                        
-                        try:
-                            # Enable Network domain to get response bodies
-                            self.driver.execute_cdp_cmd('Network.enable', {})
-                            
-                            # Get response body
-                            request_id = message['message']['params']['requestId']
-                            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                            response_body = result.get('body', '')
-                            
-                            # Handle base64 encoded responses
-                            if result.get('base64Encoded', False):
-                                import base64
-                                response_body = base64.b64decode(response_body).decode('utf-8')
-                            
-                            # Try to parse as JSON
-                            try:
-                                response_body = json.loads(response_body)
-                            except:
-                                pass  # Keep as string if not JSON
-                            
-                            # Create API response entry
-                            api_entry = {
-                                'url': url,
-                                'status': response['status'],
-                                'mimeType': response.get('mimeType', ''),
-                                'timestamp': log['timestamp'],
-                                'response': response_body
-                            }
-                            
-                            api_responses.append(api_entry)
-                            response_count += 1
-                            
-                            # Save individual response to file
-                            filename = f"response_{response_count}.json"
-                            filepath = os.path.join(self.output_dir, "api_responses", filename)
-                            
-                            with open(filepath, 'w') as f:
-                                json.dump(api_entry, f, indent=2, default=str)
-                            
-                            print(f"  Saved API response: {filename}")
-                            
-                        except Exception as e:
-                            print(f"  Warning: Could not get response body for {url}: {e}")
-                            
-            except Exception as e:
-                continue  # Skip malformed log entries
+        for entry in self.network.take():
+            url = entry['url']
+            if 'error' in entry:
+                print(f"  Warning: Could not get response body for {url}: {entry['error']}")
+                continue
+            
+            # Create API response entry
+            api_entry = {
+                'url': url,
+                'status': entry['status'],
+                'mimeType': entry['mimeType'],
+                'timestamp': entry['timestamp'],
+                'response': entry['response']
+            }
+            
+            api_responses.append(api_entry)
+            response_count += 1
+            
+            # Save individual response to file
+            filename = f"response_{response_count}.json"
+            filepath = os.path.join(self.output_dir, "api_responses", filename)
+            
+            with open(filepath, 'w') as f:
+                json.dump(api_entry, f, indent=2, default=str)
+            
+            print(f"  Saved API response: {filename}")
         
         # Also save all responses in a single file
         all_responses_path = os.path.join(self.output_dir, "api_responses", "all_responses.json")
@@ -277,6 +243,8 @@ class PostMigrationDataCapture:
             raise
             
         finally:
+            if self.network:
+                self.network.stop()
             if self.driver:
                 self.driver.quit()
 
@@ -1,6 +1,5 @@
 import json
 import os
-import time
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -9,6 +8,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 import requests
+from network_capture import NetworkCapture
+from browser_session import export_session
+from session_store import SessionStore
 
 class PreMigrationDataCapture:
     def __init__(self, base_url, email, password):
@@ -16,6 +18,9 @@ class PreMigrationDataCapture:
         self.email = email
         self.password = password
         self.driver = None
+        self.network = None
+        # Logins saved by earlier runs, reused while the API accepts them
+        self.sessions = SessionStore()
         self.session = requests.Session()
         
         # Create timestamped output directory
@@ -30,7 +35,7 @@ class PreMigrationDataCapture:
         print(f"Created output directory: {self.output_dir}")
     
     def setup_driver(self):
-        """Setup Chrome driver with network logging enabled"""
+        """Setup Chrome driver with a live network capture attached"""
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -38,9 +43,6 @@ class PreMigrationDataCapture:
         # Run in headless mode to avoid display issues
         chrome_options.add_argument("--headless")
         
-        # Enable performance logging
-        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-        
         try:
             # Use the manually downloaded ChromeDriver
             chromedriver_path = os.path.join(os.path.dirname(__file__), "chromedriver", "chromedriver")
@@ -50,12 +52,17 @@ class PreMigrationDataCapture:
         except Exception as e:
             print(f"Error initializing Chrome driver: {e}")
             raise Exception(f"Could not initialize Chrome driver: {e}")
+        
+        # Collect API response bodies as they finish loading
+        self.network = NetworkCapture(self.driver).start()
     
     def login(self):
-        """Login to the ACME website"""
+        """Login to the ACME website, reusing the saved session when it is still valid"""
         print("Logging in to the website...")
+        if self.sessions.restore(self.driver, self.base_url, self.email, wait=self.network.wait_until_settled):
+            return
         self.driver.get(f"{self.base_url}/login")
-        time.sleep(2)
+        self.network.wait_until_settled()
         
         # Enter credentials
         self.driver.find_element(By.NAME, "email").send_keys(self.email)
@@ -67,7 +74,8 @@ class PreMigrationDataCapture:
             EC.url_contains("/dashboard")
         )
         print("Login successful")
-        time.sleep(3)
+        self.network.wait_until_settled()
+        self.sessions.save(export_session(self.driver), self.email)
     
     def capture_all_pages_data(self):
         """Navigate to all pages and capture data"""
@@ -94,7 +102,7 @@ class PreMigrationDataCapture:
             
             # Navigate to page
             self.driver.get(f"{self.base_url}{page_url}")
-            time.sleep(3)  # Wait for page to load
+            self.network.wait_until_settled()  # Wait for page to load
             
             # Take screenshot
             screenshot_path = os.path.join(self.output_dir, "screenshots", f"{page_name}.png")
@@ -144,7 +152,7 @@ class PreMigrationDataCapture:
                             continue
                     
                     element.click()
-                    time.sleep(1)
+                    self.network.wait_until_settled()
                     clicked += 1
                     
                     # Take a screenshot after clicking
@@ -157,82 +165,44 @@ class PreMigrationDataCapture:
             
             if clicked > 0:
                 print(f"  Triggered {clicked} API calls by clicking elements")
-                time.sleep(2)  # Wait for API calls to complete
+                self.network.wait_for_network_idle()  # Wait for API calls to complete
                 
         except Exception as e:
             print(f"  Warning: Could not trigger API calls: {e}")
     
     def capture_api_responses(self):
-        """Capture all API responses automatically from browser network logs"""
+        """Save the API responses the network capture collected"""
         print("Capturing API responses...")
         
-        # Get performance logs
-        logs = self.driver.get_log('performance')
-        
         api_responses = []
         response_count = 0
         
-        for log in logs:
-            try:
-                message = json.loads(log['message'])
-                
-                # Check if this is a response received event
-                if (message['message']['method'] == 'Network.responseReceived' and 
-                    'response' in message['message']['params']):
-                    
-                    response = message['message']['params']['response']
-                    url = response['url']
-                    
-                    # Filter for API endpoints (typically containing /api/ or returning JSON)
-                    if (('/api/' in url or 'json' in response.get('mimeType', '')) and 
-                        response['status'] == 200):
-                        
-                        try:
-                            # Enable Network domain to get response bodies
-                            self.driver.execute_cdp_cmd('Network.enable', {})
-                            
-                            # Get response body
-                            request_id = message['message']['params']['requestId']
-                            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                            response_body = result.get('body', '')
-                            
-                            # Handle base64 encoded responses
-                            if result.get('base64Encoded', False):
-                                import base64
-                                response_body = base64.b64decode(response_body).decode('utf-8')
-                            
-                            # Try to parse as JSON
-                            try:
-                                response_body = json.loads(response_body)
-                            except:
-                                pass  # Keep as string if not JSON
-                            
-                            # Create API response entry
-                            api_entry = {
-                                'url': url,
-                                'status': response['status'],
-                                'mimeType': response.get('mimeType', ''),
-                                'timestamp': log['timestamp'],
-                                'response': response_body
-                            }
-                            
-                            api_responses.append(api_entry)
-                            response_count += 1
-                            
-                            # Save individual response to file
-                            filename = f"response_{response_count}.json"
-                            filepath = os.path.join(self.output_dir, "api_responses", filename)
-                            
-                            with open(filepath, 'w') as f:
-                                json.dump(api_entry, f, indent=2, default=str)
-                            
-                            print(f"  Saved API response: {filename}")
-                            
-                        except Exception as e:
-                            print(f"  Warning: Could not get response body for {url}: {e}")
-                            
-            except Exception as e:
-                continue  # Skip malformed log entries
+        for entry in self.network.take():
+            url = entry['url']
+            if 'error' in entry:
+                print(f"  Warning: Could not get response body for {url}: {entry['error']}")
+                continue
+            
+            # Create API response entry
+            api_entry = {
+                'url': url,
+                'status': entry['status'],
+                'mimeType': entry['mimeType'],
+                'timestamp': entry['timestamp'],
+                'response': entry['response']
+            }
+            
+            api_responses.append(api_entry)
+            response_count += 1
+            
+            # Save individual response to file
+            filename = f"response_{response_count}.json"
+            filepath = os.path.join(self.output_dir, "api_responses", filename)
+            
+            with open(filepath, 'w') as f:
+                json.dump(api_entry, f, indent=2, default=str)
+            
+            print(f"  Saved API response: {filename}")
         
         # Also save all responses in a single file
         all_responses_path = os.path.join(self.output_dir, "api_responses", "all_responses.json")
@@ -283,6 +253,8 @@ class PreMigrationDataCapture:
             raise
             
         finally:
+            if self.network:
+                self.network.stop()
             if self.driver:
                 self.driver.quit()
 
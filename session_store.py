@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+SESSION STORE
+Reuse a logged-in session, and the ChromeDriver download, across runs.
+
+Every run used to start a fresh Chrome, ask webdriver_manager for the
+latest ChromeDriver over the network, and type the credentials into the
+login form, then sleep until the dashboard loaded: 10-20 seconds before
+any data was captured. SessionStore keeps what the login produced, one
+file per environment (host) and account (login email) in .browser_sessions/:
+- the cookies and localStorage of the logged-in page (browser_session)
+- with them the access and refresh tokens the app keeps in localStorage
+
+On the next run, restore() checks the saved session with one GET of
+/api/auth/me, which must also name the account being logged in, so a run
+for another user never continues as the last one. If the access token has
+expired it POSTs the refresh token to /api/auth/refresh and stores the new
+tokens. A session the API accepts is loaded into the new driver and the UI
+login is skipped:
+
+    sessions = SessionStore()
+    if not sessions.restore(driver, base_url, email, wait=network.wait_until_settled):
+        ...  # the login form, as before
+        sessions.save(export_session(driver), email)
+
+Delete .browser_sessions/ to force a fresh login; the files hold live
+credentials and are written readable by the owner only.
+
+chrome_driver() starts Chrome with the ChromeDriver path found by the last
+install, and asks webdriver_manager again only when that path is gone or
+the browser no longer accepts it (Chrome updated).
+"""
+
+import json
+import os
+import re
+import requests
+from urllib.parse import urlsplit
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.service import Service
+from browser_session import BrowserSession, export_session, restore_session
+
+SESSION_DIR = ".browser_sessions"
+
+ME_PATH = "/api/auth/me"
+REFRESH_PATH = "/api/auth/refresh"
+
+# Seconds allowed for the /api/auth checks
+CHECK_TIMEOUT = 10
+
+_CHROMEDRIVER_FILE = "chromedriver.json"
+
+# Characters of an account kept in its session file name
+_UNSAFE_NAME = re.compile(r'[^\w.@+-]')
+
+
+def _storage_tokens(value, key=""):
+    # (key, token) of every *token* string in localStorage, also inside JSON values
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, (dict, list)):
+            yield from _storage_tokens(parsed, key)
+        elif "token" in key.lower() and value:
+            yield key, value
+    elif isinstance(value, dict):
+        for name, item in value.items():
+            yield from _storage_tokens(item, str(name))
+    elif isinstance(value, list):
+        for item in value:
+            yield from _storage_tokens(item, key)
+
+
+def _find_email(value):
+    # The first "email" string in a JSON value, searching nested objects
+    if isinstance(value, dict):
+        email = value.get("email")
+        if isinstance(email, str):
+            return email
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            if isinstance(item, (dict, list)):
+                email = _find_email(item)
+                if email is not None:
+                    return email
+    return None
+
+
+def session_tokens(session):
+    """(access token, refresh token) found in a session's localStorage, None when absent"""
+    access = refresh = None
+    for key, token in _storage_tokens(session.local_storage):
+        if "refresh" in key.lower():
+            refresh = refresh or token
+        else:
+            access = access or token
+    return access, refresh
+
+
+def authorize(http, session):
+    """Give a requests.Session the cookies and bearer token of a BrowserSession; returns http"""
+    for cookie in session.cookies:
+        http.cookies.set(cookie['name'], cookie['value'],
+                         domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+    access, _ = session_tokens(session)
+    if access:
+        http.headers['Authorization'] = f"Bearer {access}"
+    return http
+
+
+class SessionStore:
+    """Logged-in browser sessions saved per environment"""
+
+    def __init__(self, directory=SESSION_DIR, api_base=None):
+        self.directory = directory
+        # Where /api/auth lives when not on the site's own origin
+        self.api_base = api_base
+
+    def path(self, base_url, account=None):
+        """File holding the session of account on base_url's host"""
+        name = urlsplit(base_url).netloc.replace(":", "_")
+        if account:
+            name += "__" + _UNSAFE_NAME.sub("_", account.lower())
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, base_url, account=None):
+        """The saved BrowserSession of account on base_url, or None"""
+        try:
+            with open(self.path(base_url, account), encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return BrowserSession(saved["url"], saved["cookies"], saved["local_storage"])
+
+    def save(self, session, account=None):
+        """Write account's session to its file, readable by the owner only"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(session.url, account)
+        partial = path + ".tmp"
+        descriptor = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+            json.dump(session._asdict(), f, indent=2)
+        os.replace(partial, path)
+
+    def delete(self, base_url, account=None):
+        """Forget the saved session of account on base_url"""
+        try:
+            os.remove(self.path(base_url, account))
+        except FileNotFoundError:
+            pass
+
+    def check(self, session, account=None):
+        """
+        session when /api/auth/me accepts it (as account, when given), the
+        session with refreshed tokens when only the access token had
+        expired, otherwise None
+        """
+        http = self._http(session)
+        try:
+            response = http.get(self._api_url(session, ME_PATH), timeout=CHECK_TIMEOUT)
+            if response.ok:
+                return session if self._is_account(response, account) else None
+            if response.status_code in (401, 403):
+                return self._refresh(session, http)
+        except requests.RequestException as e:
+            print(f"⚠️  Could not check saved session: {e}")
+        return None
+
+    def restore(self, driver, base_url, account=None, wait=None):
+        """
+        Load the saved session of account on base_url into driver when the
+        API still accepts it. Returns True when driver is now logged in.
+        """
+        session = self.load(base_url, account)
+        if session is None:
+            return False
+        session = self.check(session, account)
+        if session is None or not restore_session(driver, session, wait=wait):
+            print("⚠️  Saved session expired, logging in again")
+            self.delete(base_url, account)
+            return False
+        # The app may have rotated its tokens while loading
+        self.save(export_session(driver), account)
+        print(f"✅ Reused saved session for {session.origin}")
+        return True
+
+    def _api_url(self, session, path):
+        return (self.api_base or session.origin).rstrip("/") + path
+
+    def _is_account(self, response, account):
+        # False when /api/auth/me names a user other than account
+        if not account:
+            return True
+        try:
+            email = _find_email(response.json())
+        except ValueError:
+            email = None
+        if email is not None and email.lower() != account.lower():
+            print(f"⚠️  Saved session belongs to {email}, not {account}")
+            return False
+        return True
+
+    def _http(self, session):
+        return authorize(requests.Session(), session)
+
+    def _refresh(self, session, http):
+        access, refresh = session_tokens(session)
+        if not refresh:
+            return None
+        response = http.post(self._api_url(session, REFRESH_PATH),
+                             json={"refresh_token": refresh}, timeout=CHECK_TIMEOUT)
+        if not response.ok:
+            return None
+        try:
+            issued = dict(_storage_tokens(response.json()))
+        except ValueError:
+            return None
+
+        # Swap the new tokens in wherever the app kept the old ones
+        replacements = {}
+        for key, token in issued.items():
+            if "refresh" in key.lower():
+                replacements[refresh] = token
+            elif access:
+                replacements[access] = token
+        local_storage = {}
+        for key, value in session.local_storage.items():
+            for old, new in replacements.items():
+                value = value.replace(old, new)
+            local_storage[key] = value
+
+        # Cookies the refresh set replace the old ones of the same name
+        cookies = {cookie['name']: cookie for cookie in session.cookies}
+        for cookie in response.cookies:
+            cookies[cookie.name] = dict(cookies.get(cookie.name, {}), name=cookie.name, value=cookie.value)
+        return session._replace(cookies=list(cookies.values()), local_storage=local_storage)
+
+
+def chrome_driver(options=None, directory=SESSION_DIR):
+    """
+    webdriver.Chrome on the ChromeDriver of the last install; webdriver_manager
+    is asked again only when that one is missing or Chrome rejects it
+    """
+    path = os.path.join(directory, _CHROMEDRIVER_FILE)
+    try:
+        with open(path, encoding='utf-8') as f:
+            executable = json.load(f)["path"]
+        if os.path.exists(executable):
+            return webdriver.Chrome(service=Service(executable), options=options)
+    except (OSError, ValueError, KeyError):
+        pass
+    except SessionNotCreatedException as e:
+        print(f"⚠️  Cached ChromeDriver no longer matches Chrome, reinstalling: {e.msg}")
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    executable = ChromeDriverManager().install()
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"path": executable}, f)
+    return webdriver.Chrome(service=Service(executable), options=options)
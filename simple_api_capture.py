@@ -1,15 +1,13 @@
 import json
 import os
-import time
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException
+from network_capture import NetworkCapture
+from session_store import chrome_driver
 
 def capture_api_responses():
     """Capture all API responses from the ACME website"""
@@ -24,7 +22,7 @@ def capture_api_responses():
     os.makedirs(output_dir, exist_ok=True)
     print(f"Created output directory: {output_dir}")
     
-    # Setup Chrome driver with network logging
+    # Setup Chrome driver
     chrome_options = Options()
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
@@ -32,14 +30,15 @@ def capture_api_responses():
     # Add headless mode for faster execution
     chrome_options.add_argument("--headless")
     
-    # Enable performance logging
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    # Setup ChromeDriver automatically (the path is looked up once, then cached)
+    driver = chrome_driver(chrome_options)
     
-    # Setup ChromeDriver automatically
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Collect API response bodies as they finish loading
+    network = NetworkCapture(driver)
     
     try:
+        network.start()
+        
         print("Navigating to login page...")
         driver.get(f"{BASE_URL}/login")
         
@@ -119,7 +118,7 @@ def capture_api_responses():
                 print(f"Current URL: {driver.current_url}")
         
         # Wait for page to fully load
-        time.sleep(3)
+        network.wait_until_settled()
         
         # Navigate to key pages to trigger API calls
         pages_to_visit = [
@@ -131,75 +130,42 @@ def capture_api_responses():
             print(f"Visiting {page}...")
             try:
                 driver.get(f"{BASE_URL}{page}")
-                time.sleep(2)  # Wait for API calls to complete
+                network.wait_until_settled()  # Wait for API calls to complete
             except Exception as e:
                 print(f"Error visiting {page}: {str(e)}")
         
         # Capture network logs
         print("Capturing network logs...")
-        logs = driver.get_log('performance')
         
         # Extract API responses
         api_responses = []
         response_count = 0
         
-        for log in logs:
-            try:
-                message = json.loads(log['message'])
-                
-                if (message['message']['method'] == 'Network.responseReceived' and 
-                    'response' in message['message']['params']):
-                    
-                    response = message['message']['params']['response']
-                    url = response['url']
-                    
-                    # Filter for API endpoints
-                    if ('/api/' in url or 'json' in response.get('mimeType', '')) and response['status'] == 200:
-                        # Get response body (requires enabling Network domain)
-                        try:
-                            # Enable Network domain to get response bodies
-                            driver.execute_cdp_cmd('Network.enable', {})
-                            
-                            # Get response body
-                            result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': message['message']['params']['requestId']})
-                            response_body = result.get('body', '')
-                            
-                            # Parse JSON if possible
-                            try:
-                                if result.get('base64Encoded', False):
-                                    import base64
-                                    response_body = base64.b64decode(response_body).decode('utf-8')
-                                
-                                parsed_body = json.loads(response_body)
-                                response_body = parsed_body
-                            except:
-                                pass  # Keep as string if not JSON
-                            
-                            api_entry = {
-                                'url': url,
-                                'status': response['status'],
-                                'mimeType': response.get('mimeType', ''),
-                                'timestamp': log['timestamp'],
-                                'response': response_body
-                            }
-                            
-                            api_responses.append(api_entry)
-                            response_count += 1
-                            
-                            # Save individual response to file
-                            filename = f"response_{response_count}.json"
-                            filepath = os.path.join(output_dir, filename)
-                            
-                            with open(filepath, 'w') as f:
-                                json.dump(api_entry, f, indent=2, default=str)
-                            
-                            print(f"Saved response from {url} to {filename}")
-                            
-                        except Exception as e:
-                            print(f"Could not get response body for {url}: {str(e)}")
-                            
-            except Exception as e:
-                continue  # Skip malformed log entries
+        for entry in network.take():
+            url = entry['url']
+            if 'error' in entry:
+                print(f"Could not get response body for {url}: {entry['error']}")
+                continue
+            
+            api_entry = {
+                'url': url,
+                'status': entry['status'],
+                'mimeType': entry['mimeType'],
+                'timestamp': entry['timestamp'],
+                'response': entry['response']
+            }
+            
+            api_responses.append(api_entry)
+            response_count += 1
+            
+            # Save individual response to file
+            filename = f"response_{response_count}.json"
+            filepath = os.path.join(output_dir, filename)
+            
+            with open(filepath, 'w') as f:
+                json.dump(api_entry, f, indent=2, default=str)
+            
+            print(f"Saved response from {url} to {filename}")
         
         # Save all responses to a single file
         all_responses_file = os.path.join(output_dir, "all_responses.json")
@@ -233,6 +199,7 @@ def capture_api_responses():
         raise
         
     finally:
+        network.stop()
         driver.quit()
 
 if __name__ == "__main__":
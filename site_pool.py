@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+SITE POOL
+Capture many facilities at once in a pool of logged-in browsers.
+
+The all-sites captures used to select each facility in turn in one Chrome,
+so a run took (number of sites) x (time per site). SitePool logs in once -
+in the browser the caller already has - copies that session (cookies and
+localStorage, see browser_session) into extra headless workers, and lets
+every browser capture sites in parallel:
+
+- each browser starts with its own share of the site list (round-robin)
+- a browser that runs out steals from the end of the longest remaining
+  share, so a few slow sites don't leave the other browsers idle
+- a worker that can't start or isn't logged in just leaves its share to
+  be stolen by the others
+- a site whose capture raises goes back to another browser's queue, and
+  is given up after MAX_ATTEMPTS browsers failed it
+- a browser that hits a WebDriver error (crashed, session gone) or fails
+  MAX_CONSECUTIVE_FAILURES sites in a row is retired, so a broken worker
+  can't race through the other queues failing everything
+
+capture() returns {site: result} in the order of the site list, whatever
+order the sites finished in, so callers keep writing their existing
+all_sites_capture layout. By default only the caller's browser is used
+and the capture is the old one-site-at-a-time run; callers opt in to
+parallel browsers with workers=N (see max_workers() for a sensible N).
+Every browser shares the one login against the live app, so keep N small.
+"""
+
+import os
+import threading
+from collections import deque
+from selenium import webdriver
+from selenium.common.exceptions import (WebDriverException, TimeoutException, NoSuchElementException,
+                                        StaleElementReferenceException, ElementNotInteractableException,
+                                        ElementClickInterceptedException)
+from selenium.webdriver.chrome.options import Options
+from browser_session import export_session, restore_session
+from network_capture import NetworkCapture
+
+# Browsers that may fail one site before it is given up
+MAX_ATTEMPTS = 2
+
+# Failures in a row that retire a browser
+MAX_CONSECUTIVE_FAILURES = 3
+
+# WebDriver errors about one page's elements; any other one means the browser is broken
+_PAGE_ERRORS = (TimeoutException, NoSuchElementException, StaleElementReferenceException,
+                ElementNotInteractableException, ElementClickInterceptedException)
+
+
+# Browsers used unless the caller asks for more
+DEFAULT_WORKERS = 1
+
+# Most browsers max_workers() suggests, whatever the core count
+WORKER_CAP = 4
+
+
+def max_workers():
+    """A modest parallel pool: one browser per core, at most WORKER_CAP"""
+    return min(WORKER_CAP, os.cpu_count() or 1)
+
+
+def headless_driver():
+    """Chrome for a pool worker"""
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1920,1080")
+    return webdriver.Chrome(options=options)
+
+
+class SitePool:
+    """Browsers sharing one login, capturing a site list with work stealing"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, driver_factory=headless_driver):
+        self.workers = workers or DEFAULT_WORKERS
+        self.driver_factory = driver_factory
+        self._lock = threading.Lock()
+        self._queues = []
+        self._results = {}
+        self._failed = {}
+        self._stopped = set()
+
+    def capture(self, driver, network, sites, capture_site):
+        """
+        Run capture_site(driver, network, site) for every site, in driver
+        (already logged in) and in up to workers - 1 cloned headless
+        browsers. Sites whose capture returns None, or raises in every
+        browser that tried them, are left out.
+        """
+        sites = list(sites)
+        count = max(1, min(self.workers, len(sites)))
+        self._queues = [deque(sites[i::count]) for i in range(count)]
+        self._results = {}
+        self._failed = {}
+        self._stopped = set()
+
+        session = None
+        if count > 1:
+            session = export_session(driver)
+            print(f"🧵 Capturing {len(sites)} sites with {count} browsers")
+        threads = [threading.Thread(target=self._clone_worker, args=(i, session, capture_site),
+                                    name=f"site-worker-{i}", daemon=True)
+                   for i in range(1, count)]
+        for thread in threads:
+            thread.start()
+
+        self._work(0, driver, network, capture_site)
+        for thread in threads:
+            thread.join()
+
+        missed = [site for site in sites if site not in self._results and
+                  (site in self._failed or any(site in queue for queue in self._queues))]
+        if missed:
+            print(f"   ⚠️  {len(missed)} sites not captured: {', '.join(missed)}")
+        return {site: self._results[site] for site in sites if site in self._results}
+
+    def _clone_worker(self, index, session, capture_site):
+        driver = network = None
+        try:
+            driver = self.driver_factory()
+            network = NetworkCapture(driver, accept=None).start()
+            if not restore_session(driver, session, wait=network.wait_until_settled):
+                print(f"   ⚠️  Worker {index}: copied session was not accepted, leaving its sites to the others")
+                return
+            self._work(index, driver, network, capture_site)
+        except Exception as e:
+            print(f"   ⚠️  Worker {index} stopped: {e}")
+        finally:
+            with self._lock:
+                self._stopped.add(index)
+            if network:
+                network.stop()
+            if driver:
+                driver.quit()
+
+    def _work(self, index, driver, network, capture_site):
+        failures = 0
+        while True:
+            site = self._next_site(index)
+            if site is None:
+                return
+            try:
+                result = capture_site(driver, network, site)
+            except Exception as e:
+                print(f"   ❌ Error capturing {site}: {e}")
+                self._give_back(index, site)
+                failures += 1
+                broken = isinstance(e, WebDriverException) and not isinstance(e, _PAGE_ERRORS)
+                if broken or failures >= MAX_CONSECUTIVE_FAILURES:
+                    print(f"   ⚠️  Worker {index} retired, leaving its sites to the others")
+                    with self._lock:
+                        self._stopped.add(index)
+                    return
+                continue
+            failures = 0
+            if result is not None:
+                with self._lock:
+                    self._results[site] = result
+
+    def _give_back(self, index, site):
+        # Queue a failed site first for the emptiest browser that hasn't failed it
+        with self._lock:
+            tried = self._failed.setdefault(site, set())
+            tried.add(index)
+            # Browsers still taking sites
+            others = [i for i in range(len(self._queues)) if i not in tried and i not in self._stopped]
+            if len(tried) >= MAX_ATTEMPTS or not others:
+                print(f"   ⚠️  Giving up on {site}")
+                return
+            self._queues[min(others, key=lambda i: len(self._queues[i]))].appendleft(site)
+
+    def _next_site(self, index):
+        with self._lock:
+            own = self._queues[index]
+            if own:
+                return own.popleft()
+            # Steal from the back of the longest share, skipping sites this browser failed
+            for victim in sorted(self._queues, key=len, reverse=True):
+                for position in range(len(victim) - 1, -1, -1):
+                    if index not in self._failed.get(victim[position], ()):
+                        site = victim[position]
+                        del victim[position]
+                        return site
+            self._stopped.add(index)
+            return None
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+SITE SCAN
+Per-site data of a capture, gathered in one traversal for all sites.
+
+Site analysis used to rescan every response once per site name (and then
+again per field), so 500 facilities cost 500+ passes over the capture.
+SiteScan reads each response once and routes what it finds to per-site
+accumulators:
+- the site names the capture mentions
+- per-site metrics (total assets, asset/issue breakdowns, tasks, ...),
+  recorded as ordered writes so the result is the same as applying the
+  responses one site at a time
+- the first response that mentions each site, found by a second pass that
+  runs every response's text once through an Aho-Corasick automaton of all
+  site names (the names are only known once both captures are scanned)
+
+Site data refers to the capture instead of copying it: a site's raw_data is
+the list of SiteDataRefs (capture ID, entry index, JSON pointer) of the
+nodes its data came from, and resolve() loads one when a report needs the
+payload. Over a CaptureIndex that reads just the one entry.
+"""
+
+import heapq
+from collections import deque, namedtuple
+from collections.abc import Sequence
+
+# Keys whose value names a site (matched even when the value isn't a string)
+SITE_INDICATORS = ('name', 'site_name', 'site', 'sld_name', 'location', 'title')
+
+# Keys of a response that hold a site name directly
+_SITE_NAME_KEYS = ('site', 'site_name', 'location', 'facility', 'plant')
+
+# extract_numeric_values_from_dict: site_data field -> response keys
+NUMERIC_FIELDS = {
+    'total_assets': ['total_assets', 'asset_count', 'assets', 'total_asset_count'],
+    'tasks': ['pending_tasks_count', 'pending_tasks', 'tasks'],
+    'site_visits': ['active_sessions_count', 'active_site_visits', 'site_visits'],
+    'opportunities_value': ['opportunities_total_value', 'opportunities_value'],
+    'equipment_at_risk': ['total_asset_value', 'equipment_at_risk']
+}
+
+# Dashboard 'data' section: key -> site_data field
+_DASHBOARD_FIELDS = (
+    ('pending_tasks_count', 'tasks'),
+    ('active_sessions_count', 'site_visits'),
+    ('opportunities_total_value', 'opportunities_value'),
+    ('total_asset_value', 'equipment_at_risk'),
+)
+
+# Target of writes that apply to every site
+EVERY_SITE = object()
+
+# Writes address a top-level site_data field or an entry of one of these
+ASSET_TYPES, ISSUES = 'asset_types', 'issues'
+
+
+def empty_site_data(site_name):
+    """site_data dict with nothing found yet"""
+    return {
+        "name": site_name,
+        "total_assets": 0,
+        "asset_types": {},
+        "issues": {},
+        "tasks": 0,
+        "site_visits": 0,
+        "opportunities_value": 0,
+        "equipment_at_risk": 0,
+        "raw_data": []
+    }
+
+
+def _breakdown_writes(data, list_key, name_key, section):
+    items = data.get(list_key)
+    if isinstance(items, list):
+        for item in items:
+            if isinstance(item, dict) and name_key in item and 'count' in item:
+                yield (section, item[name_key]), item['count']
+
+
+def numeric_writes(data_dict):
+    """((section, field), value) writes that a site's own dict makes to its site_data"""
+    if not isinstance(data_dict, dict):
+        return
+    for target_field, possible_fields in NUMERIC_FIELDS.items():
+        for field in possible_fields:
+            if field in data_dict and isinstance(data_dict[field], (int, float)):
+                yield (None, target_field), data_dict[field]
+    yield from _breakdown_writes(data_dict, 'asset_breakdown', 'node_class_name', ASSET_TYPES)
+    yield from _breakdown_writes(data_dict, 'issues_breakdown', 'issue_class_name', ISSUES)
+
+
+def dashboard_writes(data_section):
+    """Writes that a dashboard 'data' section makes to every site's site_data"""
+    if isinstance(data_section.get('total_assets'), (int, float)):
+        yield (None, 'total_assets'), data_section['total_assets']
+    yield from _breakdown_writes(data_section, 'asset_breakdown', 'node_class_name', ASSET_TYPES)
+    yield from _breakdown_writes(data_section, 'issues_breakdown', 'issue_class_name', ISSUES)
+    if isinstance(data_section.get('open_issues_count'), (int, float)):
+        yield (ISSUES, 'Unresolved Issues'), data_section['open_issues_count']
+    for key, target_field in _DASHBOARD_FIELDS:
+        if isinstance(data_section.get(key), (int, float)):
+            yield (None, target_field), data_section[key]
+
+
+def apply_writes(site_data, writes):
+    """Apply ((section, field), value) writes to a site_data dict"""
+    for (section, field), value in writes:
+        if section is None:
+            site_data[field] = value
+        else:
+            site_data[section][field] = value
+
+
+def site_search_text(data):
+    """
+    The strings a site name is searched for in: string values of data and
+    of the dicts nested in it (directly or in lists), plus the str() of
+    non-string site indicator values
+    """
+    if isinstance(data, dict):
+        stack = [data]
+    elif isinstance(data, list):
+        stack = [item for item in data if isinstance(item, dict)]
+    else:
+        return
+    while stack:
+        node = stack.pop()
+        for indicator in SITE_INDICATORS:
+            if indicator in node and not isinstance(node[indicator], str):
+                yield str(node[indicator])
+        for value in node.values():
+            if isinstance(value, str):
+                yield value
+            elif isinstance(value, dict):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(item for item in value if isinstance(item, dict))
+
+
+class SiteNameMatcher:
+    """Aho-Corasick automaton of site names; finds every name in a text in one pass"""
+
+    def __init__(self, site_names):
+        # pattern (lower-cased name) -> site names
+        self.sites_by_pattern = {}
+        for site in site_names:
+            self.sites_by_pattern.setdefault(str(site).lower(), []).append(site)
+        self._always = self.sites_by_pattern.get("", [])
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for pattern in self.sites_by_pattern:
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = self._goto[state][ch] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = (pattern,)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_sites(self, texts):
+        """Site names occurring (case-insensitively) in any of the texts"""
+        texts = list(texts)
+        if not texts:
+            return []
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        # NUL separates the texts, so a match can't span two of them
+        for ch in "\0".join(texts).lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        sites = list(self._always)
+        for pattern in found:
+            sites.extend(self.sites_by_pattern[pattern])
+        return sites
+
+
+class SiteDataRef(namedtuple("SiteDataRef", "capture entry pointer")):
+    """
+    Where a piece of site data lives: capture ID (the capture file's path
+    when the responses are a CaptureIndex), index of the api_responses entry
+    and a JSON pointer into that entry (e.g. /response/sites/Site657).
+    Serializes to JSON as a three-item list.
+    """
+
+    __slots__ = ()
+
+
+def json_pointer(parts):
+    """RFC 6901 pointer for a path of keys and list indexes"""
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in parts)
+
+
+def resolve_json_pointer(document, pointer):
+    """The value a json_pointer() points at"""
+    value = document
+    for part in pointer.split("/")[1:]:
+        part = part.replace("~1", "/").replace("~0", "~")
+        value = value[int(part)] if isinstance(value, list) else value[part]
+    return value
+
+
+class SiteScan:
+    """Sites and per-site data of one capture's responses"""
+
+    def __init__(self, responses, value_index=None):
+        # Site data is kept as references into the responses, so they have
+        # to be indexable (a list or a CaptureIndex)
+        if not isinstance(responses, Sequence):
+            responses = list(responses)
+        self.responses = responses
+        self.capture_id = getattr(responses, 'capture_file', None) or f"responses@{id(responses):x}"
+        self.sites = set()
+        # (section, field) -> [first write, last write, value]; written for every site
+        self._shared_writes = {}
+        # site name -> its own writes, same layout
+        self._site_writes = {}
+        # SiteDataRefs of the nodes site data was read from, for every site / per site
+        self._shared_sources = []
+        self._site_sources = {}
+        # site name -> SiteDataRef of the first response body mentioning it
+        self._first_mentions = {}
+        self._matched_sites = set()
+
+        writes = 0
+        for entry, response in enumerate(responses):
+            if not (isinstance(response, dict) and 'response' in response):
+                continue
+            if value_index is not None:
+                value_index.add(response)
+            resp_data = response['response']
+            self._collect_sites(resp_data)
+            for target, path, site_writes in self._writes(resp_data):
+                source = SiteDataRef(self.capture_id, entry, json_pointer(('response',) + path))
+                if target is EVERY_SITE:
+                    log, sources = self._shared_writes, self._shared_sources
+                else:
+                    log = self._site_writes.setdefault(target, {})
+                    sources = self._site_sources.setdefault(target, [])
+                sources.append((writes, source))
+                for key, value in site_writes:
+                    logged = log.get(key)
+                    if logged is None:
+                        log[key] = [writes, writes, value]
+                    else:
+                        logged[1:] = [writes, value]
+                    writes += 1
+
+    def _collect_sites(self, resp_data):
+        sites = self.sites
+        if isinstance(resp_data, dict):
+            for key in ('sites', 'sites_overview'):
+                sites_data = resp_data.get(key)
+                if isinstance(sites_data, dict):
+                    sites.update(sites_data.keys())
+                    for site_info in sites_data.values():
+                        if isinstance(site_info, dict) and 'name' in site_info:
+                            sites.add(site_info['name'])
+                elif key == 'sites' and isinstance(sites_data, list):
+                    for item in sites_data:
+                        if isinstance(item, dict) and 'name' in item:
+                            sites.add(item['name'])
+
+            for value in resp_data.values():
+                if isinstance(value, list):
+                    for item in value:
+                        if isinstance(item, dict):
+                            if 'name' in item:
+                                sites.add(item['name'])
+                            for sub_value in item.values():
+                                if isinstance(sub_value, dict) and 'name' in sub_value:
+                                    sites.add(sub_value['name'])
+                elif isinstance(value, dict):
+                    if 'name' in value:
+                        sites.add(value['name'])
+                    for sub_value in value.values():
+                        if isinstance(sub_value, dict) and 'name' in sub_value:
+                            sites.add(sub_value['name'])
+
+            sld = resp_data.get('sld')
+            if isinstance(sld, dict) and 'name' in sld:
+                sites.add(sld['name'])
+
+            for key in _SITE_NAME_KEYS:
+                if isinstance(resp_data.get(key), str):
+                    sites.add(resp_data[key])
+
+        elif isinstance(resp_data, list):
+            for item in resp_data:
+                if isinstance(item, dict) and 'name' in item:
+                    sites.add(item['name'])
+                elif isinstance(item, str):
+                    sites.add(item)
+
+    @staticmethod
+    def _writes(resp_data):
+        """(site name or EVERY_SITE, path in the body, writes) in the order they apply"""
+        if isinstance(resp_data, dict):
+            sites_dict = resp_data.get('sites')
+            if isinstance(sites_dict, dict):
+                for site_name, site_info in sites_dict.items():
+                    yield site_name, ('sites', site_name), numeric_writes(site_info)
+
+            sites_overview = resp_data.get('sites_overview')
+            if isinstance(sites_overview, list):
+                for i, site_info in enumerate(sites_overview):
+                    if isinstance(site_info, dict):
+                        yield site_info.get('name'), ('sites_overview', i), numeric_writes(site_info)
+            elif isinstance(sites_overview, dict):
+                for site_name, site_info in sites_overview.items():
+                    yield site_name, ('sites_overview', site_name), numeric_writes(site_info)
+
+            data_section = resp_data.get('data')
+            if isinstance(data_section, dict):
+                yield EVERY_SITE, ('data',), dashboard_writes(data_section)
+
+        elif isinstance(resp_data, list):
+            for i, item in enumerate(resp_data):
+                if isinstance(item, dict):
+                    yield item.get('name'), (i,), numeric_writes(item)
+
+    def site_data(self, site_name):
+        """site_data dict of one site (extract_comprehensive_site_data's result)"""
+        writes = dict(self._shared_writes)
+        for key, entry in self._site_writes.get(site_name, {}).items():
+            shared = writes.get(key)
+            if shared is not None:
+                entry = [min(shared[0], entry[0])] + (entry[1:] if entry[1] > shared[1] else shared[1:])
+            writes[key] = entry
+
+        site_data = empty_site_data(site_name)
+        # Fields appear in the order they were first written
+        apply_writes(site_data, ((key, entry[2]) for key, entry in
+                                 sorted(writes.items(), key=lambda item: item[1][0])))
+        # The nodes it was read from, as references; resolve() loads one on demand
+        site_data["raw_data"] = [source for _, source in heapq.merge(
+            self._shared_sources, self._site_sources.get(site_name, []))]
+        return site_data
+
+    def resolve(self, ref):
+        """The raw payload a SiteDataRef of this capture points at"""
+        if ref.capture != self.capture_id:
+            raise ValueError(f"{ref} is not a reference into {self.capture_id}")
+        return resolve_json_pointer(self.responses[ref.entry], ref.pointer)
+
+    def match_sites(self, site_names):
+        """Find the first response mentioning each site (one pass for all of them)"""
+        pending = {site for site in site_names if site not in self._matched_sites}
+        if not pending:
+            return
+        self._matched_sites.update(pending)
+        matcher = SiteNameMatcher(pending)
+        for entry, response in enumerate(self.responses):
+            if not (isinstance(response, dict) and isinstance(response.get('response'), dict)):
+                continue
+            for site in matcher.find_sites(site_search_text(response['response'])):
+                if site in pending:
+                    pending.discard(site)
+                    self._first_mentions[site] = SiteDataRef(self.capture_id, entry, "/response")
+            if not pending:
+                break
+
+    def find_site(self, site_name):
+        """First response body mentioning the site, or None"""
+        self.match_sites([site_name])
+        ref = self._first_mentions.get(site_name)
+        return self.resolve(ref) if ref is not None else None
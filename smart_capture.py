@@ -11,6 +11,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import Select
+from network_capture import NetworkCapture, wait_for_dom_stable
 import chromedriver_autoinstaller
 
 def smart_capture(base_url, email, password, output_file):
@@ -28,6 +29,8 @@ def smart_capture(base_url, email, password, output_file):
     
     chromedriver_autoinstaller.install()
     driver = webdriver.Chrome(options=chrome_options)
+    # Tracks in-flight requests so each step waits only until the page settles
+    network = NetworkCapture(driver, accept=None).start()
     
     captured_sites = {}
     
@@ -35,7 +38,7 @@ def smart_capture(base_url, email, password, output_file):
         # Login
         print("1. Logging in...")
         driver.get(f"{base_url}/login")
-        time.sleep(2)
+        network.wait_until_settled()
         
         driver.find_element(By.NAME, "email").send_keys(email)
         driver.find_element(By.NAME, "password").send_keys(password)
@@ -43,11 +46,11 @@ def smart_capture(base_url, email, password, output_file):
         
         WebDriverWait(driver, 15).until(EC.url_contains("/dashboard"))
         print("   ✓ Logged in\n")
-        time.sleep(3)
+        network.wait_until_settled()
         
         # Go to dashboard
         driver.get(f"{base_url}/dashboard")
-        time.sleep(5)
+        network.wait_until_settled()
         
         print("2. Looking for site dropdown...")
         
@@ -56,7 +59,7 @@ def smart_capture(base_url, email, password, output_file):
             # Look for dropdown button/select
             dropdown = driver.find_element(By.CSS_SELECTOR, "select, button[aria-label*='site' i], button[aria-haspopup='listbox'], [role='button']")
             dropdown.click()
-            time.sleep(2)
+            wait_for_dom_stable(driver)
             
             # Get all site options
             options = driver.find_elements(By.CSS_SELECTOR, "option, li[role='option'], .MuiMenuItem-root, [role='menuitem']")
@@ -74,7 +77,7 @@ def smart_capture(base_url, email, password, output_file):
                     
                     # Click the option
                     option.click()
-                    time.sleep(4)  # Wait for dashboard to update
+                    network.wait_until_settled()  # Wait for dashboard to update
                     
                     # Extract dashboard metrics from page text
                     body_text = driver.find_element(By.TAG_NAME, "body").text
@@ -109,7 +112,7 @@ def smart_capture(base_url, email, password, output_file):
                     if i < len(options) - 1:
                         dropdown = driver.find_element(By.CSS_SELECTOR, "select, button[aria-label*='site' i], button[aria-haspopup='listbox'], [role='button']")
                         dropdown.click()
-                        time.sleep(2)
+                        wait_for_dom_stable(driver)
                     
                 except Exception as e:
                     print(f"   ✗ Error with option {i}: {e}")
@@ -141,6 +144,7 @@ def smart_capture(base_url, email, password, output_file):
         
     finally:
         time.sleep(2)
+        network.stop()
         driver.quit()
 
 if __name__ == "__main__":
@@ -12,16 +12,41 @@ This improved approach:
 
 import json
 import os
-import re
 from datetime import datetime
 from collections import defaultdict
-from urllib.parse import urlparse
+from capture_stream import CaptureFile, CaptureIndex, CaptureEntryRef, CAPTURE_FILE_NAMES
+from endpoint_matcher import endpoint_template, index_endpoints, join_endpoint_indexes
+from field_rules import FieldRuleMatcher, DEFAULT_RULES_FILE
+from json_diff_engine import (
+    iter_raw_differences, DiffRecord, json_default, last_key, align_by_index, align_by_sequence, align_by_key,
+    infer_list_key, key_field_allowed, key_is_unique, key_join_count, list_key_slot, ListKeyCache,
+    SeverityCounter, DEFAULT_ALIGNMENT_COST, TYPE_MISMATCH, KEY_ADDED, KEY_REMOVED,
+    LENGTH_MISMATCH, ITEM_ADDED, ITEM_REMOVED, ITEM_MOVED
+)
+
+# Inferred list keys, kept beside the batch diff cache
+DEFAULT_LIST_KEY_CACHE = os.path.join(".diff_cache", "list_key_cache.json")
 
 class SmartMigrationComparator:
-    def __init__(self, old_capture_dir, new_capture_dir):
+    def __init__(self, old_capture_dir, new_capture_dir, list_alignment="sequence",
+                 alignment_max_cost=DEFAULT_ALIGNMENT_COST, list_key_cache_file=DEFAULT_LIST_KEY_CACHE,
+                 rules_file=DEFAULT_RULES_FILE):
         self.old_capture_dir = old_capture_dir
         self.new_capture_dir = new_capture_dir
         
+        # How lists without an identifying key are matched:
+        # "sequence" aligns elements by content (inserts, deletes, moves),
+        # "index" compares them position by position
+        self.list_alignment = list_alignment
+        # Edit budget per gap before sequence alignment falls back to positions
+        self.alignment_max_cost = alignment_max_cost
+        
+        # Key fields inferred for lists of objects, per endpoint template and
+        # list path; persisted so later runs skip the profiling (None keeps it
+        # in memory)
+        self.list_key_cache = ListKeyCache(list_key_cache_file)
+        self._current_endpoint = ""
+        
         # Fields that are expected to change - we'll ignore these
         self.ignore_fields = {
             'timestamp', 'created_at', 'updated_at', 'modified_at', 'date_created', 'date_modified',
@@ -54,6 +79,17 @@ class SmartMigrationComparator:
             'status', 'is_deleted', 'active'
         }
         
+        # All of the above compiled into one matcher with cached decisions, plus
+        # any extra (also path-scoped) rules from the rules file
+        self.field_rules = FieldRuleMatcher(
+            ignore_fields=self.ignore_fields,
+            ignore_patterns=self.ignore_patterns,
+            important_id_fields=self.important_id_fields,
+            critical_fields=self.critical_fields
+        )
+        if self.field_rules.load(rules_file):
+            print(f"✅ Loaded comparison rules: {rules_file}")
+        
         self.results = {
             "summary": {
                 "total_differences": 0,
@@ -66,128 +102,59 @@ class SmartMigrationComparator:
             "site_analysis": {}
         }
     
-    def should_ignore_field(self, field_name):
+    def should_ignore_field(self, field_name, path=None):
         """Determine if a field should be ignored in comparison"""
-        # Don't ignore if it's in the important list
-        if field_name in self.important_id_fields:
-            return False
-        
-        # Ignore if in the ignore list
-        if field_name in self.ignore_fields:
-            return True
-        
-        # Check patterns
-        for pattern in self.ignore_patterns:
-            if re.match(pattern, field_name):
-                # But don't ignore if it's critical
-                if field_name in self.critical_fields:
-                    return False
-                return True
-        
-        return False
+        return self.field_rules.is_ignored(field_name, path)
     
-    def is_critical_field(self, field_name):
+    def is_critical_field(self, field_name, path=None):
         """Check if a field is business-critical"""
-        return field_name in self.critical_fields
+        return self.field_rules.is_critical(field_name, path)
+    
+    def _list_key(self, list1, list2, path):
+        """
+        Key fields for a list of objects: cached per endpoint template and list
+        path, profiled again when the cached key no longer identifies these
+        rows or joins none of them
+        """
+        slot = list_key_slot(self._current_endpoint, path)
+        declared = self.field_rules.rules["list_key_fields"]
+        cached = self.list_key_cache.get(slot)
+        if cached and not all(key_field_allowed(field, declared) for field in cached):
+            cached = None
+        if cached and key_is_unique(list1, list2, cached):
+            if key_join_count(list1, list2, cached) or len(list1) < 2 or len(list2) < 2:
+                return cached
+        
+        key_fields = infer_list_key(list1, list2, exclude=self.should_ignore_field, declared=declared)
+        if cached and key_fields is None:
+            return cached if key_is_unique(list1, list2, cached) else None
+        # A single row says nothing about which field identifies rows; don't remember it
+        if key_fields and len(list1) > 1 and len(list2) > 1:
+            self.list_key_cache.set(slot, key_fields)
+        return key_fields
     
     def smart_list_compare(self, list1, list2, path=""):
         """
-        Intelligently compare two lists.
-        For lists of objects with IDs, match by ID first.
+        Intelligently align two lists for the diff walk.
+        For lists of objects, find the field (or field combination) that
+        identifies the rows and hash-join old and new rows on it.
         Otherwise, try to match by content similarity.
-        """
-        differences = []
-        
-        # If lists are empty or same, no differences
-        if list1 == list2:
-            return differences
         
-        # Check if lists contain dictionaries with 'id' field
-        if (list1 and isinstance(list1[0], dict) and 'id' in list1[0] and
-            list2 and isinstance(list2[0], dict) and 'id' in list2[0]):
-            
-            # Match by ID
-            old_by_id = {item['id']: item for item in list1 if isinstance(item, dict)}
-            new_by_id = {item['id']: item for item in list2 if isinstance(item, dict)}
-            
-            all_ids = set(old_by_id.keys()) | set(new_by_id.keys())
-            
-            for item_id in all_ids:
-                item_path = f"{path}[id={item_id}]"
-                
-                if item_id not in old_by_id:
-                    differences.append({
-                        "path": item_path,
-                        "type": "added",
-                        "old_value": None,
-                        "new_value": self._summarize_value(new_by_id[item_id]),
-                        "severity": "MINOR"
-                    })
-                elif item_id not in new_by_id:
-                    differences.append({
-                        "path": item_path,
-                        "type": "removed",
-                        "old_value": self._summarize_value(old_by_id[item_id]),
-                        "new_value": None,
-                        "severity": "MAJOR"
-                    })
-                else:
-                    # Compare the items
-                    item_diffs = self.deep_compare(old_by_id[item_id], new_by_id[item_id], item_path)
-                    differences.extend(item_diffs)
-        
-        # Check if lists contain dictionaries with 'name' field
-        elif (list1 and isinstance(list1[0], dict) and 'name' in list1[0] and
-              list2 and isinstance(list2[0], dict) and 'name' in list2[0]):
-            
-            # Match by name
-            old_by_name = {item['name']: item for item in list1 if isinstance(item, dict)}
-            new_by_name = {item['name']: item for item in list2 if isinstance(item, dict)}
-            
-            all_names = set(old_by_name.keys()) | set(new_by_name.keys())
-            
-            for name in all_names:
-                item_path = f"{path}[name={name}]"
-                
-                if name not in old_by_name:
-                    differences.append({
-                        "path": item_path,
-                        "type": "added",
-                        "old_value": None,
-                        "new_value": self._summarize_value(new_by_name[name]),
-                        "severity": "MINOR"
-                    })
-                elif name not in new_by_name:
-                    differences.append({
-                        "path": item_path,
-                        "type": "removed",
-                        "old_value": self._summarize_value(old_by_name[name]),
-                        "new_value": None,
-                        "severity": "MAJOR"
-                    })
-                else:
-                    # Compare the items
-                    item_diffs = self.deep_compare(old_by_name[name], new_by_name[name], item_path)
-                    differences.extend(item_diffs)
-        
-        else:
-            # For other lists, check length first
-            if len(list1) != len(list2):
-                differences.append({
-                    "path": path,
-                    "type": "list_size_change",
-                    "old_value": f"Length: {len(list1)}",
-                    "new_value": f"Length: {len(list2)}",
-                    "severity": "MAJOR"
-                })
-            
-            # Compare element by element for common length
-            min_len = min(len(list1), len(list2))
-            for i in range(min_len):
-                item_diffs = self.deep_compare(list1[i], list2[i], f"{path}[{i}]")
-                differences.extend(item_diffs)
+        Yields raw diff events and DESCEND steps for matched items.
+        """
+        if list1 and list2 and isinstance(list1[0], dict) and isinstance(list2[0], dict):
+            key_fields = self._list_key(list1, list2, path)
+            if key_fields:
+                yield from align_by_key(list1, list2, path, key_fields)
+                return
+        
+        # For other lists, align by content so one insert does not shift every row
+        if self.list_alignment == "sequence":
+            yield from align_by_sequence(list1, list2, path, max_cost=self.alignment_max_cost)
+            return
         
-        return differences
+        # Otherwise check length first, then compare element by element
+        yield from align_by_index(list1, list2, path, report_extras=False)
     
     def _summarize_value(self, value, max_length=100):
         """Create a summary of a value for display"""
@@ -200,122 +167,141 @@ class SmartMigrationComparator:
     
     def deep_compare(self, obj1, obj2, path=""):
         """
-        Recursively compare two objects with smart filtering.
+        Compare two objects with smart filtering.
         Ignores expected changes and focuses on business data.
         """
-        differences = []
-        
-        # Skip if both are None or identical
-        if obj1 == obj2:
-            return differences
-        
-        # Type mismatch
-        if type(obj1) != type(obj2):
-            differences.append({
-                "path": path,
-                "type": "type_mismatch",
-                "old_value": f"{type(obj1).__name__}: {self._summarize_value(obj1)}",
-                "new_value": f"{type(obj2).__name__}: {self._summarize_value(obj2)}",
-                "severity": "MAJOR"
-            })
-            return differences
-        
-        # Handle dictionaries
-        if isinstance(obj1, dict):
-            all_keys = set(obj1.keys()) | set(obj2.keys())
-            
-            for key in all_keys:
-                new_path = f"{path}.{key}" if path else key
-                
-                # Check if we should ignore this field
-                if self.should_ignore_field(key):
-                    self.results["summary"]["ignored_fields"] += 1
-                    continue
-                
-                if key not in obj1:
-                    severity = "MAJOR" if self.is_critical_field(key) else "MINOR"
-                    differences.append({
-                        "path": new_path,
-                        "type": "field_added",
-                        "old_value": None,
-                        "new_value": self._summarize_value(obj2[key]),
-                        "severity": severity
-                    })
-                elif key not in obj2:
-                    severity = "CRITICAL" if self.is_critical_field(key) else "MAJOR"
-                    differences.append({
-                        "path": new_path,
-                        "type": "field_removed",
-                        "old_value": self._summarize_value(obj1[key]),
-                        "new_value": None,
-                        "severity": severity
-                    })
-                else:
-                    # Recursively compare
-                    nested_diffs = self.deep_compare(obj1[key], obj2[key], new_path)
-                    differences.extend(nested_diffs)
-        
-        # Handle lists
-        elif isinstance(obj1, list):
-            list_diffs = self.smart_list_compare(obj1, obj2, path)
-            differences.extend(list_diffs)
-        
-        # Handle primitive values
-        else:
-            if obj1 != obj2:
-                # Determine severity based on the field name and values
-                severity = "MINOR"
-                
-                if isinstance(obj1, (int, float)) and isinstance(obj2, (int, float)):
-                    # Critical: data loss (positive to zero)
-                    if obj1 > 0 and obj2 == 0:
-                        severity = "CRITICAL"
-                    # Major: large change
-                    elif abs(obj2 - obj1) > 100 or (obj1 != 0 and abs((obj2 - obj1) / obj1) > 0.3):
-                        severity = "MAJOR"
-                
-                # Check if field is critical
-                field_name = path.split('.')[-1].split('[')[0]
-                if self.is_critical_field(field_name):
-                    severity = max(severity, "MAJOR")
-                
-                differences.append({
-                    "path": path,
-                    "type": "value_changed",
-                    "old_value": obj1,
-                    "new_value": obj2,
-                    "severity": severity
-                })
-        
-        return differences
+        return list(self.iter_differences(obj1, obj2, path))
     
-    def load_capture(self, directory):
-        """Load capture data from directory"""
-        # Try different file names
-        possible_files = [
-            "complete_capture.json",
-            "complete_tab_capture.json",
-            "api_capture.json"
-        ]
-        
-        for filename in possible_files:
-            filepath = os.path.join(directory, filename)
-            if os.path.exists(filepath):
-                try:
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                        print(f"✅ Loaded: {filepath}")
-                        return data
-                except Exception as e:
-                    print(f"❌ Error loading {filepath}: {e}")
-        
-        print(f"❌ No capture file found in {directory}")
-        return None
+    def _skip_field(self, field_name, path=None):
+        """Diff-walk hook: leave ignored fields out and count them"""
+        if self.field_rules.is_ignored(field_name, path):
+            self.results["summary"]["ignored_fields"] += 1
+            return True
+        return False
+    
+    def iter_differences(self, obj1, obj2, path=""):
+        """Stream the smart-filtered differences between two objects one record at a time"""
+        events = iter_raw_differences(
+            obj1, obj2, path,
+            skip_key=self._skip_field,
+            list_aligner=self.smart_list_compare,
+            loose_equality=True
+        )
+        
+        for kind, diff_path, key, old_value, new_value in events:
+            if kind == TYPE_MISMATCH:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="type_mismatch",
+                    old_value=f"{type(old_value).__name__}: {self._summarize_value(old_value)}",
+                    new_value=f"{type(new_value).__name__}: {self._summarize_value(new_value)}",
+                    severity="MAJOR"
+                )
+            elif kind == KEY_ADDED:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="field_added",
+                    old_value=None,
+                    new_value=self._summarize_value(new_value),
+                    severity="MAJOR" if self.is_critical_field(key, diff_path) else "MINOR"
+                )
+            elif kind == KEY_REMOVED:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="field_removed",
+                    old_value=self._summarize_value(old_value),
+                    new_value=None,
+                    severity="CRITICAL" if self.is_critical_field(key, diff_path) else "MAJOR"
+                )
+            elif kind == ITEM_ADDED:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="added",
+                    old_value=None,
+                    new_value=self._summarize_value(new_value),
+                    severity="MINOR"
+                )
+            elif kind == ITEM_REMOVED:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="removed",
+                    old_value=self._summarize_value(old_value),
+                    new_value=None,
+                    severity="MAJOR"
+                )
+            elif kind == ITEM_MOVED:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="moved",
+                    old_value=f"Index: {old_value}",
+                    new_value=f"Index: {new_value}",
+                    severity="MINOR"
+                )
+            elif kind == LENGTH_MISMATCH:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="list_size_change",
+                    old_value=f"Length: {len(old_value)}",
+                    new_value=f"Length: {len(new_value)}",
+                    severity="MAJOR"
+                )
+            else:
+                yield self._classify_value_change(diff_path, old_value, new_value)
+    
+    def _classify_value_change(self, path, obj1, obj2):
+        """Build the difference record for a changed primitive value"""
+        # Determine severity based on the field name and values
+        severity = "MINOR"
+        
+        if isinstance(obj1, (int, float)) and isinstance(obj2, (int, float)):
+            # Critical: data loss (positive to zero)
+            if obj1 > 0 and obj2 == 0:
+                severity = "CRITICAL"
+            # Major: large change
+            elif abs(obj2 - obj1) > 100 or (obj1 != 0 and abs((obj2 - obj1) / obj1) > 0.3):
+                severity = "MAJOR"
+        
+        # Check if field is critical
+        field_name = last_key(path)
+        if self.is_critical_field(field_name, path):
+            severity = max(severity, "MAJOR")
+        
+        return DiffRecord(
+            path=path,
+            diff_type="value_changed",
+            old_value=obj1,
+            new_value=obj2,
+            severity=severity
+        )
+    
+    def index_capture(self, directory):
+        """
+        Map each endpoint in the capture to where its response sits in the
+        file, using the capture's sidecar index (built by one streaming pass
+        the first time). Returns an endpoint index of CaptureEntryRefs (see
+        endpoint_matcher.index_endpoints) and the response count, or (None, 0);
+        the responses themselves are loaded one pair at a time.
+        """
+        capture = CaptureFile.find(directory, CAPTURE_FILE_NAMES)
+        if capture is None:
+            print(f"❌ No capture file found in {directory}")
+            return None, 0
+        
+        try:
+            index = CaptureIndex.open(capture.path, self.extract_endpoint_path)
+        except Exception as e:
+            print(f"❌ Error loading {capture.path}: {e}")
+            return None, 0
+        
+        endpoints = index_endpoints((entry.url, index.ref(entry))
+                                    for entry in index.entries if entry.url is not None)
+        
+        print(f"✅ Loaded: {capture.path}")
+        return endpoints, len(index)
     
     def extract_endpoint_path(self, url):
-        """Extract comparable endpoint path from URL"""
-        parsed = urlparse(url)
-        return parsed.path
+        """Extract comparable endpoint path (template) from URL"""
+        return endpoint_template(url)
     
     def compare_captures(self):
         """Main comparison function"""
@@ -323,34 +309,21 @@ class SmartMigrationComparator:
         print("SMART MIGRATION COMPARISON")
         print("="*80)
         
-        # Load captures
-        old_data = self.load_capture(self.old_capture_dir)
-        new_data = self.load_capture(self.new_capture_dir)
+        # Index captures by endpoint template (streamed, nothing decoded is kept)
+        old_endpoints, old_count = self.index_capture(self.old_capture_dir)
+        new_endpoints, new_count = self.index_capture(self.new_capture_dir)
         
-        if not old_data or not new_data:
+        if old_endpoints is None or new_endpoints is None:
             print("❌ Failed to load capture data")
             return
         
-        # Get API responses
-        old_responses = old_data.get('api_responses', [])
-        new_responses = new_data.get('api_responses', [])
-        
-        print(f"\n📊 Old capture: {len(old_responses)} API responses")
-        print(f"📊 New capture: {len(new_responses)} API responses")
+        print(f"\n📊 Old capture: {old_count} API responses")
+        print(f"📊 New capture: {new_count} API responses")
         
-        # Group by endpoint path
-        old_by_path = {}
-        new_by_path = {}
-        
-        for resp in old_responses:
-            if isinstance(resp, dict) and 'url' in resp:
-                path = self.extract_endpoint_path(resp['url'])
-                old_by_path[path] = resp
-        
-        for resp in new_responses:
-            if isinstance(resp, dict) and 'url' in resp:
-                path = self.extract_endpoint_path(resp['url'])
-                new_by_path[path] = resp
+        # Match endpoints across environments (IDs in URLs may differ);
+        # repeated calls are deduplicated by body and paired by similarity
+        old_by_path, new_by_path = join_endpoint_indexes(old_endpoints, new_endpoints,
+                                                         load=CaptureEntryRef.load)
         
         # Compare endpoints
         all_paths = set(old_by_path.keys()) | set(new_by_path.keys())
@@ -376,19 +349,25 @@ class SmartMigrationComparator:
                     "severity": "CRITICAL"
                 })
             else:
-                # Compare response data only (skip metadata)
+                # Load just this pair, compare response data only (skip metadata)
+                old_url, new_url = old_resp.url or '', new_resp.url or ''
+                old_resp, new_resp = old_resp.load(), new_resp.load()
                 old_response = old_resp.get('response', old_resp)
                 new_response = new_resp.get('response', new_resp)
                 
-                differences = self.deep_compare(old_response, new_response, "response")
+                # Count severities as the differences stream in
+                self._current_endpoint = endpoint_template(old_url) if old_url else path
+                severity_counter = SeverityCounter()
+                differences = list(severity_counter.track(
+                    self.iter_differences(old_response, new_response, "response")
+                ))
                 
                 if differences:
-                    # Count severities
-                    critical = sum(1 for d in differences if d['severity'] == 'CRITICAL')
-                    major = sum(1 for d in differences if d['severity'] == 'MAJOR')
-                    minor = sum(1 for d in differences if d['severity'] == 'MINOR')
+                    critical = severity_counter.counts['CRITICAL']
+                    major = severity_counter.counts['MAJOR']
+                    minor = severity_counter.counts['MINOR']
                     
-                    severity = "CRITICAL" if critical > 0 else "MAJOR" if major > 0 else "MINOR"
+                    severity = severity_counter.overall()
                     
                     status_icon = "🔴" if critical > 0 else "🟠" if major > 0 else "🟡"
                     
@@ -399,8 +378,8 @@ class SmartMigrationComparator:
                         "endpoint": path,
                         "type": "differences_found",
                         "severity": severity,
-                        "old_url": old_resp.get('url', ''),
-                        "new_url": new_resp.get('url', ''),
+                        "old_url": old_url,
+                        "new_url": new_url,
                         "differences": differences,
                         "counts": {
                             "critical": critical,
@@ -416,6 +395,8 @@ class SmartMigrationComparator:
                 else:
                     print(f"  ✅ IDENTICAL: {path}")
         
+        self.list_key_cache.save()
+        
         # Generate report
         self.generate_report()
     
@@ -534,7 +515,7 @@ class SmartMigrationComparator:
         # Also save JSON
         json_path = os.path.join(os.getcwd(), "smart_migration_report.json")
         with open(json_path, 'w') as f:
-            json.dump(self.results, f, indent=2)
+            json.dump(self.results, f, indent=2, default=json_default)
         print(f"✅ JSON data saved to: {json_path}")
     
     def _render_endpoint(self, endpoint):
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test the API replay against a local stand-in for the app's API
+
+Run: python test_api_replay.py
+"""
+
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from api_replay import ApiReplay, build_catalog
+from browser_session import BrowserSession
+
+TOKEN = "stand-in-token"
+CAPTURED_USER = "aaaaaaaa-0000-0000-0000-000000000001"
+CAPTURED_SITES = [f"11111111-0000-0000-0000-00000000000{i}" for i in range(3)]
+USER = "bbbbbbbb-0000-0000-0000-000000000002"
+SITES = [{"id": f"site-{i}", "name": f"Site {i}"} for i in range(12)]
+
+# What a browser capture of the old environment recorded
+CAPTURE = [
+    {"url": "https://old.example/api/auth/login", "method": "POST", "response": {}},
+    {"url": "https://old.example/api/auth/me", "method": "GET", "response": {"id": CAPTURED_USER}},
+    {"url": f"https://old.example/api/users/{CAPTURED_USER}/slds", "method": "GET",
+     "response": [{"id": site_id, "name": f"Old {i}"} for i, site_id in enumerate(CAPTURED_SITES)]},
+    {"url": f"https://old.example/api/lookup/site-overview/{CAPTURED_SITES[0]}", "method": "GET", "response": {}},
+    {"url": f"https://old.example/api/lookup/site-overview/{CAPTURED_SITES[1]}", "method": "GET", "response": {}},
+    {"url": f"https://old.example/api/assets?sld_id={CAPTURED_SITES[2]}&page=1", "method": "GET", "response": []},
+    {"url": "https://old.example/api/dashboard/stats", "method": "GET", "response": {}},
+    {"url": "https://old.example/api/auth/logout", "method": "GET", "response": {}},
+    {"url": "https://old.example/static/config.json", "method": "GET", "response": {}},
+]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers like the app's API, slowly enough for requests to overlap"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.most_active = max(server.most_active, server.active)
+            server.paths.append(self.path)
+        time.sleep(0.05)
+
+        if self.headers.get("Authorization") != f"Bearer {TOKEN}":
+            status, body = 401, {"detail": "not logged in"}
+        elif self.path == "/api/auth/me":
+            status, body = 200, {"id": USER}
+        elif self.path == f"/api/users/{USER}/slds":
+            status, body = 200, SITES
+        else:
+            status, body = 200, {"path": self.path}
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with server.lock:
+            server.active -= 1
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ApiReplayTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.session = BrowserSession(cls.base_url + "/dashboard", [], {"accessToken": TOKEN})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.active = 0
+        self.server.most_active = 0
+        self.server.paths = []
+
+    def test_catalog_templates(self):
+        self.assertEqual(build_catalog(CAPTURE), [
+            "/api/assets?sld_id={sld_id}&page=1",
+            "/api/auth/me",
+            "/api/dashboard/stats",
+            "/api/lookup/site-overview/{sld_id}",
+            "/api/users/{user_id}/slds",
+        ])
+
+    def test_per_site_expansion_in_order(self):
+        snapshot = ApiReplay(per_host=4).snapshot(build_catalog(CAPTURE), {"new": (self.base_url, self.session)})
+        entries = snapshot["new"]
+        self.assertEqual(len(entries), 2 * len(SITES) + 3)
+
+        assets = [entry for entry in entries if "/api/assets" in entry["url"]]
+        self.assertEqual([entry["url"] for entry in assets],
+                         [f"{self.base_url}/api/assets?sld_id={site['id']}&page=1" for site in SITES])
+        self.assertEqual([entry["site"] for entry in assets], [site["name"] for site in SITES])
+
+        slds = [entry for entry in entries if entry["url"].endswith("/slds")]
+        self.assertEqual(slds[0]["url"], f"{self.base_url}/api/users/{USER}/slds")
+        self.assertTrue(all(entry["status"] == 200 for entry in entries))
+        self.assertNotIn("/api/auth/logout", self.server.paths)
+
+    def test_per_host_limit(self):
+        ApiReplay(per_host=3).snapshot(build_catalog(CAPTURE), {"new": (self.base_url, self.session)})
+        self.assertEqual(self.server.most_active, 3)
+
+    def test_unreachable_environment(self):
+        unreachable = f"http://127.0.0.1:{unused_port()}"
+        snapshot = ApiReplay(per_host=4).snapshot(build_catalog(CAPTURE), {
+            "new": (self.base_url, self.session),
+            "down": (unreachable, self.session),
+        })
+        # No user or sites there: only the calls without placeholders, each failed
+        self.assertEqual([entry["url"] for entry in snapshot["down"]],
+                         [unreachable + "/api/auth/me", unreachable + "/api/dashboard/stats"])
+        self.assertTrue(all("error" in entry for entry in snapshot["down"]))
+        self.assertEqual(len(snapshot["new"]), 2 * len(SITES) + 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
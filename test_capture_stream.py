@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the incremental capture reader and its sidecar index
+
+Run: python test_capture_stream.py
+"""
+
+import codecs
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from capture_stream import CaptureFile, CaptureIndex
+
+CAPTURE = {
+    "metadata": {"base_url": "https://old.example", "note": "café ✓"},
+    "api_responses": [
+        {"url": "https://old.example/api/auth/me", "status": 200, "response": {"name": "Zoë"}},
+        {"url": "https://old.example/api/users/1/slds", "status": 200, "response": [{"id": 1}, {"id": 2}]},
+        {"url": "https://old.example/api/dashboard/stats", "status": 500, "response": "error ✗"},
+    ],
+}
+
+
+class CaptureStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data, prefix=b""):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(prefix + json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+        return path
+
+    def assert_reads_capture(self, path):
+        capture = CaptureFile(path, chunk_size=7)
+        self.assertEqual(list(capture.iter_responses()), CAPTURE["api_responses"])
+        self.assertEqual(capture.metadata(), CAPTURE["metadata"])
+        self.assertEqual([ref.load() for _, ref in capture.iter_indexed()], CAPTURE["api_responses"])
+        with CaptureIndex.open(path) as index:
+            self.assertEqual(list(index), CAPTURE["api_responses"])
+        # Reopened from the sidecar index
+        with CaptureIndex.open(path) as index:
+            self.assertEqual(index[2], CAPTURE["api_responses"][2])
+
+    def test_plain_capture(self):
+        self.assert_reads_capture(self.write("complete_capture.json", CAPTURE))
+
+    def test_capture_with_bom(self):
+        path = self.write("complete_capture.json", CAPTURE, prefix=codecs.BOM_UTF8)
+        self.assert_reads_capture(path)
+        self.assertEqual(CaptureFile(path).load(), CAPTURE)
+
+    def test_deleted_capture_is_stale(self):
+        path = self.write("complete_capture.json", CAPTURE)
+        CaptureIndex.open(path).close()
+        os.remove(path)
+        self.assertIsNone(CaptureIndex.read(path))
+
+    def test_emptied_capture(self):
+        path = self.write("complete_capture.json", CAPTURE)
+        index = CaptureIndex.open(path)
+        open(path, 'w').close()
+        with self.assertRaises(ValueError):
+            index[0]
+        index.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@
 Test script to demonstrate the enhanced migration verification functionality
 """
 
-import re
+from numeric_text import numeric_values_by_label, join_numeric_values
 
 def extract_numeric_values_demo():
     """Demo function to show how numeric values are extracted"""
@@ -33,43 +33,19 @@ def extract_numeric_values_demo():
     print(new_text)
     
     # Extract numeric values using the same method as in the enhanced verification
-    patterns = [
-        r'(?:total\s*)?assets?\s*[:\-]?\s*(\d+)',
-        r'assets?\s*\((\d+)\)',
-        r'count\s*[:\-]?\s*(\d+)',
-        r'total\s*[:\-]?\s*(\d+)',
-        r'(\d+)\s*assets?',
-    ]
-    
     print("\nEXTRACTED NUMERIC VALUES:")
     
-    old_numbers = {}
-    new_numbers = {}
-    
-    for pattern in patterns:
-        old_matches = re.findall(pattern, old_text, re.IGNORECASE)
-        new_matches = re.findall(pattern, new_text, re.IGNORECASE)
-        
-        for i, match in enumerate(old_matches):
-            key = f"pattern_{pattern}_{i}"
-            old_numbers[key] = int(match)
-            
-        for i, match in enumerate(new_matches):
-            key = f"pattern_{pattern}_{i}"
-            new_numbers[key] = int(match)
+    old_numbers = numeric_values_by_label(old_text)
+    new_numbers = numeric_values_by_label(new_text)
     
     print(f"Old values: {old_numbers}")
     print(f"New values: {new_numbers}")
     
-    # Compare values
+    # Compare values, aligned by label
     print("\nCOMPARISON RESULTS:")
-    all_keys = set(old_numbers.keys()) | set(new_numbers.keys())
     differences_found = False
     
-    for key in all_keys:
-        old_val = old_numbers.get(key, None)
-        new_val = new_numbers.get(key, None)
-        
+    for key, old_val, new_val in join_numeric_values(old_numbers, new_numbers):
         if old_val is None and new_val is not None:
             print(f"  ADDED: {key} = {new_val}")
             differences_found = True
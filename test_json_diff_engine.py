@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test the diff core shared by the comparators
+
+Run: python test_json_diff_engine.py
+"""
+
+import unittest
+from json_diff_engine import iter_raw_differences, render_path, SubtreeHashIndex, VALUE_CHANGED, TYPE_MISMATCH
+
+# Distinct values with the same hash() in CPython
+COLLIDING = [(-1, -2), (1, 1 + (2 ** 61 - 1)), (0, 2 ** 61 - 1)]
+
+
+def differences(obj1, obj2, **options):
+    return [(kind, render_path(path), old, new)
+            for kind, path, _, old, new in iter_raw_differences(obj1, obj2, **options)]
+
+
+class SubtreeHashIndexTest(unittest.TestCase):
+
+    def test_colliding_leaves_are_reported(self):
+        for old, new in COLLIDING:
+            self.assertEqual(hash(old), hash(new))
+            self.assertEqual(differences({'a': {'b': old}}, {'a': {'b': new}}),
+                             [(VALUE_CHANGED, 'a.b', old, new)])
+            self.assertEqual(differences([old, 'x'], [new, 'x']),
+                             [(VALUE_CHANGED, '[0]', old, new)])
+            self.assertEqual(differences([[old]], [[new]], sort_keys=True),
+                             [(VALUE_CHANGED, '[0][0]', old, new)])
+
+    def test_colliding_subtrees_are_not_same(self):
+        old_index, new_index = SubtreeHashIndex(), SubtreeHashIndex()
+        self.assertIsNone(old_index.same_subtree(new_index, {'b': -1}, {'b': -2}))
+
+    def test_identical_subtrees_skipped_with_counts(self):
+        stats = {"total_paths_compared": 0, "identical": 0}
+        self.assertEqual(differences({'a': [1, {'b': 'x'}], 'c': 2}, {'a': [1, {'b': 'x'}], 'c': 3},
+                                     sort_keys=True, stats=stats),
+                         [(VALUE_CHANGED, 'c', 2, 3)])
+        # a, a[0] twice, a[1], a[1].b twice, c twice; the two leaves under a are identical
+        self.assertEqual(stats, {"total_paths_compared": 8, "identical": 2})
+
+    def test_numeric_types_kept_apart(self):
+        self.assertEqual(differences([1, True], [1.0, 1]),
+                         [(TYPE_MISMATCH, '[0]', 1, 1.0), (TYPE_MISMATCH, '[1]', True, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
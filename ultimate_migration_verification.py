@@ -12,18 +12,92 @@ This system performs:
 - Comprehensive reporting with severity classification
 """
 
+import html
 import json
 import os
 import difflib
 import hashlib
-from urllib.parse import urlparse
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from collections import defaultdict
+from capture_stream import CaptureFile, CaptureEntryRef, CaptureIndex
+from diff_store import DiffStore, DEFAULT_SPILL_BYTES
+from endpoint_matcher import endpoint_template, match_endpoints
+from json_diff_engine import (
+    iter_raw_differences, ArrayTolerance, DiffRecord, SeverityCounter, TYPE_MISMATCH, KEY_ADDED,
+    KEY_REMOVED, LENGTH_MISMATCH, VALUE_CHANGED, ARRAY_CHANGED
+)
+from site_scan import SiteScan, SiteDataRef, SiteNameMatcher, apply_writes, numeric_writes, site_search_text
+from value_index import PageSourceIndex, ValueIndex
+
+# Verifier used by endpoint-comparison worker processes
+_worker_verifier = None
+
+# Characters of a site's source payload shown in the HTML report
+SOURCE_PREVIEW_CHARS = 4000
+
+
+def _init_endpoint_worker(verifier_class, settings):
+    """Worker process initializer: one verifier per process, configured like the parent's"""
+    global _worker_verifier
+    _worker_verifier = verifier_class("", "")
+    for name, value in settings.items():
+        setattr(_worker_verifier, name, value)
+
+
+def _resolve_response(resp):
+    """A grouped response is either the response dict or a CaptureEntryRef to load it from"""
+    if isinstance(resp, CaptureEntryRef):
+        return resp.load()
+    return resp
+
+
+def _response_url(resp):
+    if isinstance(resp, CaptureEntryRef):
+        return resp.url or ''
+    return resp.get('url', '')
+
+
+def _load_endpoint_payload(payload):
+    """A worker payload is either a pickled response or its location in a capture file"""
+    if isinstance(payload, CaptureEntryRef):
+        return payload.load()
+    return pickle.loads(payload)
+
+
+def _diff_endpoint_pair(old_payload, new_payload):
+    """Worker task: diff one endpoint pair, return plain record tuples"""
+    old_resp = _load_endpoint_payload(old_payload)
+    new_resp = _load_endpoint_payload(new_payload)
+    return [
+        (diff.path, diff.type, diff.old_value, diff.new_value, diff.severity, diff.extra)
+        for diff in _worker_verifier.iter_endpoint_differences(old_resp, new_resp)
+    ]
+
 
 class UltimateMigrationVerifier:
-    def __init__(self, old_capture_dir, new_capture_dir):
+    # Attributes that decide how a pair is diffed; worker processes get the
+    # parent's values. Subclasses adding comparison rules list them here too.
+    WORKER_SETTINGS = ("array_tolerance",)
+    
+    def __init__(self, old_capture_dir, new_capture_dir, spill_bytes=DEFAULT_SPILL_BYTES, workers=1):
         self.old_capture_dir = old_capture_dir
         self.new_capture_dir = new_capture_dir
+        # Worker processes for endpoint comparison (1 = compare in this process,
+        # None = one per CPU core)
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        # Endpoint difference records live in one columnar store; each endpoint
+        # holds a view of its range. Values spill to disk past spill_bytes.
+        self.diff_store = DiffStore(spill_bytes)
+        # Numeric lists (readings, time series) of at least min_length values are
+        # compared as arrays within this tolerance and reported as one summary record
+        self.array_tolerance = ArrayTolerance()
+        # id(responses) -> (responses, SiteScan, ValueIndex); the responses are
+        # kept so the id stays theirs
+        self._capture_scans = {}
+        # capture directory -> PageSourceIndex
+        self._page_source_indexes = {}
         self.results = {
             "metadata": {
                 "verification_timestamp": datetime.now().isoformat(),
@@ -44,103 +118,42 @@ class UltimateMigrationVerifier:
             "screenshot_analysis": {}
         }
     
+    def open_complete_capture(self, directory):
+        """
+        Open the capture in directory through its sidecar index (built on the
+        first open). The returned CaptureIndex reads like the api_responses
+        list but decodes entries on demand, so it can be passed to
+        compare_endpoints_by_path and the site analysis methods directly.
+        """
+        capture = CaptureFile.find(directory, ("complete_capture.json", "complete_tab_capture.json"))
+        if capture is None:
+            print(f"❌ No capture file found in {directory}")
+            return None
+        index = CaptureIndex.open(capture.path, self.extract_endpoint_key)
+        print(f"✅ Opened capture data {capture.path} ({capture.size:,} bytes, {len(index)} responses)")
+        return index
+    
     def load_complete_capture(self, directory):
-        """Load complete capture data from directory"""
-        capture_file = os.path.join(directory, "complete_capture.json")
-        if os.path.exists(capture_file):
-            try:
-                with open(capture_file, 'r') as f:
-                    data = json.load(f)
-                    print(f"✅ Loaded capture data from {capture_file} ({len(str(data))} characters)")
-                    return data
-            except Exception as e:
-                print(f"❌ Error loading {capture_file}: {str(e)}")
+        """
+        Capture data of directory: its metadata and, as api_responses, the
+        CaptureIndex from open_complete_capture(). Entries are decoded on
+        demand and site data refers to them by the capture file's path.
+        """
+        try:
+            index = self.open_complete_capture(directory)
+            if index is None:
                 return None
-        else:
-            # Try complete_tab_capture.json
-            capture_file = os.path.join(directory, "complete_tab_capture.json")
-            if os.path.exists(capture_file):
-                try:
-                    with open(capture_file, 'r') as f:
-                        data = json.load(f)
-                        print(f"✅ Loaded tab capture data from {capture_file} ({len(str(data))} characters)")
-                        return data
-                except Exception as e:
-                    print(f"❌ Error loading {capture_file}: {str(e)}")
-                    return None
-        return None
+            return {
+                "metadata": CaptureFile(index.capture_file).metadata(),
+                "api_responses": index
+            }
+        except (OSError, ValueError) as e:
+            print(f"❌ Error loading capture from {directory}: {str(e)}")
+            return None
     
     def extract_sites_from_responses(self, responses):
         """Extract site information from API responses"""
-        sites = set()
-        
-        for response in responses:
-            if isinstance(response, dict) and 'response' in response:
-                resp_data = response['response']
-                
-                # Look for site-related data in various possible structures
-                if isinstance(resp_data, dict):
-                    # Check sites overview data
-                    if 'sites' in resp_data:
-                        sites_data = resp_data['sites']
-                        if isinstance(sites_data, dict):
-                            sites.update(sites_data.keys())
-                            # Also check values if they contain site names
-                            for site_info in sites_data.values():
-                                if isinstance(site_info, dict) and 'name' in site_info:
-                                    sites.add(site_info['name'])
-                        elif isinstance(sites_data, list):
-                            for item in sites_data:
-                                if isinstance(item, dict) and 'name' in item:
-                                    sites.add(item['name'])
-                    
-                    # Check sites overview in different structure
-                    if 'sites_overview' in resp_data:
-                        sites_data = resp_data['sites_overview']
-                        if isinstance(sites_data, dict):
-                            sites.update(sites_data.keys())
-                            # Also check values if they contain site names
-                            for site_info in sites_data.values():
-                                if isinstance(site_info, dict) and 'name' in site_info:
-                                    sites.add(site_info['name'])
-                    
-                    # Check data structure that might contain sites
-                    for key, value in resp_data.items():
-                        if isinstance(value, list):
-                            for item in value:
-                                if isinstance(item, dict):
-                                    if 'name' in item:
-                                        sites.add(item['name'])
-                                    # Check for nested site information
-                                    for sub_key, sub_value in item.items():
-                                        if isinstance(sub_value, dict) and 'name' in sub_value:
-                                            sites.add(sub_value['name'])
-                        elif isinstance(value, dict):
-                            if 'name' in value:
-                                sites.add(value['name'])
-                            # Check for nested site information
-                            for sub_key, sub_value in value.items():
-                                if isinstance(sub_value, dict) and 'name' in sub_value:
-                                    sites.add(sub_value['name'])
-                    
-                    # Look for SLD (Single Line Diagram) data which often contains site info
-                    if 'sld' in resp_data and isinstance(resp_data['sld'], dict) and 'name' in resp_data['sld']:
-                        sites.add(resp_data['sld']['name'])
-                    
-                    # Look for site-related keys
-                    site_related_keys = ['site', 'site_name', 'location', 'facility', 'plant']
-                    for key in site_related_keys:
-                        if key in resp_data and isinstance(resp_data[key], str):
-                            sites.add(resp_data[key])
-                
-                # Check if response itself is a list of sites
-                elif isinstance(resp_data, list):
-                    for item in resp_data:
-                        if isinstance(item, dict) and 'name' in item:
-                            sites.add(item['name'])
-                        elif isinstance(item, str):
-                            # Sometimes sites are just listed as strings
-                            sites.add(item)
+        sites = set(self.site_scan(responses).sites)
         
         # Add common site names that might be referenced
         common_sites = ["Site657", "All Facilities", "London UK", "Melbourne AU", "ShowSite3", "test", "test site", "Toronto Canada"]
@@ -149,164 +162,219 @@ class UltimateMigrationVerifier:
         return list(sites)
     
     def extract_endpoint_key(self, url):
-        """Extract comparable endpoint key from URL"""
-        parsed = urlparse(url)
-        return parsed.path
+        """Extract comparable endpoint key (path template) from URL"""
+        return endpoint_template(url)
     
     def deep_json_compare(self, obj1, obj2, path=""):
         """
-        Recursively compare two JSON objects and return all differences.
+        Compare two JSON objects and return all differences.
         This performs complete JSON structure comparison as required.
         """
-        differences = []
-        
-        # Type mismatch
-        if type(obj1) != type(obj2):
-            differences.append({
-                "path": path,
-                "type": "type_mismatch",
-                "old_value": str(obj1)[:200],  # Limit length for readability
-                "new_value": str(obj2)[:200],
-                "severity": "MAJOR"
-            })
-            return differences
-        
-        # Handle dictionaries
-        if isinstance(obj1, dict):
-            all_keys = set(obj1.keys()) | set(obj2.keys())
-            
-            for key in all_keys:
-                new_path = f"{path}.{key}" if path else key
-                
-                if key not in obj1:
-                    differences.append({
-                        "path": new_path,
-                        "type": "added",
-                        "old_value": None,
-                        "new_value": str(obj2[key])[:200],
-                        "severity": "MINOR"
-                    })
-                elif key not in obj2:
-                    differences.append({
-                        "path": new_path,
-                        "type": "removed",
-                        "old_value": str(obj1[key])[:200],
-                        "new_value": None,
-                        "severity": "CRITICAL" if str(obj1[key]) else "MINOR"
-                    })
-                else:
-                    # Recursively compare nested objects
-                    differences.extend(self.deep_json_compare(obj1[key], obj2[key], new_path))
-        
-        # Handle lists
-        elif isinstance(obj1, list):
-            if len(obj1) != len(obj2):
-                differences.append({
-                    "path": path,
-                    "type": "list_length_mismatch",
-                    "old_value": f"Length: {len(obj1)}",
-                    "new_value": f"Length: {len(obj2)}",
-                    "severity": "MAJOR"
-                })
-                
-                # Compare common elements
-                min_len = min(len(obj1), len(obj2))
-                for i in range(min_len):
-                    differences.extend(self.deep_json_compare(obj1[i], obj2[i], f"{path}[{i}]"))
-            else:
-                # Same length, compare element by element
-                for i in range(len(obj1)):
-                    differences.extend(self.deep_json_compare(obj1[i], obj2[i], f"{path}[{i}]"))
-        
-        # Handle primitive values
+        return list(self.iter_json_differences(obj1, obj2, path))
+    
+    def iter_json_differences(self, obj1, obj2, path=""):
+        """
+        Stream the differences between two JSON objects one record at a time.
+        Backed by the shared iterative diff walk, so deep payloads cannot hit
+        the recursion limit and no intermediate lists are built.
+        """
+        events = iter_raw_differences(obj1, obj2, path, numeric_arrays=self.array_tolerance)
+        for kind, diff_path, key, old_value, new_value in events:
+            if kind == TYPE_MISMATCH:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="type_mismatch",
+                    old_value=str(old_value)[:200],  # Limit length for readability
+                    new_value=str(new_value)[:200],
+                    severity="MAJOR"
+                )
+            elif kind == KEY_ADDED:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="added",
+                    old_value=None,
+                    new_value=str(new_value)[:200],
+                    severity="MINOR"
+                )
+            elif kind == KEY_REMOVED:
+                old_text = str(old_value)
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="removed",
+                    old_value=old_text[:200],
+                    new_value=None,
+                    severity="CRITICAL" if old_text else "MINOR"
+                )
+            elif kind == LENGTH_MISMATCH:
+                yield DiffRecord(
+                    path=diff_path,
+                    diff_type="list_length_mismatch",
+                    old_value=f"Length: {len(old_value)}",
+                    new_value=f"Length: {len(new_value)}",
+                    severity="MAJOR"
+                )
+            elif kind == VALUE_CHANGED:
+                yield self.classify_value_change(diff_path, old_value, new_value)
+            elif kind == ARRAY_CHANGED:
+                yield self.classify_array_change(diff_path, old_value)
+    
+    def classify_array_change(self, path, summary):
+        """Build the summary record for a numeric array that changed beyond tolerance"""
+        max_delta = summary.max_abs_delta
+        if summary.old_length != summary.new_length or (max_delta is not None and max_delta > 1000):
+            severity = "MAJOR"
         else:
-            if obj1 != obj2:
-                # Special handling for numeric values that change from positive to zero
-                if isinstance(obj1, (int, float)) and isinstance(obj2, (int, float)):
-                    if obj1 > 0 and obj2 == 0:
-                        differences.append({
-                            "path": path,
-                            "type": "critical_data_loss",
-                            "old_value": obj1,
-                            "new_value": obj2,
-                            "severity": "CRITICAL"
-                        })
-                    elif obj1 == 0 and obj2 > 0:
-                        differences.append({
-                            "path": path,
-                            "type": "data_added",
-                            "old_value": obj1,
-                            "new_value": obj2,
-                            "severity": "MINOR"
-                        })
-                    else:
-                        # Check for specific large differences
-                        abs_diff = abs(obj2 - obj1)
-                        if abs_diff > 1000:  # Large absolute difference
-                            differences.append({
-                                "path": path,
-                                "type": "major_value_change",
-                                "old_value": obj1,
-                                "new_value": obj2,
-                                "severity": "MAJOR"
-                            })
-                        elif obj1 != 0 and abs(obj2 - obj1) / abs(obj1) > 0.3:  # More than 30% change (lowered threshold)
-                            differences.append({
-                                "path": path,
-                                "type": "major_value_change",
-                                "old_value": obj1,
-                                "new_value": obj2,
-                                "severity": "MAJOR"
-                            })
-                        # Check for specific values mentioned in the issue
-                        elif (obj1 == 2535 and obj2 == 1048) or (obj1 == 1 and obj2 == 0) or (obj1 == 71 and obj2 == 57):
-                            severity = "CRITICAL" if (obj1 == 1 and obj2 == 0) else "MAJOR"
-                            differences.append({
-                                "path": path,
-                                "type": "specific_issue_detected",
-                                "old_value": obj1,
-                                "new_value": obj2,
-                                "severity": severity
-                            })
-                        else:
-                            differences.append({
-                                "path": path,
-                                "type": "value_changed",
-                                "old_value": obj1,
-                                "new_value": obj2,
-                                "severity": "MINOR"
-                            })
-                else:
-                    differences.append({
-                        "path": path,
-                        "type": "value_changed",
-                        "old_value": str(obj1)[:200],
-                        "new_value": str(obj2)[:200],
-                        "severity": "MINOR"
-                    })
-        
-        return differences
+            severity = "MINOR"
+        
+        return DiffRecord(
+            path=path,
+            diff_type="numeric_array_changed",
+            old_value=f"Length: {summary.old_length}",
+            new_value=f"Length: {summary.new_length}, {summary.changed} of {summary.compared} values changed"
+                      + (f" (max |Δ| {max_delta:g})" if max_delta is not None else ""),
+            severity=severity,
+            extra={
+                "changed_count": summary.changed,
+                "max_abs_delta": max_delta,
+                "first_changed_indexes": summary.first_indexes
+            }
+        )
     
-    def compare_endpoints_by_path(self, old_responses, new_responses):
-        """Compare endpoints by matching their paths"""
-        old_by_path = {}
-        new_by_path = {}
-        
-        # Group by endpoint path
-        for resp in old_responses:
-            if isinstance(resp, dict) and 'url' in resp:
-                path = self.extract_endpoint_key(resp['url'])
-                old_by_path[path] = resp
+    def classify_value_change(self, path, obj1, obj2):
+        """Build the difference record for a changed primitive value"""
+        # Special handling for numeric values that change from positive to zero
+        if isinstance(obj1, (int, float)) and isinstance(obj2, (int, float)):
+            if obj1 > 0 and obj2 == 0:
+                diff_type, severity = "critical_data_loss", "CRITICAL"
+            elif obj1 == 0 and obj2 > 0:
+                diff_type, severity = "data_added", "MINOR"
+            # Check for specific large differences
+            elif abs(obj2 - obj1) > 1000:  # Large absolute difference
+                diff_type, severity = "major_value_change", "MAJOR"
+            elif obj1 != 0 and abs(obj2 - obj1) / abs(obj1) > 0.3:  # More than 30% change (lowered threshold)
+                diff_type, severity = "major_value_change", "MAJOR"
+            # Check for specific values mentioned in the issue
+            elif (obj1 == 2535 and obj2 == 1048) or (obj1 == 1 and obj2 == 0) or (obj1 == 71 and obj2 == 57):
+                diff_type = "specific_issue_detected"
+                severity = "CRITICAL" if (obj1 == 1 and obj2 == 0) else "MAJOR"
+            else:
+                diff_type, severity = "value_changed", "MINOR"
+            
+            return DiffRecord(
+                path=path,
+                diff_type=diff_type,
+                old_value=obj1,
+                new_value=obj2,
+                severity=severity
+            )
         
-        for resp in new_responses:
+        return DiffRecord(
+            path=path,
+            diff_type="value_changed",
+            old_value=str(obj1)[:200],
+            new_value=str(obj2)[:200],
+            severity="MINOR"
+        )
+    
+    def iter_endpoint_differences(self, old_resp, new_resp):
+        """Stream the differences of one matched endpoint pair"""
+        found = False
+        for diff in self.iter_json_differences(old_resp, new_resp):
+            found = True
+            yield diff
+        
+        # Also compare just the response data specifically
+        old_response_data = old_resp.get('response', old_resp)
+        new_response_data = new_resp.get('response', new_resp)
+        
+        # If the top-level comparison didn't find differences but the response data might have them
+        if not found and old_response_data != new_response_data:
+            yield from self.iter_json_differences(old_response_data, new_response_data, "response")
+    
+    def _submit_endpoint_pairs(self, executor, paths, old_by_path, new_by_path):
+        """
+        Queue matched endpoint pairs on the worker pool, biggest payload first
+        so large endpoints don't straggle at the end. Workers only receive the
+        two pickled responses, or their byte ranges in the capture files when
+        streaming. Returns {path: future}.
+        """
+        def payload(resp):
+            if isinstance(resp, CaptureEntryRef):
+                return resp
+            return pickle.dumps(resp, pickle.HIGHEST_PROTOCOL)
+        
+        def size(item):
+            return item.length if isinstance(item, CaptureEntryRef) else len(item)
+        
+        payloads = {path: (payload(old_by_path[path]), payload(new_by_path[path])) for path in paths}
+        futures = {}
+        for path in sorted(paths, key=lambda p: -(size(payloads[p][0]) + size(payloads[p][1]))):
+            old_blob, new_blob = payloads.pop(path)
+            futures[path] = executor.submit(_diff_endpoint_pair, old_blob, new_blob)
+        return futures
+    
+    def _endpoint_items(self, responses):
+        """
+        (url, response) for every response with a url. For a CaptureIndex or
+        CaptureFile only the responses' locations (CaptureEntryRef) are
+        yielded; an index doesn't decode anything at all.
+        """
+        if isinstance(responses, CaptureIndex):
+            for entry in responses.entries:
+                if entry.url is not None:
+                    yield entry.url, responses.ref(entry)
+            return
+        if isinstance(responses, CaptureFile):
+            for resp, ref in responses.iter_indexed():
+                if isinstance(resp, dict) and 'url' in resp:
+                    yield resp['url'], ref
+            return
+        
+        for resp in responses:
             if isinstance(resp, dict) and 'url' in resp:
-                path = self.extract_endpoint_key(resp['url'])
-                new_by_path[path] = resp
+                yield resp['url'], resp
+    
+    def compare_endpoints_by_path(self, old_responses, new_responses):
+        """
+        Compare endpoints by matching their path templates (IDs in the path
+        and query values don't have to match, see endpoint_matcher).
+        Repeated calls of an endpoint are deduplicated by body and paired by
+        similarity instead of the last call silently winning.
+        Takes response lists/iterables, CaptureFiles or CaptureIndexes; with
+        the latter two only one endpoint pair is held in memory at a time.
+        With self.workers > 1 the matched pairs are diffed in a process pool;
+        results are merged in sorted path order either way.
+        """
+        # Group by endpoint template
+        old_by_path, new_by_path = match_endpoints(self._endpoint_items(old_responses),
+                                                   self._endpoint_items(new_responses),
+                                                   load=_resolve_response)
         
         # Compare matching endpoints
-        all_paths = set(old_by_path.keys()) | set(new_by_path.keys())
+        all_paths = sorted(set(old_by_path.keys()) | set(new_by_path.keys()))
         endpoint_differences = []
         
+        matched_paths = [path for path in all_paths if path in old_by_path and path in new_by_path]
+        executor = None
+        futures = {}
+        if self.workers > 1 and len(matched_paths) > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=min(self.workers, len(matched_paths)),
+                initializer=_init_endpoint_worker,
+                initargs=(type(self), {name: getattr(self, name) for name in self.WORKER_SETTINGS})
+            )
+            futures = self._submit_endpoint_pairs(executor, matched_paths, old_by_path, new_by_path)
+        
+        try:
+            self._merge_endpoint_results(all_paths, old_by_path, new_by_path, futures, endpoint_differences)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        
+        return endpoint_differences
+    
+    def _merge_endpoint_results(self, all_paths, old_by_path, new_by_path, futures, endpoint_differences):
+        """Build the endpoint entries in path order, taking worker results where available"""
         for path in all_paths:
             old_resp = old_by_path.get(path)
             new_resp = new_by_path.get(path)
@@ -317,13 +385,13 @@ class UltimateMigrationVerifier:
                     "endpoint": path,
                     "type": "endpoint_added",
                     "severity": "MINOR",
-                    "differences": [{
-                        "path": "",
-                        "type": "endpoint_added",
-                        "old_value": None,
-                        "new_value": "New endpoint in migrated site",
-                        "severity": "MINOR"
-                    }]
+                    "differences": self.diff_store.extend([DiffRecord(
+                        path="",
+                        diff_type="endpoint_added",
+                        old_value=None,
+                        new_value="New endpoint in migrated site",
+                        severity="MINOR"
+                    )])
                 })
             elif old_resp is not None and new_resp is None:
                 # Removed endpoint
@@ -331,38 +399,33 @@ class UltimateMigrationVerifier:
                     "endpoint": path,
                     "type": "endpoint_removed",
                     "severity": "CRITICAL",
-                    "differences": [{
-                        "path": "",
-                        "type": "endpoint_removed",
-                        "old_value": "Endpoint exists in old site but missing in migrated site",
-                        "new_value": None,
-                        "severity": "CRITICAL"
-                    }]
+                    "differences": self.diff_store.extend([DiffRecord(
+                        path="",
+                        diff_type="endpoint_removed",
+                        old_value="Endpoint exists in old site but missing in migrated site",
+                        new_value=None,
+                        severity="CRITICAL"
+                    )])
                 })
             elif old_resp is not None and new_resp is not None:
-                # Compare responses
-                differences = self.deep_json_compare(old_resp, new_resp)
-                
-                # Also compare just the response data specifically
-                old_response_data = old_resp.get('response', old_resp)
-                new_response_data = new_resp.get('response', new_resp)
-                
-                # If the top-level comparison didn't find differences but the response data might have them
-                if not differences and old_response_data != new_response_data:
-                    differences = self.deep_json_compare(old_response_data, new_response_data, "response")
+                # Compare responses, counting severities as the differences stream in
+                if path in futures:
+                    records = (DiffRecord(*fields) for fields in futures.pop(path).result())
+                else:
+                    records = self.iter_endpoint_differences(_resolve_response(old_resp), _resolve_response(new_resp))
+                severity_counter = SeverityCounter()
+                differences = self.diff_store.extend(severity_counter.track(records))
                 
                 if differences:
                     # Determine overall severity
-                    has_critical = any(diff.get("severity") == "CRITICAL" for diff in differences)
-                    has_major = any(diff.get("severity") == "MAJOR" for diff in differences)
-                    severity = "CRITICAL" if has_critical else "MAJOR" if has_major else "MINOR"
+                    severity = severity_counter.overall()
                     
                     endpoint_differences.append({
                         "endpoint": path,
                         "type": "differences_found",
                         "severity": severity,
-                        "old_url": old_resp.get('url', ''),
-                        "new_url": new_resp.get('url', ''),
+                        "old_url": _response_url(old_resp),
+                        "new_url": _response_url(new_resp),
                         "differences": differences
                     })
                 else:
@@ -371,164 +434,18 @@ class UltimateMigrationVerifier:
                         "endpoint": path,
                         "type": "identical",
                         "severity": "IDENTICAL",
-                        "old_url": old_resp.get('url', ''),
-                        "new_url": new_resp.get('url', ''),
+                        "old_url": _response_url(old_resp),
+                        "new_url": _response_url(new_resp),
                         "differences": []
                     })
-        
-        return endpoint_differences
     
     def extract_comprehensive_site_data(self, responses, site_name):
         """Extract comprehensive data about a site from all responses"""
-        site_data = {
-            "name": site_name,
-            "total_assets": 0,
-            "asset_types": {},
-            "issues": {},
-            "tasks": 0,
-            "site_visits": 0,
-            "opportunities_value": 0,
-            "equipment_at_risk": 0,
-            "raw_data": []
-        }
-        
-        # Look through all responses for site-related data
-        for response in responses:
-            if isinstance(response, dict) and 'response' in response:
-                resp_data = response['response']
-                site_data["raw_data"].append(resp_data)
-                
-                # Extract data from site-overview responses
-                if isinstance(resp_data, dict):
-                    # Check 'sites' object (common structure)
-                    if 'sites' in resp_data and isinstance(resp_data['sites'], dict):
-                        sites_dict = resp_data['sites']
-                        if site_name in sites_dict:
-                            site_info = sites_dict[site_name]
-                            self.extract_numeric_values_from_dict(site_info, site_data)
-                            
-                    # Check 'sites_overview' list/dict
-                    if 'sites_overview' in resp_data:
-                        sites_overview = resp_data['sites_overview']
-                        if isinstance(sites_overview, list):
-                            for site_info in sites_overview:
-                                if isinstance(site_info, dict) and site_info.get('name') == site_name:
-                                    self.extract_numeric_values_from_dict(site_info, site_data)
-                        elif isinstance(sites_overview, dict):
-                             if site_name in sites_overview:
-                                site_info = sites_overview[site_name]
-                                self.extract_numeric_values_from_dict(site_info, site_data)
-
-                    # Check 'data' section (dashboard structure)
-                    if 'data' in resp_data and isinstance(resp_data['data'], dict):
-                        data_section = resp_data['data']
-                        # If this response is SPECIFIC to the site we are analyzing
-                        # We need a way to know if this response belongs to the site.
-                        # Usually the URL would tell us, but here we just have the response body.
-                        # We can check if the response contains the site name or if we are in a site-specific context.
-                        # For now, let's rely on the fact that we filter responses by site in the capture phase if possible,
-                        # or that the response contains the site name.
-                        
-                        # Extract total assets
-                        if 'total_assets' in data_section and isinstance(data_section['total_assets'], (int, float)):
-                            # Only update if we are sure this is for the correct site, or if it's the only data
-                            site_data['total_assets'] = data_section['total_assets']
-                        
-                        # Extract asset breakdown
-                        if 'asset_breakdown' in data_section and isinstance(data_section['asset_breakdown'], list):
-                            for item in data_section['asset_breakdown']:
-                                if isinstance(item, dict) and 'node_class_name' in item and 'count' in item:
-                                    asset_type = item['node_class_name']
-                                    count = item['count']
-                                    site_data['asset_types'][asset_type] = count
-                        
-                        # Extract issues breakdown
-                        if 'issues_breakdown' in data_section and isinstance(data_section['issues_breakdown'], list):
-                            for item in data_section['issues_breakdown']:
-                                if isinstance(item, dict) and 'issue_class_name' in item and 'count' in item:
-                                    issue_type = item['issue_class_name']
-                                    count = item['count']
-                                    site_data['issues'][issue_type] = count
-                        
-                        # Extract other dashboard values
-                        if 'open_issues_count' in data_section and isinstance(data_section['open_issues_count'], (int, float)):
-                            site_data['issues']['Unresolved Issues'] = data_section['open_issues_count']
-                        
-                        if 'pending_tasks_count' in data_section and isinstance(data_section['pending_tasks_count'], (int, float)):
-                            site_data['tasks'] = data_section['pending_tasks_count']
-                        
-                        if 'active_sessions_count' in data_section and isinstance(data_section['active_sessions_count'], (int, float)):
-                            site_data['site_visits'] = data_section['active_sessions_count']
-                        
-                        if 'opportunities_total_value' in data_section and isinstance(data_section['opportunities_total_value'], (int, float)):
-                            site_data['opportunities_value'] = data_section['opportunities_total_value']
-                        
-                        if 'total_asset_value' in data_section and isinstance(data_section['total_asset_value'], (int, float)):
-                            site_data['equipment_at_risk'] = data_section['total_asset_value']
-                
-                # Look for site data in other response formats
-                elif isinstance(resp_data, dict):
-                    # Check if this response contains site data directly
-                    if self.response_contains_site(resp_data, site_name):
-                        # Extract any numeric values
-                        self.extract_numeric_values_from_dict(resp_data, site_data)
-                    
-                    # Look for nested site data
-                    for key, value in resp_data.items():
-                        if isinstance(value, dict) and self.response_contains_site(value, site_name):
-                            self.extract_numeric_values_from_dict(value, site_data)
-                        elif isinstance(value, list):
-                            for item in value:
-                                if isinstance(item, dict) and self.response_contains_site(item, site_name):
-                                    self.extract_numeric_values_from_dict(item, site_data)
-                                    
-                # Specific check for Site657 in lists
-                if isinstance(resp_data, list):
-                    for item in resp_data:
-                        if isinstance(item, dict) and item.get('name') == site_name:
-                             self.extract_numeric_values_from_dict(item, site_data)
-        
-        return site_data
+        return self.site_scan(responses).site_data(site_name)
     
     def extract_numeric_values_from_dict(self, data_dict, site_data):
         """Extract numeric values from a dictionary and add to site_data"""
-        numeric_fields = {
-            'total_assets': ['total_assets', 'asset_count', 'assets', 'total_asset_count'],
-            'tasks': ['pending_tasks_count', 'pending_tasks', 'tasks'],
-            'site_visits': ['active_sessions_count', 'active_site_visits', 'site_visits'],
-            'opportunities_value': ['opportunities_total_value', 'opportunities_value'],
-            'equipment_at_risk': ['total_asset_value', 'equipment_at_risk']
-        }
-        
-        for target_field, possible_fields in numeric_fields.items():
-            for field in possible_fields:
-                if field in data_dict and isinstance(data_dict[field], (int, float)):
-                    if target_field == 'total_assets':
-                        site_data[target_field] = data_dict[field]
-                    elif target_field == 'tasks':
-                        site_data[target_field] = data_dict[field]
-                    elif target_field == 'site_visits':
-                        site_data[target_field] = data_dict[field]
-                    elif target_field == 'opportunities_value':
-                        site_data[target_field] = data_dict[field]
-                    elif target_field == 'equipment_at_risk':
-                        site_data[target_field] = data_dict[field]
-        
-        # Extract asset types
-        if 'asset_breakdown' in data_dict and isinstance(data_dict['asset_breakdown'], list):
-            for item in data_dict['asset_breakdown']:
-                if isinstance(item, dict) and 'node_class_name' in item and 'count' in item:
-                    asset_type = item['node_class_name']
-                    count = item['count']
-                    site_data['asset_types'][asset_type] = count
-        
-        # Extract issues
-        if 'issues_breakdown' in data_dict and isinstance(data_dict['issues_breakdown'], list):
-            for item in data_dict['issues_breakdown']:
-                if isinstance(item, dict) and 'issue_class_name' in item and 'count' in item:
-                    issue_type = item['issue_class_name']
-                    count = item['count']
-                    site_data['issues'][issue_type] = count
+        apply_writes(site_data, numeric_writes(data_dict))
     
     def compare_comprehensive_site_data(self, old_data, new_data, site_name):
         """Compare comprehensive site data between old and new versions"""
@@ -631,8 +548,8 @@ class UltimateMigrationVerifier:
             new_found = self.search_for_value(new_responses, new_val)
             
             # Check if we find the values in page sources as well
-            old_page_found = self.search_page_sources_for_value("complete_captures_20251121_201827", old_val)
-            new_page_found = self.search_page_sources_for_value("complete_tab_captures_20251121_202444", new_val)
+            old_page_found = self.search_page_sources_for_value(self.old_capture_dir, old_val)
+            new_page_found = self.search_page_sources_for_value(self.new_capture_dir, new_val)
             
             # If both values are found, it indicates a difference
             if (old_found or old_page_found) and (new_found or new_page_found):
@@ -666,26 +583,17 @@ class UltimateMigrationVerifier:
         
         return dashboard_differences
     
+    def page_source_index(self, directory):
+        """PageSourceIndex of a capture directory, built on first use"""
+        index = self._page_source_indexes.get(directory)
+        if index is None:
+            index = self._page_source_indexes[directory] = PageSourceIndex(directory)
+            print(f"🔎 Indexed {index.files_indexed} page source files in {directory}")
+        return index
+    
     def search_page_sources_for_value(self, directory, target_value):
         """Search for a specific numeric value in page source files"""
-        import glob
-        
-        # Look for page source files
-        page_source_pattern = os.path.join(directory, "page_source*.html")
-        page_source_files = glob.glob(page_source_pattern)
-        
-        for file_path in page_source_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    # Convert target value to string and search in content
-                    if str(target_value) in content:
-                        return True
-            except Exception as e:
-                # Ignore files that can't be read
-                continue
-        
-        return False
+        return self.page_source_index(directory).contains(target_value)
     
     def analyze_site_specific_data(self, old_responses, new_responses):
         """Analyze site-specific data for critical issues"""
@@ -701,6 +609,10 @@ class UltimateMigrationVerifier:
         # Add the specific sites mentioned in the issue
         all_sites.update(["Site657", "All Facilities", "London UK", "Melbourne AU", "ShowSite3", "test", "test site", "Toronto Canada"])
         
+        # Find where every site is first mentioned, one pass per capture for all sites
+        self.site_scan(old_responses).match_sites(all_sites)
+        self.site_scan(new_responses).match_sites(all_sites)
+        
         # For each site, look for specific issues
         for site in all_sites:
             site_analysis[site] = {
@@ -1008,60 +920,11 @@ class UltimateMigrationVerifier:
     
     def find_site_data(self, responses, site_name):
         """Find site data in responses by site name"""
-        for response in responses:
-            if isinstance(response, dict) and 'response' in response:
-                # Look for site data in various possible structures
-                resp_data = response['response']
-                if isinstance(resp_data, dict):
-                    # Check if this response contains data for the specific site
-                    if self.response_contains_site(resp_data, site_name):
-                        return resp_data
-                    
-                    # Check nested structures
-                    for key, value in resp_data.items():
-                        if isinstance(value, dict) and self.response_contains_site(value, site_name):
-                            return value
-                        elif isinstance(value, list):
-                            for item in value:
-                                if isinstance(item, dict) and self.response_contains_site(item, site_name):
-                                    return item
-        return None
+        return self.site_scan(responses).find_site(site_name)
     
     def response_contains_site(self, data, site_name):
         """Check if response data contains the specified site"""
-        if isinstance(data, dict):
-            # Check common site identifiers
-            site_indicators = ['name', 'site_name', 'site', 'sld_name', 'location', 'title']
-            for indicator in site_indicators:
-                if indicator in data:
-                    data_value = str(data[indicator])
-                    # Handle case where the value might be a dict or list
-                    if isinstance(data[indicator], (dict, list)):
-                        data_value = str(data[indicator])
-                    
-                    # Check for exact or partial match
-                    if site_name.lower() == data_value.lower() or site_name.lower() in data_value.lower():
-                        return True
-            
-            # Check if site_name is in any string values
-            for key, value in data.items():
-                if isinstance(value, str) and site_name.lower() in value.lower():
-                    return True
-                # Also check nested dictionaries
-                elif isinstance(value, dict):
-                    if self.response_contains_site(value, site_name):
-                        return True
-                # Check lists for nested objects
-                elif isinstance(value, list):
-                    for item in value:
-                        if isinstance(item, dict) and self.response_contains_site(item, site_name):
-                            return True
-        elif isinstance(data, list):
-            # If data is a list, check each item
-            for item in data:
-                if isinstance(item, dict) and self.response_contains_site(item, site_name):
-                    return True
-        return False
+        return bool(SiteNameMatcher([site_name]).find_sites(site_search_text(data)))
     
     def extract_asset_count(self, site_data):
         """Extract asset count from site data"""
@@ -1146,13 +1009,13 @@ class UltimateMigrationVerifier:
             
             if not already_captured:
                 severity = "CRITICAL" if old_assets > 0 and new_assets == 0 else "MAJOR"
-                differences.append({
-                    "path": f"site_{site_name}.total_assets",
-                    "type": "site_asset_count_change",
-                    "old_value": old_assets,
-                    "new_value": new_assets,
-                    "severity": severity
-                })
+                differences.append(DiffRecord(
+                    path=f"site_{site_name}.total_assets",
+                    diff_type="site_asset_count_change",
+                    old_value=old_assets,
+                    new_value=new_assets,
+                    severity=severity
+                ))
         
         return differences
     
@@ -1212,28 +1075,55 @@ class UltimateMigrationVerifier:
                                     "new_value": new_val
                                 })
     
+    def _scan_capture(self, responses):
+        """(SiteScan, ValueIndex) of a capture's responses, both built in one pass on first use"""
+        cached = self._capture_scans.get(id(responses))
+        if cached is None or cached[0] is not responses:
+            value_index = ValueIndex()
+            scan = SiteScan(responses, value_index)
+            cached = (responses, scan, value_index)
+            self._capture_scans[id(responses)] = cached
+            print(f"🔎 Scanned {len(scan.responses)} responses ({len(scan.sites)} sites)")
+        return cached[1:]
+    
+    def site_scan(self, responses):
+        """SiteScan of a capture's responses"""
+        return self._scan_capture(responses)[0]
+    
+    def value_index(self, responses):
+        """ValueIndex of a capture's responses"""
+        return self._scan_capture(responses)[1]
+    
+    def resolve_site_data(self, ref):
+        """Raw payload behind a SiteDataRef in a site's raw_data (a three-item list in saved results)"""
+        ref = SiteDataRef(*ref)
+        for _, scan, _ in self._capture_scans.values():
+            if scan.capture_id == ref.capture:
+                return scan.resolve(ref)
+        raise KeyError(f"No scanned capture {ref.capture}")
+    
+    def site_sources_html(self, site_analysis):
+        """Collapsible old/new source payloads of a site with issues, resolved from its raw_data refs"""
+        html_parts = []
+        for side, site_data in site_analysis.get("comprehensive_data", {}).items():
+            for ref in site_data.get("raw_data", []):
+                ref = SiteDataRef(*ref)
+                try:
+                    payload = json.dumps(self.resolve_site_data(ref), indent=2, default=str)
+                except (KeyError, IndexError, ValueError, OSError) as e:
+                    payload = f"(could not load: {e})"
+                if len(payload) > SOURCE_PREVIEW_CHARS:
+                    payload = payload[:SOURCE_PREVIEW_CHARS] + "\n..."
+                html_parts.append(f"""
+            <details>
+                <summary>{side.title()} source: {html.escape(str(ref.capture))} #{ref.entry} {html.escape(ref.pointer)}</summary>
+                <pre>{html.escape(payload)}</pre>
+            </details>""")
+        return "".join(html_parts)
+    
     def search_for_value(self, responses, target_value):
         """Search for a specific numeric value in all responses"""
-        for response in responses:
-            if isinstance(response, dict) and 'response' in response:
-                resp_data = response['response']
-                if self.value_exists_in_data(resp_data, target_value):
-                    return True
-        return False
-    
-    def value_exists_in_data(self, data, target_value):
-        """Recursively check if a value exists in the data structure"""
-        if isinstance(data, (int, float)) and data == target_value:
-            return True
-        elif isinstance(data, dict):
-            for value in data.values():
-                if self.value_exists_in_data(value, target_value):
-                    return True
-        elif isinstance(data, list):
-            for item in data:
-                if self.value_exists_in_data(item, target_value):
-                    return True
-        return False
+        return self.value_index(responses).contains(target_value)
     
     def compare_screenshots(self):
         """Compare screenshots between old and new captures"""
@@ -1582,6 +1472,7 @@ class UltimateMigrationVerifier:
                     
                     html += """
             </div>"""
+                html += self.site_sources_html(site_data)
             else:
                 html += """
             <p>No critical issues detected for this site.</p>"""
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+VALUE INDEX
+Inverted index of the values in a capture's API responses.
+
+"Does 2535 appear anywhere in the old capture?" used to be answered by
+walking every response tree, once per value asked about. ValueIndex walks
+the responses once and answers each question with a dict lookup:
+- numbers:  numeric value -> locations (endpoint, path) where it occurs
+- tokens:   lower-cased word of a string value -> locations
+
+Numbers compare like Python numbers (1 == 1.0 == True), which is how the
+recursive search matched them. Only the first LOCATIONS_PER_VALUE
+locations of a value are kept (common values like 0 occur thousands of
+times); count() still reports every occurrence.
+
+PageSourceIndex answers the same questions for the page_source*.html files
+of a capture directory. Each file is memory-mapped and scanned once; the
+numbers in its text nodes ("2,535", "$485k", "71 issues") and their words
+are indexed, with the text node as the location.
+"""
+
+import glob
+import html
+import mmap
+import os
+import re
+from endpoint_matcher import endpoint_template
+
+# Locations remembered per value or token
+LOCATIONS_PER_VALUE = 64
+
+_TOKEN = re.compile(r'\w+')
+
+# Text between tags, skipping <script> and <style> bodies
+_TEXT_NODE = re.compile(rb'<(script|style)\b.*?</\1\s*>|>([^<]+)', re.S | re.I)
+
+# Number in page text: 2,535 / 12.5 / $485k / 1.2M (suffix scales the value)
+_PAGE_NUMBER = re.compile(r'(?<![\w.])[$€£]?(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?([kKmMbB](?!\w))?(?![\w.]\d)')
+_SCALE = {'k': 1000, 'm': 1000000, 'b': 1000000000}
+
+
+def parse_page_number(digits, fraction="", suffix=""):
+    """Value of a _PAGE_NUMBER match's groups: int when it is a whole number"""
+    value = int(digits.replace(',', ''))
+    if fraction:
+        value = float(f"{value}{fraction}")
+    if suffix:
+        value *= _SCALE[suffix.lower()]
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return value
+
+
+class _LookupIndex:
+    """Numbers and words mapped to where they occur"""
+
+    def __init__(self):
+        self._numbers = {}
+        self._number_counts = {}
+        self._tokens = {}
+        self._token_counts = {}
+
+    def _add_number(self, value, location):
+        self._record(self._numbers, self._number_counts, value, location)
+
+    def _add_text(self, text, location):
+        for token in set(_TOKEN.findall(text.lower())):
+            self._record(self._tokens, self._token_counts, token, location)
+
+    @staticmethod
+    def _record(index, counts, value, location):
+        count = counts.get(value, 0)
+        counts[value] = count + 1
+        if count < LOCATIONS_PER_VALUE:
+            index.setdefault(value, []).append(location)
+
+    def contains(self, value):
+        """True if the number occurs anywhere in the index"""
+        return value in self._number_counts
+
+    def locations(self, value):
+        """Where the number occurs (the first LOCATIONS_PER_VALUE locations)"""
+        return self._numbers.get(value, [])
+
+    def count(self, value):
+        """How many times the number occurs"""
+        return self._number_counts.get(value, 0)
+
+    def contains_token(self, token):
+        """True if the word occurs in any text (case-insensitive)"""
+        return token.lower() in self._token_counts
+
+    def token_locations(self, token):
+        """Where texts containing the word occur"""
+        return self._tokens.get(token.lower(), [])
+
+    def contains_text(self, text):
+        """True if every word of text occurs somewhere (not necessarily together)"""
+        tokens = _TOKEN.findall(text.lower())
+        return bool(tokens) and all(token in self._token_counts for token in tokens)
+
+
+class ValueIndex(_LookupIndex):
+    """Number and string-token lookups over a set of API responses; locations are (endpoint, path)"""
+
+    def __init__(self, responses=()):
+        super().__init__()
+        self.responses_indexed = 0
+        for response in responses:
+            self.add(response)
+
+    def add(self, response):
+        """Index one captured response (an entry with 'url' and 'response')"""
+        if not isinstance(response, dict) or 'response' not in response:
+            return
+        self.responses_indexed += 1
+        url = response.get('url')
+        endpoint = endpoint_template(url) if isinstance(url, str) else ""
+
+        stack = [("", response['response'])]
+        while stack:
+            path, data = stack.pop()
+            if isinstance(data, dict):
+                for key, value in data.items():
+                    stack.append((f"{path}.{key}" if path else str(key), value))
+            elif isinstance(data, list):
+                for i, item in enumerate(data):
+                    stack.append((f"{path}[{i}]", item))
+            elif isinstance(data, (int, float)):
+                self._add_number(data, (endpoint, path))
+            elif isinstance(data, str):
+                self._add_text(data, (endpoint, path))
+
+
+class PageSourceIndex(_LookupIndex):
+    """Number and word lookups over a capture directory's page sources; locations are (file, text node)"""
+
+    def __init__(self, directory, pattern="page_source*.html"):
+        super().__init__()
+        self.directory = directory
+        self.files_indexed = 0
+        for path in sorted(glob.glob(os.path.join(directory, pattern))):
+            try:
+                self.add_file(path)
+            except (OSError, ValueError):
+                # Unreadable or empty files hold nothing to find
+                continue
+
+    def add_file(self, path):
+        """Index the text nodes of one HTML file"""
+        name = os.path.basename(path)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            for match in _TEXT_NODE.finditer(content):
+                raw = match.group(2)
+                if raw is None or raw.isspace():
+                    continue
+                text = html.unescape(raw.decode('utf-8', 'ignore')).strip()
+                location = (name, text)
+                for number in _PAGE_NUMBER.finditer(text):
+                    self._add_number(parse_page_number(*number.groups('')), location)
+                self._add_text(text, location)
+        self.files_indexed += 1
@@ -4,7 +4,6 @@ WORKING Site Switcher - Actually switches between all sites!
 Uses the Material-UI Autocomplete that was discovered
 """
 import json
-import time
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -12,12 +11,19 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
+from network_capture import NetworkCapture, wait_for_dom_stable
+from site_pool import SitePool
+from browser_session import export_session
+from session_store import SessionStore
 
-def login(driver, base_url, email, password):
-    """Login to the website"""
+def login(driver, network, base_url, email, password):
+    """Login to the website, reusing the saved session when it is still valid"""
     print(f"🔐 Logging in to {base_url}...")
+    sessions = SessionStore()
+    if sessions.restore(driver, base_url, email, wait=network.wait_until_settled):
+        return
     driver.get(f"{base_url}/login")
-    time.sleep(2)
+    network.wait_until_settled()
 
     driver.find_element(By.NAME, "email").send_keys(email)
     driver.find_element(By.NAME, "password").send_keys(password)
@@ -25,7 +31,8 @@ def login(driver, base_url, email, password):
 
     WebDriverWait(driver, 15).until(EC.url_contains("/dashboard"))
     print("✅ Logged in successfully")
-    time.sleep(3)
+    network.wait_until_settled()
+    sessions.save(export_session(driver), email)
 
 def get_all_sites(driver):
     """Get list of all available sites from the autocomplete dropdown"""
@@ -39,7 +46,6 @@ def get_all_sites(driver):
 
         # Click to open dropdown
         autocomplete_input.click()
-        time.sleep(1)
 
         # Get all options
         options = WebDriverWait(driver, 10).until(
@@ -54,7 +60,7 @@ def get_all_sites(driver):
 
         # Close dropdown by pressing Escape
         autocomplete_input.send_keys(Keys.ESCAPE)
-        time.sleep(1)
+        wait_for_dom_stable(driver)
 
         print(f"✅ Found {len(sites)} sites:")
         for site in sites:
@@ -76,10 +82,8 @@ def select_site(driver, site_name):
 
         # Clear and type the site name
         autocomplete_input.click()
-        time.sleep(0.5)
         autocomplete_input.clear()
         autocomplete_input.send_keys(site_name)
-        time.sleep(1)
 
         # Wait for the option to appear and click it
         option_xpath = f"//li[@role='option' and contains(text(), '{site_name}')]"
@@ -88,9 +92,6 @@ def select_site(driver, site_name):
         )
         option.click()
 
-        # Wait for page to load new data
-        time.sleep(3)
-
         return True
 
     except Exception as e:
@@ -140,8 +141,33 @@ def capture_site_data(driver, site_name):
 
     return data
 
-def capture_all_sites(base_url, email, password, output_file="site_capture.json"):
-    """Main function to capture data from all sites"""
+def switch_and_capture(driver, network, site_name):
+    """Select a site, capture its data and a screenshot; None if it can't be selected"""
+    print(f"🔄 Switching to: {site_name}")
+
+    # Select the site
+    if not select_site(driver, site_name):
+        print(f"   ⚠️  Skipped {site_name}")
+        return None
+
+    # Wait for page to load new data
+    network.wait_until_settled()
+
+    # Capture data
+    site_data = capture_site_data(driver, site_name)
+
+    # Take screenshot
+    screenshot_name = f"site_{site_name.replace(' ', '_').replace('/', '_')}.png"
+    driver.save_screenshot(screenshot_name)
+    print(f"   📸 {site_name}: screenshot {screenshot_name}")
+
+    if site_data['metrics']:
+        print(f"   📊 {site_name}: captured metrics {list(site_data['metrics'].keys())}")
+
+    return site_data
+
+def capture_all_sites(base_url, email, password, output_file="site_capture.json", workers=1):
+    """Main function to capture data from all sites; workers > 1 adds parallel browsers"""
 
     print("\n" + "="*80)
     print("AUTOMATED SITE SWITCHING & DATA CAPTURE")
@@ -156,10 +182,11 @@ def capture_all_sites(base_url, email, password, output_file="site_capture.json"
     # chrome_options.add_argument("--headless")
 
     driver = webdriver.Chrome(options=chrome_options)
+    network = NetworkCapture(driver, accept=None).start()
 
     try:
         # Login
-        login(driver, base_url, email, password)
+        login(driver, network, base_url, email, password)
 
         # Get all available sites
         sites = get_all_sites(driver)
@@ -169,33 +196,9 @@ def capture_all_sites(base_url, email, password, output_file="site_capture.json"
             return None
 
         # Capture data for each site
-        all_data = []
-
         print(f"\n🔄 Switching through {len(sites)} sites and capturing data...\n")
-
-        for i, site_name in enumerate(sites, 1):
-            print(f"[{i}/{len(sites)}] Switching to: {site_name}")
-
-            # Select the site
-            if select_site(driver, site_name):
-                print(f"   ✅ Site selected successfully")
-
-                # Capture data
-                site_data = capture_site_data(driver, site_name)
-                all_data.append(site_data)
-
-                # Take screenshot
-                screenshot_name = f"site_{site_name.replace(' ', '_').replace('/', '_')}.png"
-                driver.save_screenshot(screenshot_name)
-                print(f"   📸 Screenshot: {screenshot_name}")
-
-                if site_data['metrics']:
-                    print(f"   📊 Captured metrics: {list(site_data['metrics'].keys())}")
-
-            else:
-                print(f"   ⚠️  Skipped")
-
-            print()
+        all_data = list(SitePool(workers).capture(driver, network, sites, switch_and_capture).values())
+        print()
 
         # Save all data
         output_data = {
@@ -230,6 +233,7 @@ def capture_all_sites(base_url, email, password, output_file="site_capture.json"
         return None
 
     finally:
+        network.stop()
         driver.quit()
 
 if __name__ == "__main__":